@@ -6,7 +6,7 @@ All tunable parameters in one place.
 import os
 from decimal import Decimal
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional
 
 
 @dataclass
@@ -32,6 +32,7 @@ class ExecutionConfig:
     max_fill_retries: int = 3           # Total attempts (Tier 1-3)
     cooldown_minutes: int = 30          # Per-asset cooldown
     post_only_retries: int = 2          # Tier 1 & 2 are PostOnly
+    book_max_age_ms: int = 500          # Older cached bid/ask → fetch the orderbook via REST
     # Tier 3 uses regular limit (may pay taker fee)
     dry_run: bool = True                # Paper mode — log signals, no real orders
 
@@ -40,6 +41,7 @@ class ExecutionConfig:
 class RiskConfig:
     kill_switch_threshold: Decimal = Decimal("30.0")
     kill_switch_check_interval: int = 60  # Seconds
+    kill_switch_reconcile_interval: int = 300  # Seconds between REST position refreshes
 
 
 @dataclass
@@ -50,7 +52,9 @@ class CoinConfig:
         "USDCUSDT", "DAIUSDT", "TUSDUSDT", "BUSDUSDT", "FDUSDUSDT",
     ])
     coin_refresh_interval_hours: int = 4
+    instruments_cache_hours: int = 24    # Re-fetch instrument specs (tick/lot size) this often
     ha_history_candles: int = 200        # Candles to fetch on startup
+    max_concurrent_history_loads: int = 5  # Symbols fetching startup klines at once
 
 
 @dataclass
@@ -64,6 +68,7 @@ class ExchangeConfig:
     ws_private_mainnet: str = "wss://stream.bybit.com/v5/private"
     ws_public_testnet: str = "wss://stream-testnet.bybit.com/v5/public/linear"
     ws_private_testnet: str = "wss://stream-testnet.bybit.com/v5/private"
+    offload_signing: bool = False       # serialize+sign signed POSTs in a worker thread
 
     @property
     def base_url(self) -> str:
@@ -88,6 +93,8 @@ class NotificationConfig:
 @dataclass
 class StorageConfig:
     db_path: str = "./data/bot.db"
+    kline_cache: bool = True             # Reuse closed klines from the DB on restart
+    checkpoint_interval_sec: int = 60    # WAL checkpoint cadence (runs off the event loop)
 
 
 @dataclass
@@ -103,15 +110,28 @@ class BotConfig:
     log_level: str = "INFO"
 
     @classmethod
-    def from_env(cls) -> "BotConfig":
-        """Load config with environment variable overrides."""
+    def from_env(cls, reload: bool = False) -> "BotConfig":
+        """
+        Load config with environment variable overrides.
+        The first result is cached; pass reload=True to re-read the environment.
+        """
+        global _env_config
+        if _env_config is not None and not reload:
+            return _env_config
+
         config = cls()
         config.exchange.api_key = os.getenv("BYBIT_API_KEY", "")
         config.exchange.api_secret = os.getenv("BYBIT_API_SECRET", "")
         config.exchange.testnet = os.getenv("BYBIT_TESTNET", "false").lower() == "true"
+        config.exchange.offload_signing = os.getenv("BYBIT_OFFLOAD_SIGNING", "false").lower() == "true"
         config.notifications.telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN", "")
         config.notifications.telegram_chat_id = os.getenv("TELEGRAM_CHAT_ID", "")
         config.storage.db_path = os.getenv("DB_PATH", "./data/bot.db")
         config.log_level = os.getenv("LOG_LEVEL", "INFO")
         config.execution.dry_run = os.getenv("DRY_RUN", "true").lower() == "true"
+        _env_config = config
         return config
+
+
+# Populated by the first BotConfig.from_env() call
+_env_config: Optional[BotConfig] = None
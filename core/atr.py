@@ -4,53 +4,97 @@ Used to calculate TP levels for each trade.
 """
 
 from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass
 from decimal import Decimal
-from typing import List, Optional
+from typing import Deque, Iterable, List, Optional, Tuple
 from exchange.models import Candle
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class _ATRState:
+    """Rolling ATR state for one symbol — all fields behind a single dict lookup."""
+    window: Deque[float]                # last `period` True Ranges (oldest first)
+    tr_sum: float = 0.0                 # running sum of `window`
+    last_close: Optional[float] = None  # previous close, needed for the next TR
+    atr: Optional[float] = None         # latest ATR value (Decimal only on request)
+
+
 class ATRCalculator:
     """
     Calculates ATR(14) on 15-minute candles.
-    Maintains a rolling buffer per symbol.
+    Maintains a rolling window of True Ranges per symbol, so each new
+    candle updates the ATR in O(1) instead of rescanning history.
     """
 
     def __init__(self, period: int = 14):
         self.period = period
-        # symbol -> list of recent 15M candles (for rolling ATR)
-        self._candle_buffer: dict[str, List[Candle]] = {}
-        # symbol -> latest ATR value
-        self._atr_values: dict[str, Decimal] = {}
+        # symbol -> rolling ATR state
+        self._state: dict[str, _ATRState] = {}
 
     def initialize(self, symbol: str, candles: List[Candle]):
         """
-        Initialize ATR buffer with historical 15M candles.
+        Initialize ATR state with historical 15M candles.
         Need at least period+1 candles to calculate ATR.
         Candles must be sorted oldest-first.
         """
-        self._candle_buffer[symbol] = candles[-(self.period + 10):]  # Keep some extra
-        self._recalculate(symbol)
+        state = self._state[symbol] = _ATRState(window=deque(maxlen=self.period))
+        for candle in candles[-(self.period + 1):]:
+            self._push(state, candle)
 
-    def update(self, symbol: str, candle: Candle):
-        """Process a new confirmed 15M candle."""
-        if symbol not in self._candle_buffer:
-            self._candle_buffer[symbol] = []
+    def initialize_from_rows(self, symbol: str, rows: List[list]):
+        """
+        Initialize ATR state straight from raw Bybit REST kline rows
+        (newest-first, as returned by the API). Only the last period+1 rows
+        are read, and only their high/low/close — no Candle objects.
 
-        self._candle_buffer[symbol].append(candle)
+        Raises IndexError/TypeError/ValueError on a malformed row before any
+        state is touched, so callers can fall back to initialize().
+        """
+        hlc = [
+            (float(r[2]), float(r[3]), float(r[4]))
+            for r in reversed(rows[:self.period + 1])
+        ]
+        state = self._state[symbol] = _ATRState(window=deque(maxlen=self.period))
+        push = self._push_hlc
+        for high, low, close in hlc:
+            push(state, high, low, close)
 
-        # Keep buffer manageable
-        max_buffer = self.period + 20
-        if len(self._candle_buffer[symbol]) > max_buffer:
-            self._candle_buffer[symbol] = self._candle_buffer[symbol][-max_buffer:]
+    def update(self, symbol: str, candle: Candle):
+        """Process a new confirmed 15M candle."""
+        state = self._state.get(symbol)
+        if state is None:
+            state = self._state[symbol] = _ATRState(window=deque(maxlen=self.period))
+        self._push(state, candle)
 
-        self._recalculate(symbol)
+    def update_batch(self, updates: Iterable[Tuple[str, Candle]]):
+        """
+        Process several confirmed 15M candles in one call.
+        Lookups are bound once for the whole batch rather than once per symbol.
+        """
+        states = self._state
+        push = self._push
+        period = self.period
+        for symbol, candle in updates:
+            state = states.get(symbol)
+            if state is None:
+                state = states[symbol] = _ATRState(window=deque(maxlen=period))
+            push(state, candle)
 
     def get_atr(self, symbol: str) -> Optional[Decimal]:
         """Get current ATR value for a symbol."""
-        return self._atr_values.get(symbol)
+        state = self._state.get(symbol)
+        if state is None or state.atr is None:
+            return None
+        return Decimal(repr(state.atr))
+
+    def get_atr_float(self, symbol: str) -> Optional[float]:
+        """Current ATR as a float — for display, skips the Decimal conversion."""
+        state = self._state.get(symbol)
+        return state.atr if state else None
 
     def calculate_tp_levels(
         self,
@@ -70,13 +114,13 @@ class ATRCalculator:
             logger.warning(f"[ATR] {symbol}: No ATR available, cannot calculate TPs")
             return []
 
+        # TP_n = TP_(n-1) ± ATR — running addition, no per-level multiply
+        step = atr if side == "Buy" else -atr
+        price = entry_price
         levels = []
-        for n in range(1, num_levels + 1):
-            if side == "Buy":  # LONG
-                tp = entry_price + (Decimal(str(n)) * atr)
-            else:  # SHORT
-                tp = entry_price - (Decimal(str(n)) * atr)
-            levels.append(tp)
+        for _ in range(num_levels):
+            price += step
+            levels.append(price)
 
         logger.info(
             f"[ATR] {symbol}: ATR={atr:.6f}, Entry={entry_price}, "
@@ -84,34 +128,37 @@ class ATRCalculator:
         )
         return levels
 
-    def _recalculate(self, symbol: str):
-        """Recalculate ATR using SMA method."""
-        candles = self._candle_buffer.get(symbol, [])
-        if len(candles) < self.period + 1:
-            return
+    def _push(self, state: _ATRState, candle: Candle):
+        """Add one candle's True Range to the rolling window."""
+        self._push_hlc(state, candle.high, candle.low, candle.close)
 
-        # Calculate True Range for each candle (need previous close)
-        true_ranges: List[Decimal] = []
-        for i in range(1, len(candles)):
-            curr = candles[i]
-            prev_close = candles[i - 1].close
-
-            tr = max(
-                curr.high - curr.low,
-                abs(curr.high - prev_close),
-                abs(curr.low - prev_close),
-            )
-            true_ranges.append(tr)
-
-        # SMA of last `period` TRs
-        if len(true_ranges) < self.period:
+    def _push_hlc(self, state: _ATRState, high: float, low: float, close: float):
+        """
+        Add one True Range to the rolling window and refresh ATR (SMA).
+        TR math runs on floats; get_atr() converts to Decimal only when asked.
+        """
+        prev_close = state.last_close
+        state.last_close = close
+
+        # First candle has no previous close — nothing to measure yet
+        if prev_close is None:
             return
 
-        recent_trs = true_ranges[-self.period:]
-        atr = sum(recent_trs) / Decimal(str(self.period))
-        self._atr_values[symbol] = atr
+        tr = max(
+            high - low,
+            abs(high - prev_close),
+            abs(low - prev_close),
+        )
+
+        window = state.window
+        if len(window) == self.period:
+            state.tr_sum -= window[0]  # evicted by the append below
+        window.append(tr)
+        state.tr_sum += tr
+
+        if len(window) == self.period:
+            state.atr = state.tr_sum / self.period
 
     def remove_symbol(self, symbol: str):
         """Remove a symbol from tracking."""
-        self._candle_buffer.pop(symbol, None)
-        self._atr_values.pop(symbol, None)
+        self._state.pop(symbol, None)
@@ -4,6 +4,8 @@ Excludes stablecoins and low-liquidity pairs.
 """
 
 from __future__ import annotations
+import heapq
+import time
 from decimal import Decimal
 from typing import List, Dict, Optional, TYPE_CHECKING
 from exchange.models import CoinInfo
@@ -22,11 +24,21 @@ class CoinSelector:
         self,
         num_coins: int = 20,
         excluded_stablecoins: Optional[List[str]] = None,
+        instruments_ttl_sec: int = 24 * 3600,
     ):
         self.num_coins = num_coins
-        self.excluded = set(excluded_stablecoins or [])
+        self.instruments_ttl_sec = instruments_ttl_sec
+        # Stored as base coins: "USDCUSDT" → "USDC", so one membership test covers both forms
+        self.excluded = frozenset(
+            s[:-4] if s.endswith("USDT") and len(s) > 4 else s
+            for s in (excluded_stablecoins or [])
+        )
         self._coins: Dict[str, CoinInfo] = {}
 
+        # symbol -> instrument spec, reused across refreshes until the TTL expires
+        self._inst_map: Dict[str, Dict] = {}
+        self._inst_map_time: float = 0.0  # time.monotonic() of last fetch
+
     @property
     def symbols(self) -> List[str]:
         return list(self._coins.keys())
@@ -47,52 +59,61 @@ class CoinSelector:
 
         # Fetch all USDT perpetual tickers
         tickers = await client.get_tickers()
-        instruments = await client.get_instruments_info()
+        fetched_before = self._inst_map_time
+        inst_map = await self._get_instrument_map(client)
 
-        # Build instrument lookup
-        inst_map = {}
-        for inst in instruments:
-            symbol = inst["symbol"]
-            inst_map[symbol] = inst
-
-        # Filter and sort
+        # Filter in one pass: USDT suffix, not a stablecoin, has instrument info
+        excluded = self.excluded
         candidates = []
+        missing = []  # no spec in the cached map — possibly a listing newer than the cache
         for ticker in tickers:
             symbol = ticker["symbol"]
-
-            # Must end with USDT
             if not symbol.endswith("USDT"):
                 continue
 
-            # Exclude stablecoins
-            base = symbol.replace("USDT", "")
-            if base in self.excluded or symbol in self.excluded:
-                continue
-
-            # Must have instrument info
-            if symbol not in inst_map:
+            base = symbol[:-4]
+            if base in excluded:
                 continue
 
             volume_24h = Decimal(ticker.get("turnover24h", "0"))
-            candidates.append((symbol, base, volume_24h, inst_map[symbol]))
-
-        # Sort by 24H volume descending
-        candidates.sort(key=lambda x: x[2], reverse=True)
+            inst = inst_map.get(symbol)
+            if inst is None:
+                missing.append((symbol, base, volume_24h))
+                continue
+            candidates.append((symbol, base, volume_24h, inst))
+
+        # Take top N by 24H volume (descending) — partial heap select, no full sort
+        top = heapq.nlargest(self.num_coins, candidates, key=lambda x: x[2])
+
+        # A symbol without a spec that would make the cut: refetch the specs once
+        # (unless they were just fetched) instead of skipping it until the TTL runs out
+        if missing and self._inst_map_time == fetched_before:
+            cutoff = top[-1][2] if len(top) >= self.num_coins else None
+            if any(cutoff is None or vol > cutoff for _, _, vol in missing):
+                inst_map = await self._get_instrument_map(client, force=True)
+                for symbol, base, volume_24h in missing:
+                    inst = inst_map.get(symbol)
+                    if inst is not None:
+                        candidates.append((symbol, base, volume_24h, inst))
+                top = heapq.nlargest(self.num_coins, candidates, key=lambda x: x[2])
 
-        # Take top N
         new_coins: Dict[str, CoinInfo] = {}
-        for symbol, base, volume, inst in candidates[:self.num_coins]:
+        for symbol, base, volume, inst in top:
             lot_filter = inst.get("lotSizeFilter", {})
             price_filter = inst.get("priceFilter", {})
 
-            coin = CoinInfo(
-                symbol=symbol,
-                base_coin=base,
-                volume_24h=volume,
-                min_qty=Decimal(lot_filter.get("minOrderQty", "0.001")),
-                qty_step=Decimal(lot_filter.get("qtyStep", "0.001")),
-                tick_size=Decimal(price_filter.get("tickSize", "0.01")),
-            )
+            try:
+                coin = CoinInfo(
+                    symbol=symbol,
+                    base_coin=base,
+                    volume_24h=volume,
+                    min_qty=Decimal(lot_filter.get("minOrderQty", "0.001")),
+                    qty_step=Decimal(lot_filter.get("qtyStep", "0.001")),
+                    tick_size=Decimal(price_filter.get("tickSize", "0.01")),
+                )
+            except ValueError as e:
+                logger.warning(f"[COINS] Skipping {symbol}: {e}")
+                continue
 
             # Preserve existing state if coin was already tracked
             if symbol in self._coins:
@@ -118,11 +139,25 @@ class CoinSelector:
 
         logger.info(
             f"[COINS] Top {self.num_coins}: "
-            f"{[c.symbol for c in sorted(new_coins.values(), key=lambda x: x.volume_24h, reverse=True)[:5]]}..."
+            f"{[c[0] for c in top[:5]]}..."
         )
 
         return added, removed
 
+    async def _get_instrument_map(
+        self, client: "BybitRestClient", force: bool = False
+    ) -> Dict[str, Dict]:
+        """
+        Get the instrument lookup, refetching only when the cache is empty or stale
+        (or force=True). Tick/lot specs rarely change, unlike tickers which move every second.
+        """
+        now = time.monotonic()
+        if force or not self._inst_map or now - self._inst_map_time > self.instruments_ttl_sec:
+            instruments = await client.get_instruments_info()
+            self._inst_map = {inst["symbol"]: inst for inst in instruments}
+            self._inst_map_time = now
+        return self._inst_map
+
     def set_in_trade(self, symbol: str, in_trade: bool):
         """Mark a coin as having an active trade."""
         if symbol in self._coins:
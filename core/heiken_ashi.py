@@ -4,52 +4,125 @@ No lookahead, no incomplete candle reads.
 """
 
 from __future__ import annotations
-from decimal import Decimal
-from typing import Optional, List, Tuple
+from collections import deque
+from typing import Deque, Iterable, Optional, List, Tuple
 from exchange.models import Candle, HACandle, Signal, Side
-from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _ha_kernel(
+    o: float, h: float, l: float, c: float, prev_open: float, prev_close: float
+) -> Tuple[float, float, float, float]:
+    """
+    Core HA arithmetic on plain floats → (ha_open, ha_close, ha_high, ha_low).
+    For the first candle pass its own open/close as prev, giving HA_Open = (O + C) / 2.
+    """
+    ha_open = (prev_open + prev_close) * 0.5
+    ha_close = (o + h + l + c) * 0.25
+    return ha_open, ha_close, max(h, ha_open, ha_close), min(l, ha_open, ha_close)
+
+
 class HeikenAshiEngine:
     """
     Calculates Heiken Ashi candles from standard OHLCV candles.
     Maintains state per symbol for incremental updates.
     """
 
-    def __init__(self):
-        # symbol -> list of HA candles (most recent last)
-        self._ha_series: dict[str, List[HACandle]] = {}
+    def __init__(self, history_len: int = 0):
+        # Signals only need the last two HA candles; keep a longer series
+        # only when a caller opts in
+        self.history_len = history_len
+        # symbol -> bounded deque of HA candles (most recent last), opt-in
+        self._ha_series: dict[str, Deque[HACandle]] = {}
         # symbol -> previous HA candle (for incremental calc)
         self._prev_ha: dict[str, HACandle] = {}
+        # symbol -> HA candle before _prev_ha
+        self._prev_prev: dict[str, HACandle] = {}
+        # symbol -> timestamp of the last candle whose bullish flag differed from its predecessor
+        self._last_flip_ts: dict[str, int] = {}
 
     def build_from_history(self, symbol: str, candles: List[Candle]) -> List[HACandle]:
         """
-        Build full HA series from historical candles.
+        Build HA state from historical candles.
         Called on startup with 50 candles per symbol.
         Candles must be sorted oldest-first.
         """
-        if not candles:
+        bars = ((c.timestamp, c.open, c.high, c.low, c.close) for c in candles)
+        return self._build(symbol, bars, len(candles))
+
+    def build_from_rows(self, symbol: str, rows: List[list]) -> List[HACandle]:
+        """
+        Build HA state straight from raw Bybit REST kline rows (newest-first,
+        as returned by the API) without allocating a Candle per row.
+
+        Raises IndexError/TypeError/ValueError on a malformed row before any
+        state is touched, so callers can fall back to build_from_history.
+        """
+        bars = (
+            (int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]))
+            for r in reversed(rows)
+        )
+        return self._build(symbol, bars, len(rows))
+
+    def _build(
+        self, symbol: str, bars: Iterable[Tuple[int, float, float, float, float]], count: int
+    ) -> List[HACandle]:
+        """
+        Run the HA recurrence over oldest-first (ts, o, h, l, c) bars.
+
+        The recurrence runs on plain floats; HACandle objects are only
+        materialized for the tail that is kept (the last two, or history_len
+        if larger), which is also what gets returned. State is committed only
+        after the whole series has been consumed.
+        """
+        if not count:
             return []
 
-        ha_series: List[HACandle] = []
-        prev_ha: Optional[HACandle] = None
+        keep = max(2, self.history_len)
+        tail_start = count - keep
+        tail: List[HACandle] = []
 
-        for candle in candles:
-            ha = self._calc_single(candle, prev_ha)
-            ha_series.append(ha)
-            prev_ha = ha
+        ha_open = ha_close = None
+        last_flip_ts = None
+        prev_bull = None
+        for i, (ts, o, h, l, c) in enumerate(bars):
+            if ha_open is None:
+                ha_open, ha_close = o, c
+            ha_open, ha_close, ha_high, ha_low = _ha_kernel(o, h, l, c, ha_open, ha_close)
+            bull = ha_close > ha_open
+            if prev_bull is not None and bull != prev_bull:
+                last_flip_ts = ts
+            prev_bull = bull
+            if i >= tail_start:
+                tail.append(HACandle(
+                    timestamp=ts,
+                    ha_open=ha_open,
+                    ha_close=ha_close,
+                    ha_high=ha_high,
+                    ha_low=ha_low,
+                ))
 
-        self._ha_series[symbol] = ha_series
-        self._prev_ha[symbol] = ha_series[-1] if ha_series else None
+        if not tail:
+            return []
+        if last_flip_ts is None:
+            self._last_flip_ts.pop(symbol, None)
+        else:
+            self._last_flip_ts[symbol] = last_flip_ts
+        if self.history_len:
+            self._ha_series[symbol] = deque(tail, maxlen=self.history_len)
+        if len(tail) >= 2:
+            self._prev_prev[symbol] = tail[-2]
+        else:
+            self._prev_prev.pop(symbol, None)
+        self._prev_ha[symbol] = tail[-1]
 
         logger.info(
-            f"[HA] {symbol}: Built {len(ha_series)} HA candles. "
-            f"Latest: {'BULL' if ha_series[-1].is_bullish else 'BEAR'}"
+            f"[HA] {symbol}: Built {count} HA candles. "
+            f"Latest: {'BULL' if tail[-1].is_bullish else 'BEAR'}"
         )
-        return ha_series
+        return tail
 
     def update(self, symbol: str, candle: Candle) -> Tuple[HACandle, Optional[Signal]]:
         """
@@ -59,18 +132,22 @@ class HeikenAshiEngine:
         prev_ha = self._prev_ha.get(symbol)
         new_ha = self._calc_single(candle, prev_ha)
 
-        # Append to series (keep last 50)
-        if symbol not in self._ha_series:
-            self._ha_series[symbol] = []
-        self._ha_series[symbol].append(new_ha)
-        if len(self._ha_series[symbol]) > 50:
-            self._ha_series[symbol] = self._ha_series[symbol][-50:]
+        # Append to the opt-in series (deque evicts beyond history_len)
+        if self.history_len:
+            series = self._ha_series.get(symbol)
+            if series is None:
+                series = self._ha_series[symbol] = deque(maxlen=self.history_len)
+            series.append(new_ha)
 
         # Check for flip
         signal = None
         if prev_ha is not None:
             signal = self._detect_flip(symbol, prev_ha, new_ha)
 
+        if prev_ha is not None:
+            self._prev_prev[symbol] = prev_ha
+            if new_ha.is_bullish != prev_ha.is_bullish:
+                self._last_flip_ts[symbol] = new_ha.timestamp
         self._prev_ha[symbol] = new_ha
         return new_ha, signal
 
@@ -78,12 +155,13 @@ class HeikenAshiEngine:
         """Get the most recent HA candle for a symbol."""
         return self._prev_ha.get(symbol)
 
+    def get_last_flip_ts(self, symbol: str) -> Optional[int]:
+        """Timestamp (Unix ms) of the most recent confirmed direction change, if any."""
+        return self._last_flip_ts.get(symbol)
+
     def get_previous(self, symbol: str) -> Optional[HACandle]:
         """Get the second-to-last HA candle for a symbol."""
-        series = self._ha_series.get(symbol, [])
-        if len(series) >= 2:
-            return series[-2]
-        return None
+        return self._prev_prev.get(symbol)
 
     def _calc_single(self, candle: Candle, prev_ha: Optional[HACandle]) -> HACandle:
         """
@@ -94,18 +172,14 @@ class HeikenAshiEngine:
         HA_High  = max(H, HA_Open, HA_Close)
         HA_Low   = min(L, HA_Open, HA_Close)
         """
-        four = Decimal("4")
-        two = Decimal("2")
-
-        ha_close = (candle.open + candle.high + candle.low + candle.close) / four
-
         if prev_ha is None:
-            ha_open = (candle.open + candle.close) / two
+            prev_open, prev_close = candle.open, candle.close
         else:
-            ha_open = (prev_ha.ha_open + prev_ha.ha_close) / two
+            prev_open, prev_close = prev_ha.ha_open, prev_ha.ha_close
 
-        ha_high = max(candle.high, ha_open, ha_close)
-        ha_low = min(candle.low, ha_open, ha_close)
+        ha_open, ha_close, ha_high, ha_low = _ha_kernel(
+            candle.open, candle.high, candle.low, candle.close, prev_open, prev_close
+        )
 
         return HACandle(
             timestamp=candle.timestamp,
@@ -122,23 +196,24 @@ class HeikenAshiEngine:
         Bullish flip: prev was bearish, current is bullish → LONG
         Bearish flip: prev was bullish, current is bearish → SHORT
         """
-        if prev_ha.is_bearish and curr_ha.is_bullish:
-            logger.info(f"[HA] {symbol}: BULLISH FLIP detected (LONG)")
-            return Signal(
-                symbol=symbol,
-                side=Side.LONG,
-                timestamp=datetime.utcnow(),
-                ha_candle=curr_ha,
-            )
-        elif prev_ha.is_bullish and curr_ha.is_bearish:
-            logger.info(f"[HA] {symbol}: BEARISH FLIP detected (SHORT)")
-            return Signal(
-                symbol=symbol,
-                side=Side.SHORT,
-                timestamp=datetime.utcnow(),
-                ha_candle=curr_ha,
-            )
-        return None
+        # Flags are plain fields, so the common no-flip case is two attribute reads.
+        # %-style args: calc_live re-detects a live flip on every 5M close, so
+        # these lines must cost nothing when INFO is off.
+        if curr_ha.is_bullish and prev_ha.is_bearish:
+            side = Side.LONG
+            logger.info("[HA] %s: BULLISH FLIP detected (LONG)", symbol)
+        elif curr_ha.is_bearish and prev_ha.is_bullish:
+            side = Side.SHORT
+            logger.info("[HA] %s: BEARISH FLIP detected (SHORT)", symbol)
+        else:
+            return None
+
+        return Signal(
+            symbol=symbol,
+            side=side,
+            timestamp=curr_ha.timestamp,
+            ha_candle=curr_ha,
+        )
 
     def calc_live(self, symbol: str, candle: Candle) -> Tuple[Optional[HACandle], Optional[Signal]]:
         """
@@ -152,11 +227,56 @@ class HeikenAshiEngine:
         if prev_ha is None:
             return None, None
 
-        live_ha = self._calc_single(candle, prev_ha)
+        # prev_ha is known to exist here — go straight to the kernel
+        ha_open, ha_close, ha_high, ha_low = _ha_kernel(
+            candle.open, candle.high, candle.low, candle.close,
+            prev_ha.ha_open, prev_ha.ha_close,
+        )
+        live_ha = HACandle(
+            timestamp=candle.timestamp,
+            ha_open=ha_open,
+            ha_close=ha_close,
+            ha_high=ha_high,
+            ha_low=ha_low,
+        )
         signal = self._detect_flip(symbol, prev_ha, live_ha)
         return live_ha, signal
 
+    def detect_live_flip(self, symbol: str, candle: Candle) -> Optional[Signal]:
+        """
+        Hot-path variant of calc_live for callers that only need the signal:
+        the direction check runs on floats and an HACandle is only built when
+        there actually is a flip.
+        """
+        prev_ha = self._prev_ha.get(symbol)
+        if prev_ha is None:
+            return None
+
+        ha_open, ha_close, ha_high, ha_low = _ha_kernel(
+            candle.open, candle.high, candle.low, candle.close,
+            prev_ha.ha_open, prev_ha.ha_close,
+        )
+        if ha_close > ha_open:
+            if not prev_ha.is_bearish:
+                return None
+        elif ha_close < ha_open:
+            if not prev_ha.is_bullish:
+                return None
+        else:
+            return None
+
+        live_ha = HACandle(
+            timestamp=candle.timestamp,
+            ha_open=ha_open,
+            ha_close=ha_close,
+            ha_high=ha_high,
+            ha_low=ha_low,
+        )
+        return self._detect_flip(symbol, prev_ha, live_ha)
+
     def remove_symbol(self, symbol: str):
         """Remove a symbol (e.g., when it drops out of top 20)."""
         self._ha_series.pop(symbol, None)
         self._prev_ha.pop(symbol, None)
+        self._prev_prev.pop(symbol, None)
+        self._last_flip_ts.pop(symbol, None)
@@ -5,10 +5,14 @@ and routes signals to the trading system.
 
 from __future__ import annotations
 import asyncio
+import heapq
+import time
+from collections import defaultdict
+from dataclasses import dataclass
 from decimal import Decimal
-from datetime import datetime, timedelta
-from typing import Any, Dict, Optional, List, TYPE_CHECKING
-from exchange.models import Candle, Signal, Trade, TradeStatus, Side, CoinInfo
+from datetime import datetime
+from typing import Any, Dict, Optional, List, Set, Tuple, TYPE_CHECKING
+from exchange.models import Candle, Signal, Trade, TradeStatus, Side, CoinInfo, ExitReason, SlotState
 import logging
 
 if TYPE_CHECKING:
@@ -21,11 +25,24 @@ if TYPE_CHECKING:
     from exchange.bybit_rest import BybitRestClient
     from storage.database import Database
     from notifications.telegram import TelegramNotifier
+    from exchange.market_data import MarketDataCache
     from config import BotConfig
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class _SymbolState:
+    """Live signal state for one symbol."""
+    # Latest raw live kline.240 entry — updated every ~1-2s, only READ on 5M close,
+    # so it's parsed into a Candle there rather than on every push
+    live_4h: Optional[Dict[str, Any]] = None
+    # Option A: start of the 4H window already acted on — ONE flip signal per window
+    flip_acted_ts: Optional[int] = None
+    # Per-asset cooldown deadline (time.monotonic())
+    cooldown_until: float = 0.0
+
+
 class SignalEngine:
     """
     Core signal processing engine.
@@ -45,8 +62,13 @@ class SignalEngine:
         client: "BybitRestClient",
         db: "Database",
         notifier: "TelegramNotifier",
+        market_data: Optional["MarketDataCache"] = None,
     ):
         self.config = config
+        # Settings read on every signal, resolved once
+        self._dry_run: bool = config.execution.dry_run
+        self._leverage: int = config.slots.leverage
+        self._cooldown_minutes: int = config.execution.cooldown_minutes
         self.ha = ha_engine
         self.atr = atr_calc
         self.coins = coin_selector
@@ -56,26 +78,30 @@ class SignalEngine:
         self.client = client
         self.db = db
         self.notifier = notifier
+        self.market_data = market_data
 
-        # Per-asset cooldown tracking: symbol -> cooldown_until
-        self._cooldowns: Dict[str, datetime] = {}
-
-        # Option A flip tracking: symbol -> candle_start timestamp
-        # Only allow ONE flip signal per 4H window per symbol
-        self._flip_acted_this_window: Dict[str, int] = {}
+        # Per-symbol live state (4H cache, flip window, cooldown) — one lookup per message
+        self._sym_state: Dict[str, _SymbolState] = {}
 
-        # Live 4H candle cache: symbol -> latest live Candle from kline.240
-        # Updated every ~1-2s by WebSocket, but only READ on 5M candle close
-        self._live_4h_candle: Dict[str, Candle] = {}
+        # Pending slot releases: heap of (monotonic deadline, slot_id), drained by
+        # one long-lived task instead of a sleeping task per closed trade
+        self._cooldown_heap: List[Tuple[float, int]] = []
+        self._cooldown_wake = asyncio.Event()
+        self._running = False
 
-        # Lock to prevent concurrent signal processing
-        self._signal_lock = asyncio.Lock()
+        # Per-symbol locks: signals for the same coin are serialized, different
+        # coins execute in parallel. Slot selection + assignment has no await
+        # between them, so it stays atomic on the event loop without a lock.
+        self._symbol_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Entries run as tasks so the kline handler returns at once and ticker
+        # frames keep flowing while an order waits on fills / reprices
+        self._signal_tasks: Set[asyncio.Task] = set()
 
         # Health tracking — updated on every WS message
-        self.last_data_time: datetime = datetime.utcnow()
+        self.last_data_mono: float = time.monotonic()
 
         # Dashboard data caches
-        self._prices: Dict[str, Decimal] = {}          # symbol -> latest mark price
+        self._prices: Dict[str, float] = {}            # symbol -> latest mark price
         self._signal_log: List[Dict[str, Any]] = []    # last 50 signals for dashboard
         self._start_time: datetime = datetime.utcnow()  # bot start time
 
@@ -88,44 +114,35 @@ class SignalEngine:
         - confirm: false → Cache the live 4H candle (do NOT check for flip here)
         - confirm: true  → Store in HA chain, reset flip tracking for new window
         """
-        self.last_data_time = datetime.utcnow()
+        self.last_data_mono = time.monotonic()
         kline_data = data.get("data", [])
         if not kline_data:
             return
 
+        # Topic is kline.<interval>.<SYMBOL> — parse once per message
+        topic_symbol = topic.rpartition(".")[2]
         for kline in kline_data:
-            symbol = kline.get("symbol", "")
-            if not symbol:
-                parts = topic.split(".")
-                if len(parts) >= 3:
-                    symbol = parts[2]
-
-            confirmed = kline.get("confirm", False)
-            candle_start = int(kline.get("start", 0))
-
-            candle = Candle(
-                timestamp=candle_start,
-                open=Decimal(str(kline.get("open", 0))),
-                high=Decimal(str(kline.get("high", 0))),
-                low=Decimal(str(kline.get("low", 0))),
-                close=Decimal(str(kline.get("close", 0))),
-                volume=Decimal(str(kline.get("volume", 0))),
-                confirmed=confirmed,
-            )
+            symbol = kline.get("symbol") or topic_symbol
 
-            if confirmed:
+            if kline.get("confirm", False):
                 # ═══ 4H CANDLE CLOSED ═══
+                candle = Candle.from_ws(kline, confirmed=True)
                 # Store in HA chain (becomes the new "previous" for next window)
-                logger.info(f"[SIGNAL] {symbol}: 4H candle CONFIRMED. C={candle.close}")
+                logger.info("[SIGNAL] %s: 4H candle CONFIRMED. C=%s", symbol, candle.close)
                 self.ha.update(symbol, candle)
 
                 # Reset flip tracking — new 4H window starts
-                self._flip_acted_this_window.pop(symbol, None)
-                self._live_4h_candle.pop(symbol, None)
+                state = self._sym_state.get(symbol)
+                if state is not None:
+                    state.flip_acted_ts = None
+                    state.live_4h = None
             else:
                 # ═══ LIVE 4H UPDATE ═══
-                # Just cache it. The 5M handler will read it.
-                self._live_4h_candle[symbol] = candle
+                # Just cache the raw entry. The 5M handler will parse and read it.
+                state = self._sym_state.get(symbol)
+                if state is None:
+                    state = self._sym_state[symbol] = _SymbolState()
+                state.live_4h = kline
 
     async def on_kline_5(self, topic: str, data: Dict[str, Any]):
         """
@@ -142,40 +159,41 @@ class SignalEngine:
         if not kline_data:
             return
 
+        # Topic is kline.<interval>.<SYMBOL> — parse once per message
+        topic_symbol = topic.rpartition(".")[2]
         for kline in kline_data:
             # Only trigger on confirmed 5M candle close
             if not kline.get("confirm", False):
                 continue
 
-            symbol = kline.get("symbol", "")
-            if not symbol:
-                parts = topic.split(".")
-                if len(parts) >= 3:
-                    symbol = parts[2]
+            symbol = kline.get("symbol") or topic_symbol
 
             # Read the cached live 4H candle
-            live_4h = self._live_4h_candle.get(symbol)
-            if live_4h is None:
+            state = self._sym_state.get(symbol)
+            if state is None or state.live_4h is None:
                 continue
+            live_4h = Candle.from_ws(state.live_4h, confirmed=False)
 
             # Calculate HA without modifying stored series
-            live_ha, signal = self.ha.calc_live(symbol, live_4h)
+            signal = self.ha.detect_live_flip(symbol, live_4h)
 
             if signal is None:
                 continue
 
             # Option A: Only act on FIRST flip per 4H window
             candle_start = live_4h.timestamp
-            if self._flip_acted_this_window.get(symbol) == candle_start:
+            if state.flip_acted_ts == candle_start:
                 continue
 
             # New flip detected at this 5M candle close!
-            self._flip_acted_this_window[symbol] = candle_start
+            state.flip_acted_ts = candle_start
             logger.info(
-                f"[SIGNAL] {symbol}: Flip detected on 5M close! "
-                f"{'LONG' if signal.side == Side.LONG else 'SHORT'}"
+                "[SIGNAL] %s: Flip detected on 5M close! %s",
+                symbol, "LONG" if signal.side == Side.LONG else "SHORT",
             )
-            await self._process_signal(signal)
+            task = asyncio.create_task(self._process_signal(signal), name=f"signal-{symbol}")
+            self._signal_tasks.add(task)
+            task.add_done_callback(self._on_signal_done)
 
     async def on_kline_15(self, topic: str, data: Dict[str, Any]):
         """Handle 15M kline WebSocket message — update ATR."""
@@ -183,27 +201,19 @@ class SignalEngine:
         if not kline_data:
             return
 
+        closed: List[tuple] = []
+        # Topic is kline.<interval>.<SYMBOL> — parse once per message
+        topic_symbol = topic.rpartition(".")[2]
         for kline in kline_data:
             if not kline.get("confirm", False):
                 continue
 
-            symbol = kline.get("symbol", "")
-            if not symbol:
-                parts = topic.split(".")
-                if len(parts) >= 3:
-                    symbol = parts[2]
-
-            candle = Candle(
-                timestamp=int(kline.get("start", 0)),
-                open=Decimal(str(kline.get("open", 0))),
-                high=Decimal(str(kline.get("high", 0))),
-                low=Decimal(str(kline.get("low", 0))),
-                close=Decimal(str(kline.get("close", 0))),
-                volume=Decimal(str(kline.get("volume", 0))),
-                confirmed=True,
-            )
+            symbol = kline.get("symbol") or topic_symbol
 
-            self.atr.update(symbol, candle)
+            closed.append((symbol, Candle.from_ws(kline, confirmed=True)))
+
+        if closed:
+            self.atr.update_batch(closed)
 
     async def on_ticker(self, topic: str, data: Dict[str, Any]):
         """Handle ticker update — pass to risk manager for TP monitoring."""
@@ -212,13 +222,20 @@ class SignalEngine:
             return
 
         symbol = tick_data.get("symbol", "")
+        if not symbol:
+            return
+        if self.market_data is not None:
+            # Best bid/ask for order placement — same push, no extra subscription
+            self.market_data.update_ticker(symbol, tick_data, data.get("ts", 0))
+
         mark_price_str = tick_data.get("markPrice") or tick_data.get("lastPrice")
-        if not symbol or not mark_price_str:
+        if not mark_price_str:
             return
 
-        mark_price = Decimal(str(mark_price_str))
+        # Float on the per-tick path; only TP/SL prices that go to the exchange are Decimal
+        mark_price = float(mark_price_str)
         self._prices[symbol] = mark_price  # Cache for dashboard
-        await self.risk.check_price(symbol, mark_price)
+        self.risk.check_price(symbol, mark_price)
 
     async def on_position_update(self, topic: str, data: Dict[str, Any]):
         """Handle position WebSocket updates (position closed by SL, etc.)."""
@@ -234,7 +251,6 @@ class SignalEngine:
                 if trade and trade.status == TradeStatus.OPEN:
                     pnl = Decimal(pos.get("cumRealisedPnl", "0"))
                     # Determine exit reason
-                    from exchange.models import ExitReason
                     exit_reason = ExitReason.TRAILING_SL if trade.highest_tp_reached >= 2 else ExitReason.SL_HIT
 
                     await self._handle_trade_closed(trade, exit_reason, pnl)
@@ -243,56 +259,71 @@ class SignalEngine:
         """Handle execution (fill) notifications."""
         executions = data.get("data", [])
 
+        # Sum fees per order first, then apply them all in one DB transaction
+        fees_by_order: Dict[str, Decimal] = {}
         for exec_data in executions:
             order_id = exec_data.get("orderId", "")
-            exec_type = exec_data.get("execType", "")
-            exec_fee = Decimal(exec_data.get("execFee", "0"))
+            exec_fee = abs(Decimal(exec_data.get("execFee", "0")))
+            fees_by_order[order_id] = fees_by_order.get(order_id, Decimal("0")) + exec_fee
 
-            # Look up trade by order ID
-            trade = self.db.get_trade_by_order_id(order_id)
-            if trade:
-                trade.fees += abs(exec_fee)
-                self.db.update_trade(trade)
+        if fees_by_order:
+            self.db.add_trade_fees(fees_by_order)
 
     # ==================== Signal Processing ====================
 
+    def _price_text(self, symbol: str) -> str:
+        """Cached mark price as display text — tick precision, never "1.2e-05"."""
+        price = self._prices.get(symbol)
+        if price is None:
+            return "0"
+        exact = Decimal(repr(price))
+        coin = self.coins.get_coin(symbol)
+        return coin.fmt_price(exact) if coin is not None else format(exact, "f")
+
+    def _on_signal_done(self, task: asyncio.Task):
+        """Drop the finished entry task; surface errors the WS worker used to log."""
+        self._signal_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"[SIGNAL] {task.get_name()} failed: {task.exception()}", exc_info=task.exception())
+
     async def _process_signal(self, signal: Signal):
         """Process a flip signal and attempt to execute a trade."""
-        async with self._signal_lock:
-            symbol = signal.symbol
+        symbol = signal.symbol
+        async with self._symbol_locks[symbol]:
             side = signal.side
 
             direction = "LONG" if side == Side.LONG else "SHORT"
             logger.info(f"[SIGNAL] Processing {direction} signal for {symbol}")
 
-            # Log signal for dashboard
-            self._signal_log.append({
+            # Log signal for dashboard — keep our own entry, other symbols may append meanwhile
+            log_entry: Dict[str, Any] = {
                 "time": datetime.utcnow().isoformat(),
                 "symbol": symbol,
                 "direction": direction,
-                "price": str(self._prices.get(symbol, "0")),
+                "price": self._price_text(symbol),
                 "action": "PENDING",
-            })
+            }
+            self._signal_log.append(log_entry)
             if len(self._signal_log) > 50:
                 self._signal_log = self._signal_log[-50:]
 
             # Check 1: Is this asset in cooldown?
             if self._is_in_cooldown(symbol):
                 logger.info(f"[SIGNAL] {symbol}: In cooldown. Ignoring signal.")
-                self._signal_log[-1]["action"] = "SKIPPED_COOLDOWN"
+                log_entry["action"] = "SKIPPED_COOLDOWN"
                 return
 
             # Check 2: Is this asset already in an active trade?
             if self.coins.is_in_trade(symbol):
                 logger.info(f"[SIGNAL] {symbol}: Already in active trade. Ignoring signal.")
-                self._signal_log[-1]["action"] = "SKIPPED_IN_TRADE"
+                log_entry["action"] = "SKIPPED_IN_TRADE"
                 return
 
             # Check 3: Is there an available slot?
             slot = self.slots.get_available_slot()
             if slot is None:
                 logger.info(f"[SIGNAL] {symbol}: No available slots. Ignoring signal.")
-                self._signal_log[-1]["action"] = "SKIPPED_NO_SLOT"
+                log_entry["action"] = "SKIPPED_NO_SLOT"
                 return
 
             # Get coin info
@@ -305,12 +336,12 @@ class SignalEngine:
             position_size = self.slots.calculate_position_size(slot)
 
             # ═══ DRY RUN MODE ═══
-            if self.config.execution.dry_run:
-                self._signal_log[-1]["action"] = "DRY_RUN"
-                self._signal_log[-1]["slot"] = slot.id
+            if self._dry_run:
+                log_entry["action"] = "DRY_RUN"
+                log_entry["slot"] = slot.id
                 logger.info(
                     f"[DRY RUN] 🔔 WOULD EXECUTE: {direction} {symbol} on Slot #{slot.id}. "
-                    f"Size: ${position_size:.2f} (${slot.balance:.2f} × {self.config.slots.leverage}x)"
+                    f"Size: ${position_size:.2f} (${slot.balance:.2f} × {self._leverage}x)"
                 )
                 atr = self.atr.get_atr(symbol)
                 if atr:
@@ -325,11 +356,11 @@ class SignalEngine:
                 return
 
             # ═══ LIVE TRADING ═══
-            self._signal_log[-1]["action"] = "EXECUTED"
-            self._signal_log[-1]["slot"] = slot.id
+            log_entry["action"] = "EXECUTED"
+            log_entry["slot"] = slot.id
             logger.info(
                 f"[SIGNAL] {symbol}: Executing {direction} on Slot #{slot.id}. "
-                f"Size: ${position_size:.2f} (${slot.balance:.2f} × {self.config.slots.leverage}x)"
+                f"Size: ${position_size:.2f} (${slot.balance:.2f} × {self._leverage}x)"
             )
 
             # Create trade record
@@ -339,16 +370,17 @@ class SignalEngine:
                 side=side,
                 status=TradeStatus.PENDING,
             )
-            trade_id = self.db.create_trade(trade)
-            trade.id = trade_id
+            with self.db.transaction():
+                trade_id = self.db.create_trade(trade)
+                trade.id = trade_id
 
-            # Assign slot
-            self.slots.assign_slot(slot, trade)
+                # Assign slot
+                self.slots.assign_slot(slot, trade)
             self.coins.set_in_trade(symbol, True)
 
             # Set leverage for this symbol
             try:
-                await self.client.set_leverage(symbol, self.config.slots.leverage)
+                await self.client.set_leverage(symbol, self._leverage)
             except Exception as e:
                 # May fail if already set — that's OK
                 logger.debug(f"[SIGNAL] {symbol}: Set leverage result: {e}")
@@ -359,17 +391,18 @@ class SignalEngine:
             if not filled:
                 # Fill failed — release slot
                 logger.warning(f"[SIGNAL] {symbol}: Fill failed. Releasing slot #{slot.id}")
-                self.slots.release_slot(slot)
                 self.coins.set_in_trade(symbol, False)
                 trade.status = TradeStatus.CANCELLED
-                from exchange.models import ExitReason
                 trade.exit_reason = ExitReason.FILL_FAILED
-                self.db.update_trade(trade)
+                with self.db.transaction():
+                    self.slots.release_slot(slot)
+                    self.db.update_trade(trade)
                 return
 
             # Fill successful — set up risk management
-            self.slots.mark_in_trade(slot)
-            self.db.update_trade(trade)
+            with self.db.transaction():
+                self.slots.mark_in_trade(slot)
+                self.db.update_trade(trade)
 
             sl_set = await self.risk.setup_trade_risk(trade, coin)
             if not sl_set:
@@ -400,25 +433,25 @@ class SignalEngine:
 
     async def _handle_trade_closed(self, trade: Trade, exit_reason, pnl: Decimal):
         """Handle a trade being closed."""
-        from exchange.models import ExitReason
         symbol = trade.symbol
 
-        # Calculate actual P&L from position
-        self.risk.handle_trade_closed(trade, exit_reason, pnl, trade.fees)
+        # Trade close and slot P&L land in one commit
+        with self.db.transaction():
+            # Calculate actual P&L from position
+            self.risk.handle_trade_closed(trade, exit_reason, pnl, trade.fees)
 
-        # Update slot
-        slot = self.slots.get_slot(trade.slot_id)
-        if slot:
-            cooldown_minutes = self.config.execution.cooldown_minutes
-            self.slots.complete_trade(slot, trade, cooldown_minutes)
+            # Update slot
+            slot = self.slots.get_slot(trade.slot_id)
+            cooldown_minutes = self._cooldown_minutes
+            if slot:
+                self.slots.complete_trade(slot, trade, cooldown_minutes)
 
+        if slot:
             # Start cooldown timer for this asset
             self._set_cooldown(symbol, cooldown_minutes)
 
             # Schedule slot release from cooldown
-            asyncio.create_task(
-                self._cooldown_timer(slot.id, cooldown_minutes)
-            )
+            self._schedule_slot_release(slot.id, cooldown_minutes)
 
             # Send notification
             await self.notifier.send_trade_exit(
@@ -436,19 +469,48 @@ class SignalEngine:
     # ==================== Cooldown Management ====================
 
     def _is_in_cooldown(self, symbol: str) -> bool:
-        until = self._cooldowns.get(symbol)
-        if until and datetime.utcnow() < until:
-            return True
-        return False
+        state = self._sym_state.get(symbol)
+        return state is not None and time.monotonic() < state.cooldown_until
 
     def _set_cooldown(self, symbol: str, minutes: int):
-        self._cooldowns[symbol] = datetime.utcnow() + timedelta(minutes=minutes)
+        state = self._sym_state.get(symbol)
+        if state is None:
+            state = self._sym_state[symbol] = _SymbolState()
+        state.cooldown_until = time.monotonic() + minutes * 60
+
+    def _schedule_slot_release(self, slot_id: int, minutes: int):
+        heapq.heappush(self._cooldown_heap, (time.monotonic() + minutes * 60, slot_id))
+        self._cooldown_wake.set()  # new entry may be due before the current wait ends
+
+    async def run_cooldown_releases(self):
+        """Release slots from cooldown as their deadlines pass. Runs until stop()."""
+        self._running = True
+        heap = self._cooldown_heap
+        while self._running:
+            now = time.monotonic()
+            if heap and heap[0][0] <= now:
+                # Everything due goes out in one commit (e.g. several trades that
+                # closed in the same move, so their cooldowns end together)
+                with self.db.transaction():
+                    while heap and heap[0][0] <= now:
+                        _, slot_id = heapq.heappop(heap)
+                        self._release_slot_cooldown(slot_id)
+                continue
+
+            timeout = heap[0][0] - now if heap else None
+            self._cooldown_wake.clear()
+            try:
+                await asyncio.wait_for(self._cooldown_wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self._running = False
+        self._cooldown_wake.set()
 
-    async def _cooldown_timer(self, slot_id: int, minutes: int):
-        """Wait for cooldown period then release the slot."""
-        await asyncio.sleep(minutes * 60)
+    def _release_slot_cooldown(self, slot_id: int):
+        """Release the slot if it is still cooling down."""
         slot = self.slots.get_slot(slot_id)
         if slot:
-            from exchange.models import SlotState
             if slot.state == SlotState.COOLDOWN:
                 self.slots.release_from_cooldown(slot)
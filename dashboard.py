@@ -5,12 +5,15 @@ Runs on port 8080 alongside the main bot.
 """
 
 from __future__ import annotations
+import asyncio
 import os
-import json
+import hashlib
+import time
 from decimal import Decimal
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 from aiohttp import web
+import orjson
 import logging
 
 if TYPE_CHECKING:
@@ -21,22 +24,66 @@ logger = logging.getLogger(__name__)
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 
 
-class DecimalEncoder(json.JSONEncoder):
-    """JSON encoder that handles Decimal types."""
-    def default(self, o):
-        if isinstance(o, Decimal):
-            return float(o)
-        if isinstance(o, datetime):
-            return o.isoformat()
-        return super().default(o)
-
-
-def json_response(data, status=200):
-    return web.Response(
-        text=json.dumps(data, cls=DecimalEncoder),
-        content_type="application/json",
-        status=status,
-    )
+# /api/trades payload keys, in the column order of Database.SQL_RECENT_TRADES
+_TRADE_KEYS = (
+    "id", "slot_id", "symbol", "side", "entry_price", "qty", "status",
+    "pnl", "exit_reason", "highest_tp", "entry_time", "exit_time",
+)
+
+
+def _json_default(o):
+    """orjson fallback for types it does not serialize natively (datetime is native)."""
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Type is not JSON serializable: {type(o).__name__}")
+
+
+def json_response(data, status=200, request: Optional[web.Request] = None):
+    """
+    JSON response. When the request is passed, tag the body with an ETag and
+    answer 304 if the client already holds this exact payload.
+    """
+    body = orjson.dumps(data, default=_json_default)
+    if request is not None and status == 200:
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            body=body, content_type="application/json", headers={"ETag": etag},
+        )
+    return web.Response(body=body, content_type="application/json", status=status)
+
+
+# Bodies smaller than this go out uncompressed — gzip framing would outweigh the saving
+_COMPRESS_MIN_BYTES = 1024
+
+
+@web.middleware
+async def _compress_middleware(request: web.Request, handler):
+    """gzip/deflate larger responses when the client advertises support."""
+    resp = await handler(request)
+    if (
+        isinstance(resp, web.Response)
+        and resp.body is not None
+        and len(resp.body) >= _COMPRESS_MIN_BYTES
+        and "gzip" in request.headers.get("Accept-Encoding", "")
+    ):
+        resp.enable_compression(web.ContentCoding.gzip)
+    return resp
+
+
+def _tail_lines(path: str, n: int, max_bytes: int = 64 * 1024) -> List[str]:
+    """Last n lines of a file, reading at most the final max_bytes of it."""
+    if n <= 0 or not os.path.exists(path):
+        return []
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(max(0, size - max_bytes))
+        tail = f.read()
+    lines = tail.decode(errors="replace").splitlines()
+    if size > max_bytes:
+        lines = lines[1:]  # first line is likely cut mid-way
+    return [l.strip() for l in lines[-n:]]
 
 
 class Dashboard:
@@ -45,7 +92,13 @@ class Dashboard:
     def __init__(self, bot: "Bot", port: int = 8080):
         self.bot = bot
         self.port = port
-        self.app = web.Application()
+        # Config-derived constants — fixed for the life of the process
+        self._initial_balance_total = float(bot.config.slots.num_slots * bot.config.slots.initial_balance)
+        self._kill_switch_threshold = float(bot.config.risk.kill_switch_threshold)
+        # Dashboard HTML, read once in start()
+        self._html_bytes: Optional[bytes] = None
+        self._html_etag: Optional[str] = None
+        self.app = web.Application(middlewares=[_compress_middleware])
         self._setup_routes()
 
     def _setup_routes(self):
@@ -56,21 +109,33 @@ class Dashboard:
 
     async def start(self):
         """Start the dashboard web server."""
+        self._load_html()
         runner = web.AppRunner(self.app, access_log=None)
         await runner.setup()
         site = web.TCPSite(runner, "0.0.0.0", self.port)
         await site.start()
         logger.info(f"[DASHBOARD] Running on http://0.0.0.0:{self.port}")
 
+    def _load_html(self):
+        """Read the dashboard HTML into memory and tag it for conditional GETs."""
+        html_path = os.path.join(STATIC_DIR, "dashboard.html")
+        if os.path.exists(html_path):
+            with open(html_path, "rb") as f:
+                self._html_bytes = f.read()
+            self._html_etag = f'"{hashlib.md5(self._html_bytes).hexdigest()}"'
+
     # ─── Routes ───
 
     async def _serve_html(self, request: web.Request) -> web.Response:
-        """Serve the dashboard HTML."""
-        html_path = os.path.join(STATIC_DIR, "dashboard.html")
-        if os.path.exists(html_path):
-            with open(html_path, "r") as f:
-                return web.Response(text=f.read(), content_type="text/html")
-        return web.Response(text="Dashboard HTML not found", status=404)
+        """Serve the dashboard HTML from memory; 304 if the browser has it."""
+        if self._html_bytes is None:
+            return web.Response(text="Dashboard HTML not found", status=404)
+        headers = {"ETag": self._html_etag}
+        if request.headers.get("If-None-Match") == self._html_etag:
+            return web.Response(status=304, headers=headers)
+        return web.Response(
+            body=self._html_bytes, content_type="text/html", charset="utf-8", headers=headers,
+        )
 
     async def _api_dashboard(self, request: web.Request) -> web.Response:
         """Main dashboard data endpoint — returns everything in one call."""
@@ -82,19 +147,21 @@ class Dashboard:
             # Overview
             now = datetime.utcnow()
             uptime_seconds = (now - se._start_time).total_seconds()
-            total_balance = float(bot.db.get_total_balance())
-            kill_switch = bot.db.get_state("kill_switch_triggered") == "true"
+            # Slots and kill-switch state live in memory; SlotManager writes
+            # through to SQLite, so there is no need to read them back per poll
+            total_balance = float(bot.slot_manager.get_total_balance())
+            kill_switch = bot.kill_switch.is_triggered
 
             overview = {
                 "mode": "DRY RUN" if bot.config.execution.dry_run else "LIVE",
                 "total_balance": total_balance,
-                "initial_balance": float(bot.config.slots.num_slots * bot.config.slots.initial_balance),
-                "total_pnl": total_balance - float(bot.config.slots.num_slots * bot.config.slots.initial_balance),
+                "initial_balance": self._initial_balance_total,
+                "total_pnl": total_balance - self._initial_balance_total,
                 "uptime_seconds": int(uptime_seconds),
                 "kill_switch_active": not kill_switch,
                 "kill_switch_triggered": kill_switch,
-                "kill_switch_threshold": float(bot.config.risk.kill_switch_threshold),
-                "last_data_seconds_ago": int((now - se.last_data_time).total_seconds()),
+                "kill_switch_threshold": self._kill_switch_threshold,
+                "last_data_seconds_ago": int(time.monotonic() - se.last_data_mono),
                 "ws_public_connected": bot.ws._public_ws is not None,
                 "ws_private_connected": bot.ws._private_ws is not None,
                 "leverage": bot.config.slots.leverage,
@@ -104,23 +171,18 @@ class Dashboard:
             # Coins — HA status + price + ATR
             coins = []
             for symbol in bot.coin_selector.symbols:
-                ha_series = ha._ha_series.get(symbol, [])
-                last_ha = ha_series[-1] if ha_series else None
-
-                # Find last flip time by scanning backward
-                last_flip_time = None
-                if len(ha_series) >= 2:
-                    for i in range(len(ha_series) - 1, 0, -1):
-                        if ha_series[i].is_bullish != ha_series[i - 1].is_bullish:
-                            ts = ha_series[i].timestamp
-                            last_flip_time = datetime.utcfromtimestamp(ts / 1000 if ts > 1e12 else ts).isoformat()
-                            break
+                last_ha = ha.get_latest(symbol)
+                ts = ha.get_last_flip_ts(symbol)
+                last_flip_time = (
+                    datetime.utcfromtimestamp(ts / 1000 if ts > 1e12 else ts).isoformat()
+                    if ts is not None else None
+                )
 
                 coins.append({
                     "symbol": symbol,
                     "ha_direction": "BULL" if (last_ha and last_ha.is_bullish) else "BEAR",
                     "price": float(se._prices.get(symbol, 0)),
-                    "atr": float(bot.atr_calc.get_atr(symbol) or 0),
+                    "atr": bot.atr_calc.get_atr_float(symbol) or 0.0,
                     "last_flip": last_flip_time,
                     "in_cooldown": se._is_in_cooldown(symbol),
                     "in_trade": bot.coin_selector.is_in_trade(symbol) if hasattr(bot.coin_selector, 'is_in_trade') else False,
@@ -128,7 +190,7 @@ class Dashboard:
 
             # Slots
             slots = []
-            for slot in bot.db.get_all_slots():
+            for slot in bot.slot_manager.get_all_slots():
                 slots.append({
                     "id": slot.id,
                     "balance": float(slot.balance),
@@ -187,27 +249,10 @@ class Dashboard:
     async def _api_trades(self, request: web.Request) -> web.Response:
         """Return recent trade history."""
         try:
-            rows = self.bot.db.conn.execute(
-                "SELECT * FROM trades ORDER BY id DESC LIMIT 50"
-            ).fetchall()
-
-            trades = []
-            for r in rows:
-                trades.append({
-                    "id": r["id"],
-                    "slot_id": r["slot_id"],
-                    "symbol": r["symbol"],
-                    "side": r["side"],
-                    "entry_price": r["entry_price"],
-                    "qty": r["qty"],
-                    "status": r["status"],
-                    "pnl": r["pnl"],
-                    "exit_reason": r["exit_reason"],
-                    "highest_tp": r["highest_tp_reached"],
-                    "entry_time": r["entry_time"],
-                    "exit_time": r["exit_time"],
-                })
-            return json_response({"trades": trades})
+            # Plain tuples instead of sqlite3.Row — zipped straight onto the keys
+            rows = self.bot.db.get_recent_trade_rows(50)
+            trades = [dict(zip(_TRADE_KEYS, r)) for r in rows]
+            return json_response({"trades": trades}, request=request)
 
         except Exception as e:
             logger.error(f"[DASHBOARD] Trades API error: {e}")
@@ -217,12 +262,7 @@ class Dashboard:
         """Return last N lines from bot.log."""
         try:
             n = int(request.query.get("n", 50))
-            log_path = "data/bot.log"
-            lines = []
-            if os.path.exists(log_path):
-                with open(log_path, "r") as f:
-                    all_lines = f.readlines()
-                    lines = [l.strip() for l in all_lines[-n:]]
-            return json_response({"lines": lines, "total": len(lines)})
+            lines = await asyncio.to_thread(_tail_lines, "data/bot.log", n)
+            return json_response({"lines": lines, "total": len(lines)}, request=request)
         except Exception as e:
             return json_response({"error": str(e)}, status=500)
@@ -5,56 +5,218 @@ Handles authentication, rate limiting, and all needed endpoints.
 
 from __future__ import annotations
 import asyncio
-import hashlib
 import hmac
-import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import aiohttp
+import orjson
+from yarl import URL
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Integer wall clock: no float rounding in the ms timestamps Bybit validates
+_now_ns = time.time_ns
+
+# Shared by all clients that opt into offloaded signing; created on first use
+_sign_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_sign_pool() -> ThreadPoolExecutor:
+    global _sign_pool
+    if _sign_pool is None:
+        _sign_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bybit-sign")
+    return _sign_pool
+
+
+def _serialize_and_sign(secret: bytes, prefix: bytes, params: Optional[Dict]) -> Tuple[bytes, str]:
+    """Worker-thread body for a signed POST: orjson encode + HMAC (both release the GIL)."""
+    body = orjson.dumps(params or {})
+    return body, hmac.digest(secret, prefix + body, "sha256").hex()
+
+
+def _json_dumps(obj: Any) -> str:
+    # aiohttp's json_serialize must return str
+    return orjson.dumps(obj).decode()
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    Build the app-wide HTTP session: one keep-alive connection pool shared by the
+    REST client and notifier. Must be called from inside the running event loop.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=32,
+        ttl_dns_cache=300,
+        keepalive_timeout=75,
+        enable_cleanup_closed=True,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=10, connect=3),
+        json_serialize=_json_dumps,
+    )
+
+
+class TokenBucket:
+    """
+    Client-side token bucket. Callers reserve a token up front (tokens may go
+    negative) and sleep off the deficit, so concurrent waiters queue fairly
+    instead of all waking at once.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "last_refill")
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+
+    async def acquire(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + self.rate * (now - self.last_refill))
+        self.last_refill = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
 
 class BybitRestClient:
     """Async Bybit V5 REST API wrapper."""
 
-    def __init__(self, api_key: str, api_secret: str, base_url: str):
+    # Requests/sec per endpoint group (/v5/<group>/...), kept under Bybit's default quotas
+    RATE_LIMITS: Dict[str, float] = {
+        "market": 50,
+        "order": 10,
+        "position": 10,
+        "account": 10,
+    }
+    DEFAULT_RATE_LIMIT = 10
+    QUERY_CACHE_SIZE = 256  # encoded GET queries kept per endpoint
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        base_url: str,
+        session: aiohttp.ClientSession,
+        offload_signing: bool = False,
+    ):
         self.api_key = api_key
         self.api_secret = api_secret
+        self._api_secret_bytes = api_secret.encode("utf-8")
         self.base_url = base_url
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._session = session  # owned by the caller (see create_http_session)
         self._recv_window = "5000"
-
-    async def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
-        return self._session
-
-    async def close(self):
-        if self._session and not self._session.closed:
-            await self._session.close()
-
-    def _sign(self, timestamp: str, params_str: str) -> str:
-        """Generate HMAC-SHA256 signature."""
-        param_str = f"{timestamp}{self.api_key}{self._recv_window}{params_str}"
-        return hmac.new(
-            self.api_secret.encode("utf-8"),
-            param_str.encode("utf-8"),
-            hashlib.sha256,
-        ).hexdigest()
-
-    def _auth_headers(self, timestamp: str, signature: str) -> Dict[str, str]:
-        return {
-            "X-BAPI-API-KEY": self.api_key,
-            "X-BAPI-SIGN": signature,
+        # A thread hop costs more than one HMAC, so this only pays off when
+        # many signed POSTs are issued at once; off by default
+        self.offload_signing = offload_signing
+
+        # Static pieces of every signed request, built once
+        self._key_rw_bytes = f"{api_key}{self._recv_window}".encode("utf-8")
+        self._static_headers = {
+            "X-BAPI-API-KEY": api_key,
             "X-BAPI-SIGN-TYPE": "2",
-            "X-BAPI-TIMESTAMP": timestamp,
             "X-BAPI-RECV-WINDOW": self._recv_window,
             "Content-Type": "application/json",
         }
 
+        self._buckets: Dict[str, TokenBucket] = {
+            group: TokenBucket(rate) for group, rate in self.RATE_LIMITS.items()
+        }
+        # (method, endpoint, signed) -> specialized request coroutine, built on first use
+        self._callers: Dict[Tuple[str, str, bool], Callable] = {}
+
+    async def aclose(self):
+        """Detach from the shared HTTP session; closing it is the owner's job."""
+        self._callers.clear()
+        logger.info("[REST] Client closed (shared session left to its owner)")
+
+    def _bucket_for(self, endpoint: str) -> TokenBucket:
+        group = endpoint.split("/", 3)[2]  # "/v5/order/create" -> "order"
+        bucket = self._buckets.get(group)
+        if bucket is None:
+            bucket = self._buckets[group] = TokenBucket(self.DEFAULT_RATE_LIMIT)
+        return bucket
+
+    def _sign(self, timestamp: str, payload: bytes) -> str:
+        """Generate HMAC-SHA256 signature over timestamp + api_key + recv_window + payload."""
+        msg = timestamp.encode("ascii") + self._key_rw_bytes + payload
+        # One-shot C path; avoids building an HMAC object per request
+        return hmac.digest(self._api_secret_bytes, msg, "sha256").hex()
+
+    def _auth_headers(self, timestamp: str, signature: str) -> Dict[str, str]:
+        return {**self._static_headers, "X-BAPI-SIGN": signature, "X-BAPI-TIMESTAMP": timestamp}
+
+    def _build_caller(
+        self, method: str, endpoint: str, signed: bool
+    ) -> Callable[[Optional[Dict]], Awaitable[Dict[str, Any]]]:
+        """
+        Specialize the request path for one endpoint: URL, rate bucket, method
+        and signing mode are resolved here once rather than on every call.
+        """
+        session = self._session
+        base_url = URL(f"{self.base_url}{endpoint}")
+        bucket = self._bucket_for(endpoint)
+        sign = self._sign
+        auth_headers = self._auth_headers
+        secret = self._api_secret_bytes
+        key_rw = self._key_rw_bytes
+        offload = signed and self.offload_signing
+        plain_headers = {"Content-Type": "application/json"}
+
+        if method == "GET":
+            # Polled endpoints repeat the same few param sets; keep their encoded
+            # URL + query bytes so only the HMAC is redone per call
+            query_cache: Dict[frozenset, Tuple[URL, bytes]] = {}
+
+            async def call(params: Optional[Dict]) -> Dict[str, Any]:
+                # Throttle before stamping the request so the timestamp is fresh when sent
+                await bucket.acquire()
+                if params:
+                    key = frozenset(params.items())
+                    cached = query_cache.get(key)
+                    if cached is None:
+                        if len(query_cache) >= self.QUERY_CACHE_SIZE:
+                            query_cache.clear()
+                        # Encode the query once; the signed string is the one on the wire
+                        u = base_url.with_query(sorted(params.items()))
+                        cached = query_cache[key] = (u, u.raw_query_string.encode("utf-8"))
+                    url, query = cached
+                else:
+                    url, query = base_url, b""
+                headers = plain_headers
+                if signed:
+                    timestamp = str(_now_ns() // 1_000_000)
+                    headers = auth_headers(timestamp, sign(timestamp, query))
+                async with session.get(url, headers=headers) as resp:
+                    return await resp.json(loads=orjson.loads)
+        else:
+            async def call(params: Optional[Dict]) -> Dict[str, Any]:
+                await bucket.acquire()
+                # Body is serialized once so the signed bytes are exactly what goes on the wire
+                headers = plain_headers
+                if offload:
+                    timestamp = str(_now_ns() // 1_000_000)
+                    body, sig = await asyncio.get_running_loop().run_in_executor(
+                        _get_sign_pool(), _serialize_and_sign,
+                        secret, timestamp.encode("ascii") + key_rw, params,
+                    )
+                    headers = auth_headers(timestamp, sig)
+                else:
+                    body = orjson.dumps(params or {})
+                    if signed:
+                        timestamp = str(_now_ns() // 1_000_000)
+                        headers = auth_headers(timestamp, sign(timestamp, body))
+                async with session.post(base_url, headers=headers, data=body) as resp:
+                    return await resp.json(loads=orjson.loads)
+
+        return call
+
     async def _request(
         self,
         method: str,
@@ -63,31 +225,13 @@ class BybitRestClient:
         signed: bool = False,
     ) -> Dict[str, Any]:
         """Make an API request with optional authentication."""
-        session = await self._get_session()
-        url = f"{self.base_url}{endpoint}"
-        timestamp = str(int(time.time() * 1000))
-
-        headers = {"Content-Type": "application/json"}
-
-        if signed:
-            if method == "GET":
-                query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
-                sig = self._sign(timestamp, query)
-                headers = self._auth_headers(timestamp, sig)
-                url = f"{url}?{query}" if query else url
-                params = None
-            else:
-                body_str = json.dumps(params or {})
-                sig = self._sign(timestamp, body_str)
-                headers = self._auth_headers(timestamp, sig)
+        key = (method, endpoint, signed)
+        call = self._callers.get(key)
+        if call is None:
+            call = self._callers[key] = self._build_caller(method, endpoint, signed)
 
         try:
-            if method == "GET":
-                async with session.get(url, headers=headers, params=params if not signed else None) as resp:
-                    data = await resp.json()
-            else:
-                async with session.post(url, headers=headers, json=params) as resp:
-                    data = await resp.json()
+            data = await call(params)
 
             if data.get("retCode") != 0:
                 logger.error(
@@ -120,23 +264,47 @@ class BybitRestClient:
         symbol: str,
         interval: str,
         limit: int = 50,
+        start: Optional[int] = None,
     ) -> List[Dict]:
         """
         Get historical kline/candle data.
         Interval: 1, 3, 5, 15, 30, 60, 120, 240, 360, 720, D, W, M
+        start (Unix ms) limits the result to candles starting at or after it.
         Returns newest first — caller should reverse for chronological order.
         """
-        data = await self._request(
-            "GET", "/v5/market/kline",
-            {
-                "category": "linear",
-                "symbol": symbol,
-                "interval": interval,
-                "limit": str(limit),
-            },
-        )
+        params = {
+            "category": "linear",
+            "symbol": symbol,
+            "interval": interval,
+            "limit": str(limit),
+        }
+        if start is not None:
+            params["start"] = str(start)
+        data = await self._request("GET", "/v5/market/kline", params)
         return data.get("result", {}).get("list", [])
 
+    async def get_klines_batched(
+        self,
+        requests: List[Tuple],
+        max_concurrency: int = 5,
+    ) -> List[Any]:
+        """
+        Fetch many (symbol, interval, limit[, start]) kline series in one go.
+        Duplicate requests are coalesced into a single call; the unique ones run
+        concurrently, at most max_concurrency in flight, under the market rate bucket.
+        Results are in request order; a failed fetch yields its exception instead.
+        """
+        unique = list(dict.fromkeys(requests))
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(*args) -> List[Dict]:
+            async with sem:
+                return await self.get_klines(*args)
+
+        results = await asyncio.gather(*(fetch(*r) for r in unique), return_exceptions=True)
+        by_key = dict(zip(unique, results))
+        return [by_key[r] for r in requests]
+
     async def get_orderbook(self, symbol: str, limit: int = 1) -> Dict:
         """Get orderbook (top of book)."""
         data = await self._request(
@@ -191,6 +359,16 @@ class BybitRestClient:
         logger.info(f"[ORDER] Cancelling: {order_id} on {symbol}")
         return await self._request("POST", "/v5/order/cancel", params, signed=True)
 
+    async def cancel_all(self, symbol: Optional[str] = None, settle_coin: str = "USDT") -> Dict:
+        """Cancel every open order in one call (one symbol, or all linear USDT orders)."""
+        params = {"category": "linear"}
+        if symbol:
+            params["symbol"] = symbol
+        else:
+            params["settleCoin"] = settle_coin
+        logger.info(f"[ORDER] Cancelling all orders on {symbol or settle_coin}")
+        return await self._request("POST", "/v5/order/cancel-all", params, signed=True)
+
     async def amend_order(
         self,
         symbol: str,
@@ -252,6 +430,16 @@ class BybitRestClient:
         data = await self._request("GET", "/v5/order/realtime", params, signed=True)
         return data.get("result", {}).get("list", [])
 
+    async def query_order(self, symbol: str, order_id: str) -> Optional[Dict]:
+        """Get one order by id (open or recently closed), or None if Bybit doesn't know it."""
+        data = await self._request(
+            "GET", "/v5/order/realtime",
+            {"category": "linear", "symbol": symbol, "orderId": order_id},
+            signed=True,
+        )
+        orders = data.get("result", {}).get("list", [])
+        return orders[0] if orders else None
+
     async def get_wallet_balance(self) -> Dict:
         """Get unified account wallet balance."""
         data = await self._request(
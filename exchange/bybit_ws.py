@@ -6,17 +6,21 @@ Auto-reconnects on disconnect.
 
 from __future__ import annotations
 import asyncio
-import hashlib
 import hmac
-import json
+import random
+import sys
 import time
 from decimal import Decimal
-from typing import Any, Callable, Coroutine, Dict, List, Optional, Set
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+import orjson
 import websockets
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Integer wall clock: no float rounding in the ms timestamps Bybit validates
+_now_ns = time.time_ns
+
 # Type for async callback: receives (topic, data)
 WSCallback = Callable[[str, Dict[str, Any]], Coroutine[Any, Any, None]]
 
@@ -24,6 +28,12 @@ WSCallback = Callable[[str, Dict[str, Any]], Coroutine[Any, Any, None]]
 class BybitWSManager:
     """Manages Bybit V5 WebSocket connections."""
 
+    # Reconnect backoff bounds (seconds); doubles per failed attempt
+    RECONNECT_MIN_SEC = 0.1
+    RECONNECT_MAX_SEC = 30.0
+    # Bybit rejects subscribe ops with too many args; stay at the documented 10
+    MAX_ARGS_PER_OP = 10
+
     def __init__(
         self,
         public_url: str,
@@ -35,6 +45,7 @@ class BybitWSManager:
         self.private_url = private_url
         self.api_key = api_key
         self.api_secret = api_secret
+        self._api_secret_bytes = api_secret.encode("utf-8")
 
         self._public_ws: Optional[websockets.WebSocketClientProtocol] = None
         self._private_ws: Optional[websockets.WebSocketClientProtocol] = None
@@ -43,21 +54,44 @@ class BybitWSManager:
         self._private_subs: Set[str] = set()
 
         self._callbacks: Dict[str, List[WSCallback]] = {}
+        self._detached: Dict[str, List[WSCallback]] = {}  # fire-and-forget callbacks
+        # full topic -> resolved (ordered, detached) callbacks
+        self._routes: Dict[str, Tuple[List[WSCallback], List[WSCallback]]] = {}
+        self._detached_tasks: Set[asyncio.Task] = set()
+        # Recv loops only parse + enqueue; each connection has its own worker that
+        # runs handlers in arrival order, so a slow public handler (signal entry)
+        # never holds up order/execution/position frames
+        self._public_inbox: asyncio.Queue = asyncio.Queue(maxsize=10000)
+        self._private_inbox: asyncio.Queue = asyncio.Queue(maxsize=10000)
+        self._worker_tasks: List[asyncio.Task] = []
         self._running = False
         self._ping_interval = 20  # seconds
 
-    def on(self, topic_prefix: str, callback: WSCallback):
+    def on(self, topic_prefix: str, callback: WSCallback, *, ordered: bool = True):
         """
         Register a callback for a topic prefix.
-        E.g., on("kline.240", handler) will match "kline.240.BTCUSDT"
+        E.g., on("kline.240", handler) will match "kline.240.BTCUSDT",
+        on("tickers", handler) will match "tickers.BTCUSDT".
+        Prefixes are whole dotted segments: "kline.5" never matches "kline.15.X".
+
+        ordered=False schedules the callback as a task without awaiting it —
+        only for handlers that don't care about frame order (e.g. a price cache).
         """
-        if topic_prefix not in self._callbacks:
-            self._callbacks[topic_prefix] = []
-        self._callbacks[topic_prefix].append(callback)
+        table = self._callbacks if ordered else self._detached
+        table.setdefault(topic_prefix, []).append(callback)
+        self._routes.clear()
 
     async def start(self):
         """Start both public and private WebSocket connections."""
         self._running = True
+        # A supervised restart must not spawn second workers and break ordering
+        if not self._worker_tasks or any(t.done() for t in self._worker_tasks):
+            for task in self._worker_tasks:
+                task.cancel()
+            self._worker_tasks = [
+                asyncio.create_task(self._dispatch_worker(self._public_inbox), name="ws-dispatch-pub"),
+                asyncio.create_task(self._dispatch_worker(self._private_inbox), name="ws-dispatch-prv"),
+            ]
         await asyncio.gather(
             self._run_public(),
             self._run_private(),
@@ -70,61 +104,79 @@ class BybitWSManager:
             await self._public_ws.close()
         if self._private_ws:
             await self._private_ws.close()
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks = []
 
     async def subscribe_public(self, topics: List[str]):
         """Subscribe to public topics."""
-        new_topics = [t for t in topics if t not in self._public_subs]
+        new_topics = [t for t in dict.fromkeys(topics) if t not in self._public_subs]
         if not new_topics:
             return
 
         self._public_subs.update(new_topics)
 
         if self._public_ws:
-            msg = {"op": "subscribe", "args": new_topics}
-            await self._public_ws.send(json.dumps(msg))
+            await self._send_op(self._public_ws, "subscribe", new_topics)
             logger.info(f"[WS-PUB] Subscribed: {new_topics}")
 
     async def unsubscribe_public(self, topics: List[str]):
         """Unsubscribe from public topics."""
-        existing = [t for t in topics if t in self._public_subs]
+        existing = [t for t in dict.fromkeys(topics) if t in self._public_subs]
         if not existing:
             return
 
         self._public_subs -= set(existing)
+        for t in existing:
+            self._routes.pop(t, None)
 
         if self._public_ws:
-            msg = {"op": "unsubscribe", "args": existing}
-            await self._public_ws.send(json.dumps(msg))
+            await self._send_op(self._public_ws, "unsubscribe", existing)
             logger.info(f"[WS-PUB] Unsubscribed: {existing}")
 
+    async def _send_op(self, ws, op: str, topics: List[str]):
+        """Send a (un)subscribe op in frames of at most MAX_ARGS_PER_OP topics each."""
+        step = self.MAX_ARGS_PER_OP
+        for i in range(0, len(topics), step):
+            msg = {"op": op, "args": topics[i:i + step]}
+            # orjson bytes sent as a text frame as-is — no decode to str
+            await ws.send(orjson.dumps(msg), text=True)
+            await asyncio.sleep(0)  # let the recv side run between frames
+
+    @staticmethod
+    def _symbol_topics(symbol: str) -> List[str]:
+        """
+        Public topics for one symbol, interned so the strings parsed out of
+        every frame resolve to the same objects (cheap hashing/equality in the
+        route and per-symbol dicts).
+        """
+        symbol = sys.intern(symbol)
+        return [
+            sys.intern(f"kline.240.{symbol}"),   # 4H candles for HA (live + confirmed)
+            sys.intern(f"kline.5.{symbol}"),     # 5M candles — trigger HA check on close
+            sys.intern(f"kline.15.{symbol}"),    # 15M candles for ATR
+            sys.intern(f"tickers.{symbol}"),     # Price updates for TP monitoring
+        ]
+
     async def subscribe_symbols(self, symbols: List[str]):
         """Subscribe to all needed streams for a list of symbols."""
         topics = []
         for symbol in symbols:
-            topics.extend([
-                f"kline.240.{symbol}",   # 4H candles for HA (live + confirmed)
-                f"kline.5.{symbol}",     # 5M candles — trigger HA check on close
-                f"kline.15.{symbol}",    # 15M candles for ATR
-                f"tickers.{symbol}",     # Price updates for TP monitoring
-            ])
+            topics.extend(self._symbol_topics(symbol))
         await self.subscribe_public(topics)
 
     async def unsubscribe_symbols(self, symbols: List[str]):
         """Unsubscribe all streams for a list of symbols."""
         topics = []
         for symbol in symbols:
-            topics.extend([
-                f"kline.240.{symbol}",
-                f"kline.5.{symbol}",
-                f"kline.15.{symbol}",
-                f"tickers.{symbol}",
-            ])
+            topics.extend(self._symbol_topics(symbol))
         await self.unsubscribe_public(topics)
 
     # ==================== Internal Connection Management ====================
 
     async def _run_public(self):
         """Run public WebSocket with auto-reconnect."""
+        backoff = self.RECONNECT_MIN_SEC
         while self._running:
             try:
                 async with websockets.connect(
@@ -132,30 +184,38 @@ class BybitWSManager:
                     ping_interval=self._ping_interval,
                     ping_timeout=10,
                     close_timeout=5,
+                    max_size=2**20,
+                    # Frames are small and frequent; deflate costs more CPU than it saves
+                    compression=None,
                 ) as ws:
                     self._public_ws = ws
                     logger.info(f"[WS-PUB] Connected to {self.public_url}")
 
                     # Resubscribe on reconnect
                     if self._public_subs:
-                        msg = {"op": "subscribe", "args": list(self._public_subs)}
-                        await ws.send(json.dumps(msg))
+                        await self._send_op(ws, "subscribe", list(self._public_subs))
                         logger.info(f"[WS-PUB] Resubscribed to {len(self._public_subs)} topics")
 
-                    async for raw in ws:
+                    # Raw frame bytes go straight to orjson, skipping the UTF-8 decode to str
+                    recv = ws.recv
+                    raw = await recv(decode=False)
+                    backoff = self.RECONNECT_MIN_SEC  # first frame arrived: link is healthy
+                    while True:
                         await self._handle_public_message(raw)
+                        raw = await recv(decode=False)
 
             except websockets.ConnectionClosed as e:
-                logger.warning(f"[WS-PUB] Connection closed: {e}. Reconnecting in 3s...")
+                logger.warning(f"[WS-PUB] Connection closed: {e}. Reconnecting...")
             except Exception as e:
-                logger.error(f"[WS-PUB] Error: {e}. Reconnecting in 5s...")
+                logger.error(f"[WS-PUB] Error: {e}. Reconnecting...")
 
             self._public_ws = None
             if self._running:
-                await asyncio.sleep(3)
+                backoff = await self._reconnect_wait("[WS-PUB]", backoff)
 
     async def _run_private(self):
         """Run private WebSocket with authentication and auto-reconnect."""
+        backoff = self.RECONNECT_MIN_SEC
         while self._running:
             try:
                 async with websockets.connect(
@@ -163,6 +223,9 @@ class BybitWSManager:
                     ping_interval=self._ping_interval,
                     ping_timeout=10,
                     close_timeout=5,
+                    max_size=2**20,
+                    # Frames are small and frequent; deflate costs more CPU than it saves
+                    compression=None,
                 ) as ws:
                     self._private_ws = ws
                     logger.info(f"[WS-PRV] Connected to {self.private_url}")
@@ -173,49 +236,64 @@ class BybitWSManager:
                     # Subscribe to private topics
                     private_topics = ["order", "execution", "position"]
                     msg = {"op": "subscribe", "args": private_topics}
-                    await ws.send(json.dumps(msg))
+                    await ws.send(orjson.dumps(msg), text=True)
                     logger.info(f"[WS-PRV] Subscribed to private topics")
 
-                    async for raw in ws:
+                    # Raw frame bytes go straight to orjson, skipping the UTF-8 decode to str
+                    recv = ws.recv
+                    raw = await recv(decode=False)
+                    backoff = self.RECONNECT_MIN_SEC  # first frame arrived: link is healthy
+                    while True:
                         await self._handle_private_message(raw)
+                        raw = await recv(decode=False)
 
             except websockets.ConnectionClosed as e:
-                logger.warning(f"[WS-PRV] Connection closed: {e}. Reconnecting in 3s...")
+                logger.warning(f"[WS-PRV] Connection closed: {e}. Reconnecting...")
             except Exception as e:
-                logger.error(f"[WS-PRV] Error: {e}. Reconnecting in 5s...")
+                logger.error(f"[WS-PRV] Error: {e}. Reconnecting...")
 
             self._private_ws = None
             if self._running:
-                await asyncio.sleep(3)
+                backoff = await self._reconnect_wait("[WS-PRV]", backoff)
+
+    async def _reconnect_wait(self, tag: str, backoff: float) -> float:
+        """
+        Sleep a jittered backoff (between backoff and 2x backoff) so many
+        clients dropped at once don't reconnect in lockstep; returns the next backoff.
+        """
+        delay = backoff * (1 + random.random())
+        logger.info(f"{tag} Reconnecting in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        return min(backoff * 2, self.RECONNECT_MAX_SEC)
 
     async def _authenticate(self, ws):
         """Authenticate private WebSocket connection."""
-        expires = int(time.time() * 1000) + 10000
-        signature = hmac.new(
-            self.api_secret.encode("utf-8"),
+        expires = _now_ns() // 1_000_000 + 10000
+        signature = hmac.digest(
+            self._api_secret_bytes,
             f"GET/realtime{expires}".encode("utf-8"),
-            hashlib.sha256,
-        ).hexdigest()
+            "sha256",
+        ).hex()
 
         auth_msg = {
             "op": "auth",
             "args": [self.api_key, expires, signature],
         }
-        await ws.send(json.dumps(auth_msg))
+        await ws.send(orjson.dumps(auth_msg), text=True)
 
         # Wait for auth response
         resp = await asyncio.wait_for(ws.recv(), timeout=10)
-        data = json.loads(resp)
+        data = orjson.loads(resp)
         if data.get("success"):
             logger.info("[WS-PRV] Authenticated successfully")
         else:
             logger.error(f"[WS-PRV] Authentication failed: {data}")
             raise ConnectionError("WebSocket authentication failed")
 
-    async def _handle_public_message(self, raw: str):
+    async def _handle_public_message(self, raw: bytes):
         """Route public WebSocket messages to callbacks."""
         try:
-            data = json.loads(raw)
+            data = orjson.loads(raw)
 
             # Ignore pongs and subscription confirmations
             if "op" in data:
@@ -227,17 +305,17 @@ class BybitWSManager:
             if not topic:
                 return
 
-            await self._dispatch(topic, data)
+            self._enqueue(self._public_inbox, sys.intern(topic), data)
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.warning(f"[WS-PUB] Invalid JSON: {raw[:100]}")
         except Exception as e:
             logger.error(f"[WS-PUB] Handler error: {e}", exc_info=True)
 
-    async def _handle_private_message(self, raw: str):
+    async def _handle_private_message(self, raw: bytes):
         """Route private WebSocket messages to callbacks."""
         try:
-            data = json.loads(raw)
+            data = orjson.loads(raw)
 
             if "op" in data:
                 return
@@ -246,22 +324,74 @@ class BybitWSManager:
             if not topic:
                 return
 
-            await self._dispatch(topic, data)
+            self._enqueue(self._private_inbox, sys.intern(topic), data)
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.warning(f"[WS-PRV] Invalid JSON: {raw[:100]}")
         except Exception as e:
             logger.error(f"[WS-PRV] Handler error: {e}", exc_info=True)
 
-    async def _dispatch(self, topic: str, data: Dict):
-        """Dispatch message to matching callbacks."""
-        for prefix, callbacks in self._callbacks.items():
-            if topic.startswith(prefix):
-                for cb in callbacks:
-                    try:
-                        await cb(topic, data)
-                    except Exception as e:
-                        logger.error(
-                            f"[WS] Callback error for {prefix}: {e}",
-                            exc_info=True,
-                        )
+    @staticmethod
+    def _enqueue(inbox: asyncio.Queue, topic: str, data: Dict):
+        try:
+            inbox.put_nowait((topic, data))
+        except asyncio.QueueFull:
+            logger.warning(f"[WS] Inbox full, dropping {topic}")
+
+    async def _dispatch_worker(self, inbox: asyncio.Queue):
+        """
+        Drain the inbox so slow handlers never stall the socket reads.
+        Routes are resolved once per topic and cached; the usual single ordered
+        handler is awaited directly, without a wrapper coroutine per frame.
+        """
+        get = inbox.get
+        routes = self._routes
+        while True:
+            topic, data = await get()
+            route = routes.get(topic)
+            if route is None:
+                route = self._resolve(topic)
+            callbacks, detached = route
+            if detached:
+                self._spawn_detached(detached, topic, data)
+            try:
+                if len(callbacks) == 1:
+                    await callbacks[0](topic, data)
+                elif callbacks:
+                    # Independent handlers for the same topic run concurrently
+                    await asyncio.gather(
+                        *(self._run_callback(cb, topic, data) for cb in callbacks)
+                    )
+            except Exception as e:
+                logger.error(f"[WS] Callback error for {topic}: {e}", exc_info=True)
+
+    @staticmethod
+    def _lookup(table: Dict[str, List[WSCallback]], parts: List[str]) -> List[WSCallback]:
+        """Two-segment prefix first, then first segment."""
+        callbacks = None
+        if len(parts) > 1:
+            callbacks = table.get(f"{parts[0]}.{parts[1]}")
+        if callbacks is None:
+            callbacks = table.get(parts[0], [])
+        return callbacks
+
+    def _resolve(self, topic: str) -> Tuple[List[WSCallback], List[WSCallback]]:
+        """Look up (ordered, detached) callbacks for a topic and cache the result."""
+        parts = topic.split(".", 2)
+        route = (self._lookup(self._callbacks, parts), self._lookup(self._detached, parts))
+        self._routes[topic] = route
+        return route
+
+    async def _run_callback(self, cb: WSCallback, topic: str, data: Dict):
+        try:
+            await cb(topic, data)
+        except Exception as e:
+            logger.error(f"[WS] Callback error for {topic}: {e}", exc_info=True)
+
+    def _spawn_detached(self, detached: List[WSCallback], topic: str, data: Dict):
+        """Fire-and-forget callbacks that don't care about frame order."""
+        for cb in detached:
+            # Keep a reference until done so the task isn't garbage-collected mid-flight
+            task = asyncio.create_task(self._run_callback(cb, topic, data))
+            self._detached_tasks.add(task)
+            task.add_done_callback(self._detached_tasks.discard)
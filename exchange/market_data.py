@@ -0,0 +1,79 @@
+"""
+Market Data Cache — latest top of book per symbol, fed from the tickers stream.
+Lets order placement read best bid/ask from memory instead of a REST round trip.
+"""
+
+from __future__ import annotations
+import asyncio
+import time
+from decimal import Decimal
+from typing import Dict, Optional
+from exchange.models import OrderBookSnap
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataCache:
+    """
+    Best bid/ask per symbol from `tickers.<SYMBOL>` pushes (bid1Price/ask1Price).
+    Tickers arrive as deltas, so a side missing from a push keeps its last value.
+    Prices stay as the exchange's strings until someone actually asks for them.
+    """
+
+    def __init__(self):
+        # symbol -> [bid str, ask str, exchange ts (ms), local monotonic ts]
+        self._books: Dict[str, list] = {}
+        # symbol -> event set by the next push that moves bid or ask
+        self._waiters: Dict[str, asyncio.Event] = {}
+
+    def update_ticker(self, symbol: str, tick: dict, ts: int = 0):
+        """Record bid1/ask1 from one ticker push (snapshot or delta)."""
+        bid = tick.get("bid1Price")
+        ask = tick.get("ask1Price")
+        if self._waiters and (bid or ask):
+            waiter = self._waiters.pop(symbol, None)
+            if waiter is not None:
+                waiter.set()
+        book = self._books.get(symbol)
+        if book is None:
+            if not bid or not ask:
+                return  # need both sides before the entry is usable
+            self._books[symbol] = [bid, ask, ts, time.monotonic()]
+            return
+        if bid:
+            book[0] = bid
+        if ask:
+            book[1] = ask
+        book[2] = ts
+        book[3] = time.monotonic()
+
+    def get(self, symbol: str, max_age_sec: float) -> Optional[OrderBookSnap]:
+        """Top of book if it was refreshed within max_age_sec, else None."""
+        book = self._books.get(symbol)
+        if book is None or time.monotonic() - book[3] > max_age_sec:
+            return None
+        return OrderBookSnap(
+            symbol=symbol,
+            best_bid=Decimal(book[0]),
+            best_ask=Decimal(book[1]),
+            timestamp=book[2],
+        )
+
+    async def wait_for_update(self, symbol: str, timeout: float) -> bool:
+        """Wait for the next bid/ask push on a symbol. False if none came within timeout."""
+        waiter = self._waiters.get(symbol)
+        if waiter is None:
+            waiter = self._waiters[symbol] = asyncio.Event()
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            if self._waiters.get(symbol) is waiter:
+                del self._waiters[symbol]
+
+    def remove_symbol(self, symbol: str):
+        """Forget a symbol (e.g., when it drops out of the coin list)."""
+        self._books.pop(symbol, None)
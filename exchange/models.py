@@ -5,9 +5,9 @@ Uses Decimal for all monetary/price calculations — no floating point errors.
 
 from __future__ import annotations
 from dataclasses import dataclass, field
-from decimal import Decimal
+from decimal import Decimal, ROUND_DOWN, ROUND_UP
 from enum import Enum
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 from datetime import datetime
 
 
@@ -15,6 +15,11 @@ class Side(Enum):
     LONG = "Buy"
     SHORT = "Sell"
 
+    @property
+    def sign(self) -> int:
+        """+1 for LONG, -1 for SHORT — lets price math fold in direction without branching."""
+        return 1 if self is Side.LONG else -1
+
 
 class SlotState(Enum):
     AVAILABLE = "AVAILABLE"
@@ -41,55 +46,82 @@ class ExitReason(Enum):
     FILL_FAILED = "FILL_FAILED"
 
 
-@dataclass
+@dataclass(slots=True)
 class Candle:
-    """Standard OHLCV candle."""
+    """Standard OHLCV candle. Float-valued — feeds indicators only; orders use Decimal."""
     timestamp: int          # Unix ms
-    open: Decimal
-    high: Decimal
-    low: Decimal
-    close: Decimal
-    volume: Decimal
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
     confirmed: bool = True
 
+    @classmethod
+    def from_row(cls, row: list) -> "Candle":
+        """REST kline row: [startTime, open, high, low, close, volume, turnover]."""
+        # Indexed float() calls — no row slice or map iterator per candle
+        return cls(
+            int(row[0]), float(row[1]), float(row[2]), float(row[3]),
+            float(row[4]), float(row[5]), True,
+        )
+
+    @classmethod
+    def from_ws(cls, k: dict, confirmed: Optional[bool] = None) -> "Candle":
+        """WS kline entry (start/open/high/low/close/volume/confirm keys)."""
+        get = k.get
+        return cls(
+            int(get("start", 0)),
+            float(get("open", 0)),
+            float(get("high", 0)),
+            float(get("low", 0)),
+            float(get("close", 0)),
+            float(get("volume", 0)),
+            get("confirm", False) if confirmed is None else confirmed,
+        )
 
-@dataclass
+
+@dataclass(slots=True)
 class HACandle:
-    """Heiken Ashi candle."""
+    """Heiken Ashi candle. Float-valued — only used for signal direction, never for sizing."""
     timestamp: int
-    ha_open: Decimal
-    ha_close: Decimal
-    ha_high: Decimal
-    ha_low: Decimal
+    ha_open: float
+    ha_close: float
+    ha_high: float
+    ha_low: float
+    # Direction flags, fixed at construction (a doji is neither)
+    is_bullish: bool = field(init=False, repr=False)
+    is_bearish: bool = field(init=False, repr=False)
 
-    @property
-    def is_bullish(self) -> bool:
-        return self.ha_close > self.ha_open
-
-    @property
-    def is_bearish(self) -> bool:
-        return self.ha_close < self.ha_open
+    def __post_init__(self):
+        self.is_bullish = self.ha_close > self.ha_open
+        self.is_bearish = self.ha_close < self.ha_open
 
 
-@dataclass
+@dataclass(slots=True)
 class Signal:
     """Trading signal from HA flip detection."""
     symbol: str
     side: Side
-    timestamp: datetime
+    timestamp: int          # Unix ms — start of the 4H candle that flipped
     ha_candle: HACandle
 
 
-@dataclass
+@dataclass(slots=True)
 class TPLevel:
     """Single take profit level."""
     level: int              # 1-10
     price: Decimal
     hit: bool = False
     hit_time: Optional[datetime] = None
+    # float mirror of price for the per-tick hit check; price stays the order value
+    price_f: float = field(init=False, repr=False, compare=False)
 
+    def __post_init__(self):
+        self.price_f = float(self.price)
 
-@dataclass
+
+@dataclass(slots=True)
 class Trade:
     """Represents a single trade with full lifecycle."""
     id: Optional[int] = None
@@ -114,9 +146,36 @@ class Trade:
     cooldown_until: Optional[datetime] = None
     fill_attempts: int = 0
     created_at: datetime = field(default_factory=datetime.utcnow)
+    # field name -> (Decimal, its str); entry/SL/ATR values are rewritten on every
+    # update but rarely change, and a reassigned field misses on identity
+    _text_cache: Dict[str, Tuple[Decimal, str]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    # Index of the lowest TP level not yet hit (levels are hit in order); in memory only
+    next_tp_idx: int = field(default=0, init=False, repr=False, compare=False)
+    # TP level number -> price, built from tp_levels for the SL trail; in memory only
+    tp_by_level: Dict[int, Decimal] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    # TP prices as ascending float keys (negated for shorts) for bisecting ticks; in memory only
+    tp_keys: List[float] = field(default_factory=list, init=False, repr=False, compare=False)
+    # SL price string last accepted by the exchange; in memory only
+    last_sl_sent: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    def dec_text(self, name: str) -> Optional[str]:
+        """Storage text for a Decimal field (None when unset or zero), memoized per value."""
+        value = getattr(self, name)
+        if not value:
+            return None
+        cached = self._text_cache.get(name)
+        if cached is not None and cached[0] is value:
+            return cached[1]
+        text = str(value)
+        self._text_cache[name] = (value, text)
+        return text
 
 
-@dataclass
+@dataclass(slots=True)
 class Slot:
     """Trading slot with independent balance."""
     id: int
@@ -129,7 +188,7 @@ class Slot:
     updated_at: datetime = field(default_factory=datetime.utcnow)
 
 
-@dataclass
+@dataclass(slots=True)
 class CoinInfo:
     """Tracked coin metadata."""
     symbol: str
@@ -142,9 +201,90 @@ class CoinInfo:
     prev_ha: Optional[HACandle] = None
     cooldown_until: Optional[datetime] = None
     in_active_trade: bool = False
+    # Fixed-point format specs derived once from the steps, e.g. tick 0.0005 -> ".4f"
+    _price_spec: str = field(init=False, repr=False)
+    _qty_spec: str = field(init=False, repr=False)
+    # Steps as exact integer ratios, so grid snapping is integer floor/ceil division
+    _tick_ratio: Tuple[int, int] = field(init=False, repr=False)
+    _qty_step_ratio: Tuple[int, int] = field(init=False, repr=False)
+    # Tick is a power of ten (0.01, 0.0001, 1): snapping is a single quantize
+    _tick_quantizes: bool = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Validated once here so the rounding helpers below never re-check
+        if self.tick_size <= 0 or self.qty_step <= 0:
+            raise ValueError(
+                f"{self.symbol}: tick_size {self.tick_size} / qty_step {self.qty_step} must be > 0"
+            )
+        self._price_spec = f".{max(0, -self.tick_size.as_tuple().exponent)}f"
+        self._qty_spec = f".{max(0, -self.qty_step.as_tuple().exponent)}f"
+        self._tick_ratio = self.tick_size.as_integer_ratio()
+        self._qty_step_ratio = self.qty_step.as_integer_ratio()
+        self._tick_quantizes = self.tick_size.as_tuple().digits == (1,)
+
+    def fmt_price(self, price: Decimal) -> str:
+        """Order-ready price string at tick precision (never scientific notation)."""
+        return format(price, self._price_spec)
+
+    def fmt_qty(self, qty: Decimal) -> str:
+        """Order-ready quantity string at qty_step precision."""
+        return format(qty, self._qty_spec)
+
+    def to_ticks(self, price: Decimal, rounding: str) -> int:
+        """Price as an integer count of ticks — exact, and cheap to compare or step."""
+        if rounding == ROUND_DOWN or rounding == ROUND_UP:
+            # Exact integer division on the ratios; only the sign needs Decimal semantics
+            p_num, p_den = price.as_integer_ratio()
+            t_num, t_den = self._tick_ratio
+            num, den = abs(p_num) * t_den, p_den * t_num
+            ticks = num // den if rounding == ROUND_DOWN else -(-num // den)
+            return -ticks if p_num < 0 else ticks
+        return int((price / self.tick_size).to_integral_value(rounding=rounding))
+
+    def from_ticks(self, ticks: int) -> Decimal:
+        """Tick count back to a Decimal price carrying the tick's precision."""
+        return ticks * self.tick_size
+
+    def qty_for_notional(self, notional: Decimal, price: Decimal) -> Decimal:
+        """Largest qty on the qty_step grid with qty * price <= notional (price > 0)."""
+        n_num, n_den = notional.as_integer_ratio()
+        p_num, p_den = price.as_integer_ratio()
+        s_num, s_den = self._qty_step_ratio
+        steps = (n_num * p_den * s_den) // (n_den * p_num * s_num)
+        return steps * self.qty_step
+
+    def round_price(self, price: Decimal, rounding: str) -> Decimal:
+        """Snap a price onto this coin's tick grid."""
+        if self._tick_quantizes:
+            return price.quantize(self.tick_size, rounding=rounding)
+        return self.from_ticks(self.to_ticks(price, rounding))
+
+    def price_ladder(self, start: Decimal, step: Decimal, count: int, rounding: str) -> List[Decimal]:
+        """
+        start + n*step for n = 1..count, each snapped to the tick grid.
+        Same result as round_price per level, but the ratios are taken once and
+        each level is a few integer ops plus one Decimal multiply.
+        """
+        if self._tick_quantizes or (rounding != ROUND_DOWN and rounding != ROUND_UP):
+            return [self.round_price(start + n * step, rounding) for n in range(1, count + 1)]
+        a_num, a_den = start.as_integer_ratio()
+        s_num, s_den = step.as_integer_ratio()
+        t_num, t_den = self._tick_ratio
+        # level n in ticks = (a_num*s_den + n*s_num*a_den) * t_den / (a_den*s_den*t_num)
+        base, inc = a_num * s_den * t_den, s_num * a_den * t_den
+        den = a_den * s_den * t_num
+        down = rounding == ROUND_DOWN
+        tick = self.tick_size
+        prices = []
+        for n in range(1, count + 1):
+            num = base + n * inc
+            mag = abs(num)
+            ticks = mag // den if down else -(-mag // den)
+            prices.append((-ticks if num < 0 else ticks) * tick)
+        return prices
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class OrderBookSnap:
     """Top of book snapshot."""
     symbol: str
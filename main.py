@@ -5,13 +5,16 @@ Ties all components together: startup, data loading, WS connections, shutdown.
 
 from __future__ import annotations
 import asyncio
+import atexit
 import os
+import queue
 import sys
 import signal
+import time
 from decimal import Decimal
-from datetime import datetime
-from typing import List
+from typing import Any, List
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
 # Load .env file before anything else
 try:
@@ -23,22 +26,28 @@ except ImportError:
 # Create data dir before FileHandler
 os.makedirs("data", exist_ok=True)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)-7s | %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("data/bot.log"),
-    ],
+# Configure logging. The event loop only enqueues records; a listener thread
+# does the stdout/file writes so disk I/O never stalls a WS handler.
+_log_formatter = logging.Formatter(
+    "%(asctime)s | %(levelname)-7s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
 )
+_log_handlers = [logging.StreamHandler(sys.stdout), logging.FileHandler("data/bot.log")]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+_log_listener.start()
+atexit.register(_log_listener.stop)  # drains queued records on any exit path
 logger = logging.getLogger(__name__)
 
 from config import BotConfig
-from exchange.models import Candle, SlotState
-from exchange.bybit_rest import BybitRestClient
+from exchange.models import Candle, ExitReason, SlotState
+from exchange.bybit_rest import BybitRestClient, create_http_session
 from exchange.bybit_ws import BybitWSManager
+from exchange.market_data import MarketDataCache
 from core.heiken_ashi import HeikenAshiEngine
 from core.atr import ATRCalculator
 from core.coin_selector import CoinSelector
@@ -51,6 +60,14 @@ from storage.database import Database
 from notifications.telegram import TelegramNotifier
 from dashboard import Dashboard
 
+SUPERVISOR_MIN_BACKOFF_SEC = 1.0
+SUPERVISOR_MAX_BACKOFF_SEC = 60.0
+
+
+def _interval_ms(interval: str) -> int:
+    """Bybit minute interval ("15", "240") → candle length in ms."""
+    return int(interval) * 60_000
+
 
 class Bot:
     """Main bot orchestrator."""
@@ -61,30 +78,41 @@ class Bot:
 
         # Initialize components
         self.db = Database(config.storage.db_path)
+        self.http = create_http_session()
         self.client = BybitRestClient(
             api_key=config.exchange.api_key,
             api_secret=config.exchange.api_secret,
             base_url=config.exchange.base_url,
+            session=self.http,
+            offload_signing=config.exchange.offload_signing,
         )
         self.notifier = TelegramNotifier(
             bot_token=config.notifications.telegram_bot_token,
             chat_id=config.notifications.telegram_chat_id,
             enabled=config.notifications.enabled,
+            session=self.http,
         )
 
         # Core engines
         self.ha_engine = HeikenAshiEngine()
         self.atr_calc = ATRCalculator(period=config.strategy.atr_period)
+        # (interval, candles) fetched per symbol at boot and when coins are added
+        self._history_series = (
+            ("240", config.coins.ha_history_candles),
+            ("15", config.strategy.atr_period + 10),
+        )
         self.coin_selector = CoinSelector(
             num_coins=config.coins.num_coins,
             excluded_stablecoins=config.coins.excluded_stablecoins,
+            instruments_ttl_sec=config.coins.instruments_cache_hours * 3600,
         )
 
         # Trading components
         self.slot_manager = SlotManager(config.slots, self.db)
-        self.order_executor = OrderExecutor(self.client, config.execution)
+        self.market_data = MarketDataCache()
+        self.order_executor = OrderExecutor(self.client, config.execution, self.market_data)
         self.risk_manager = RiskManager(
-            self.client, config.strategy, self.atr_calc, self.db
+            self.client, config.strategy, self.atr_calc, self.db, coins=self.coin_selector
         )
 
         # Signal engine
@@ -99,6 +127,7 @@ class Bot:
             client=self.client,
             db=self.db,
             notifier=self.notifier,
+            market_data=self.market_data,
         )
 
         # Kill switch
@@ -130,7 +159,6 @@ class Bot:
         logger.info("=" * 60)
 
         # 1. Connect database
-        os.makedirs(os.path.dirname(self.config.storage.db_path) or "data", exist_ok=True)
         self.db.connect()
 
         # 2. Check kill switch state
@@ -140,6 +168,7 @@ class Bot:
                 "Clear it manually: UPDATE bot_state SET value='false' WHERE key='kill_switch_triggered'"
             )
             await self.notifier.send("🚨 Bot attempted to start but kill switch is still triggered.")
+            await self.notifier.flush()
             return
 
         # 3. Initialize slots
@@ -166,7 +195,9 @@ class Bot:
         self.ws.on("kline.15", self.signal_engine.on_kline_15)
         self.ws.on("tickers", self.signal_engine.on_ticker)
         self.ws.on("position", self.signal_engine.on_position_update)
+        self.ws.on("position", self.kill_switch.on_position_update)
         self.ws.on("execution", self.signal_engine.on_execution)
+        self.ws.on("order", self.order_executor.on_order_update)
 
         # 8. Subscribe to coin streams
         await self.ws.subscribe_symbols(self.coin_selector.symbols)
@@ -195,13 +226,51 @@ class Bot:
         # Start dashboard web server
         await self.dashboard.start()
 
-        await asyncio.gather(
-            self.ws.start(),
-            self.kill_switch.start(),
-            self._coin_refresh_loop(),
-            self._daily_summary_loop(),
-            self._health_check_loop(),
-        )
+        loops = {
+            "ws": self.ws.start,
+            "kill-switch": self.kill_switch.start,
+            "cooldown-releases": self.signal_engine.run_cooldown_releases,
+            "sl-updates": self.risk_manager.run_sl_updates,
+            "coin-refresh": self._coin_refresh_loop,
+            "daily-summary": self._daily_summary_loop,
+            "health-check": self._health_check_loop,
+            "db-checkpoint": self._db_checkpoint_loop,
+        }
+        tasks = [
+            asyncio.create_task(self._supervise(name, factory), name=name)
+            for name, factory in loops.items()
+        ]
+        await asyncio.gather(*tasks)
+
+    async def _supervise(self, name: str, factory):
+        """Run a long-lived loop, restarting it with backoff if it crashes.
+
+        A crash in one loop is logged and retried without tearing down the
+        others; a normal return (shutdown) ends supervision.
+        """
+        backoff = SUPERVISOR_MIN_BACKOFF_SEC
+        while True:
+            started = time.monotonic()
+            try:
+                await factory()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not self._running:
+                    return
+                # A loop that ran for a while before crashing starts fresh
+                if time.monotonic() - started > SUPERVISOR_MAX_BACKOFF_SEC:
+                    backoff = SUPERVISOR_MIN_BACKOFF_SEC
+                logger.error(
+                    f"[SUPERVISOR] Task '{name}' crashed: {e}. "
+                    f"Restarting in {backoff:.0f}s",
+                    exc_info=True,
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, SUPERVISOR_MAX_BACKOFF_SEC)
+                if not self._running:
+                    return
 
     async def stop(self):
         """Graceful shutdown."""
@@ -209,10 +278,14 @@ class Bot:
         self._running = False
 
         await self.kill_switch.stop()
+        self.signal_engine.stop()
+        self.risk_manager.stop()
         await self.ws.stop()
-        await self.client.close()
+        await self.client.aclose()
         await self.notifier.send_bot_status("Stopped 🔴")
         await self.notifier.close()
+        await self.http.close()
+        self.risk_manager.flush_progress()  # TP/SL progress still in the write window
         self.db.close()
 
         logger.info("[SHUTDOWN] Complete.")
@@ -221,59 +294,123 @@ class Bot:
         """Load historical 4H and 15M candles for all tracked coins."""
         symbols = self.coin_selector.symbols
         logger.info(f"[BOOT] Loading historical data for {len(symbols)} coins...")
+        await self._load_history(symbols)
+        logger.info("[BOOT] Historical data loaded for all coins.")
 
+    async def _load_history(self, symbols: List[str]):
+        """Fetch 4H (HA) and 15M (ATR) candles for symbols in one batch and build their state."""
+        series = self._history_series
+        now_ms = time.time_ns() // 1_000_000
+        requests = []
+        cached_rows = []
         for symbol in symbols:
+            for interval, limit in series:
+                # Closed candles never change: reuse the cached ones, fetch only the tail
+                cached = self._cached_klines(symbol, interval, limit, now_ms)
+                cached_rows.append(cached)
+                start = int(cached[0][0]) + _interval_ms(interval) if cached else None
+                requests.append((symbol, interval, limit, start))
+
+        # Symbols and intervals are independent — overlap their REST round-trips,
+        # a few at a time (the REST client's token buckets still cap the request rate)
+        results = await self.client.get_klines_batched(
+            requests, max_concurrency=self.config.coins.max_concurrent_history_loads,
+        )
+        merged = [
+            self._merge_cached_klines(req, cached, fresh, now_ms)
+            for req, cached, fresh in zip(requests, cached_rows, results)
+        ]
+        # Tails that don't continue the cache: drop it and refetch the whole window
+        retry = [i for i, rows in enumerate(merged) if rows is None]
+        if retry:
+            full = [(*requests[i][:3], None) for i in retry]  # no start=: full window
+            results = await self.client.get_klines_batched(
+                full, max_concurrency=self.config.coins.max_concurrent_history_loads,
+            )
+            for i, req, fresh in zip(retry, full, results):
+                merged[i] = self._merge_cached_klines(req, [], fresh, now_ms)
+        for i, symbol in enumerate(symbols):
+            self._apply_symbol_history(symbol, merged[2 * i], merged[2 * i + 1])
+
+    def _cached_klines(self, symbol: str, interval: str, limit: int, now_ms: int) -> List[list]:
+        """Cached closed klines (newest first), or [] when disabled or too stale to extend."""
+        if not self.config.storage.kline_cache:
+            return []
+        rows = self.db.get_cached_klines(symbol, interval, limit)
+        # A gap of a full window can't be filled by one tail request — refetch everything
+        if rows and (now_ms - int(rows[0][0])) // _interval_ms(interval) >= limit:
+            return []
+        return rows
+
+    def _merge_cached_klines(self, request: tuple, cached: List[list], fresh: Any, now_ms: int) -> Any:
+        """
+        Newest-first fresh tail + cached rows, trimmed to limit; persists newly closed rows.
+        None when the tail doesn't start right after the newest cached candle (an
+        empty tail from an API error, or a gap) — the caller refetches in full.
+        """
+        if isinstance(fresh, BaseException) or not self.config.storage.kline_cache:
+            return fresh
+        symbol, interval, limit, _ = request
+        step = _interval_ms(interval)
+        if cached:
+            if not fresh or int(fresh[-1][0]) != int(cached[0][0]) + step:
+                return None
+            rows = (fresh + cached)[:limit]
+        else:
+            rows = fresh
+        closed = [r for r in fresh if int(r[0]) + step <= now_ms]
+        if rows:
             try:
-                # Fetch 4H candles for HA calculation
-                raw_4h = await self.client.get_klines(
-                    symbol=symbol,
-                    interval="240",
-                    limit=self.config.coins.ha_history_candles,
-                )
-
-                candles_4h = self._parse_klines(raw_4h)
-                if candles_4h:
-                    self.ha_engine.build_from_history(symbol, candles_4h)
-                else:
-                    logger.warning(f"[BOOT] {symbol}: No 4H candle data")
-
-                # Fetch 15M candles for ATR
-                raw_15m = await self.client.get_klines(
-                    symbol=symbol,
-                    interval="15",
-                    limit=self.config.strategy.atr_period + 10,
-                )
-
-                candles_15m = self._parse_klines(raw_15m)
-                if candles_15m:
-                    self.atr_calc.initialize(symbol, candles_15m)
-                else:
-                    logger.warning(f"[BOOT] {symbol}: No 15M candle data")
+                self.db.store_klines(symbol, interval, closed, keep_from_ts=int(rows[-1][0]))
+            except Exception as e:
+                logger.warning(f"[BOOT] {symbol}: Kline cache write failed: {e}")
+        return rows
 
-                # Small delay to respect rate limits
-                await asyncio.sleep(0.1)
+    def _apply_symbol_history(self, symbol: str, raw_4h: Any, raw_15m: Any):
+        """
+        Build HA + ATR state for one symbol from its fetched klines.
+        Both engines read the raw rows directly, so the well-formed case is a
+        single pass per series with no intermediate Candle lists.
+        """
+        for raw in (raw_4h, raw_15m):
+            if isinstance(raw, BaseException):
+                logger.error(f"[BOOT] {symbol}: Error loading history: {raw}")
+                return
 
-            except Exception as e:
-                logger.error(f"[BOOT] {symbol}: Error loading history: {e}")
+        try:
+            # Rows go straight into the HA recurrence; no Candle per row
+            built = self.ha_engine.build_from_rows(symbol, raw_4h)
+        except (IndexError, TypeError, ValueError):
+            # Malformed rows: parse one by one so the bad ones get reported
+            candles_4h = self._parse_klines(raw_4h)
+            built = self.ha_engine.build_from_history(symbol, candles_4h)
+        if not built:
+            logger.warning(f"[BOOT] {symbol}: No 4H candle data")
 
-        logger.info("[BOOT] Historical data loaded for all coins.")
+        if raw_15m:
+            try:
+                self.atr_calc.initialize_from_rows(symbol, raw_15m)
+            except (IndexError, TypeError, ValueError):
+                self.atr_calc.initialize(symbol, self._parse_klines(raw_15m))
+        else:
+            logger.warning(f"[BOOT] {symbol}: No 15M candle data")
 
     def _parse_klines(self, raw_klines: List) -> List[Candle]:
         """Parse raw Bybit kline data into Candle objects. Reverse to oldest-first."""
+        # Bybit V5 kline format: [startTime, open, high, low, close, volume, turnover]
+        from_row = Candle.from_row
+        try:
+            # Fast path: the whole response is well-formed (the normal case)
+            return [from_row(k) for k in reversed(raw_klines)]
+        except (IndexError, TypeError, ValueError):
+            pass
+
+        # Slow path: skip and report only the malformed rows
         candles = []
         for k in reversed(raw_klines):
-            # Bybit V5 kline format: [startTime, open, high, low, close, volume, turnover]
             try:
-                candles.append(Candle(
-                    timestamp=int(k[0]),
-                    open=Decimal(str(k[1])),
-                    high=Decimal(str(k[2])),
-                    low=Decimal(str(k[3])),
-                    close=Decimal(str(k[4])),
-                    volume=Decimal(str(k[5])),
-                    confirmed=True,
-                ))
-            except (IndexError, ValueError) as e:
+                candles.append(from_row(k))
+            except (IndexError, TypeError, ValueError) as e:
                 logger.warning(f"[BOOT] Bad kline data: {k}: {e}")
         return candles
 
@@ -290,54 +427,42 @@ class Bot:
                 logger.info("[COINS] Refreshing coin list...")
                 added, removed = await self.coin_selector.refresh(self.client)
 
-                # Subscribe to new coins
-                if added:
-                    await self.ws.subscribe_symbols(added)
-                    for symbol in added:
-                        await self._load_single_coin_history(symbol)
-
                 # Unsubscribe removed coins (only if not in active trade)
                 safe_to_remove = [
                     s for s in removed
                     if not self.coin_selector.is_in_trade(s)
                 ]
+
+                # Subscribe frames, unsubscribe frames and the history fetch
+                # for new coins are independent round trips — overlap them
+                steps = []
+                if added:
+                    steps.append(self.ws.subscribe_symbols(added))
+                    steps.append(self._load_history(added))
                 if safe_to_remove:
-                    await self.ws.unsubscribe_symbols(safe_to_remove)
-                    for symbol in safe_to_remove:
-                        self.ha_engine.remove_symbol(symbol)
-                        self.atr_calc.remove_symbol(symbol)
+                    steps.append(self.ws.unsubscribe_symbols(safe_to_remove))
+                if steps:
+                    await asyncio.gather(*steps)
+
+                # Drop engine state only once the unsubscribe has gone out
+                for symbol in safe_to_remove:
+                    self.ha_engine.remove_symbol(symbol)
+                    self.atr_calc.remove_symbol(symbol)
+                    self.market_data.remove_symbol(symbol)
 
             except Exception as e:
                 logger.error(f"[COINS] Refresh error: {e}", exc_info=True)
 
-    async def _load_single_coin_history(self, symbol: str):
-        """Load historical data for a single newly added coin."""
-        try:
-            raw_4h = await self.client.get_klines(symbol=symbol, interval="240", limit=50)
-            candles_4h = self._parse_klines(raw_4h)
-            if candles_4h:
-                self.ha_engine.build_from_history(symbol, candles_4h)
-
-            raw_15m = await self.client.get_klines(symbol=symbol, interval="15", limit=24)
-            candles_15m = self._parse_klines(raw_15m)
-            if candles_15m:
-                self.atr_calc.initialize(symbol, candles_15m)
-
-        except Exception as e:
-            logger.error(f"[BOOT] {symbol}: Error loading history: {e}")
-
     async def _daily_summary_loop(self):
         """Send daily P&L summary at 00:05 UTC."""
         while self._running:
-            now = datetime.utcnow()
-            # Calculate seconds until next 00:05 UTC
-            tomorrow = now.replace(hour=0, minute=5, second=0, microsecond=0)
-            if now >= tomorrow:
-                from datetime import timedelta
-                tomorrow += timedelta(days=1)
-            wait_seconds = (tomorrow - now).total_seconds()
-
-            await asyncio.sleep(wait_seconds)
+            # Seconds until the next 00:05 UTC, on epoch seconds (UTC days are 86400s)
+            now_ts = time.time()
+            next_ts = (now_ts // 86400) * 86400 + 300
+            if next_ts <= now_ts:
+                next_ts += 86400
+
+            await asyncio.sleep(next_ts - now_ts)
             if not self._running:
                 break
 
@@ -363,7 +488,6 @@ class Bot:
                 break
 
             try:
-                now = datetime.utcnow()
                 issues = []
 
                 # Check WebSocket connectivity
@@ -373,7 +497,7 @@ class Bot:
                     issues.append("Private WebSocket disconnected")
 
                 # Check data freshness via signal engine
-                seconds_since_data = (now - self.signal_engine.last_data_time).total_seconds()
+                seconds_since_data = time.monotonic() - self.signal_engine.last_data_mono
                 if seconds_since_data > stale_threshold:
                     issues.append(f"No WS data received for {int(seconds_since_data)}s")
 
@@ -387,6 +511,20 @@ class Bot:
             except Exception as e:
                 logger.error(f"[HEALTH] Check error: {e}")
 
+    async def _db_checkpoint_loop(self):
+        """Fold the SQLite WAL into the DB file periodically, on the DB's checkpoint thread."""
+        interval = self.config.storage.checkpoint_interval_sec
+
+        while self._running:
+            await asyncio.sleep(interval)
+            if not self._running:
+                break
+
+            try:
+                await self.db.checkpoint()
+            except Exception as e:
+                logger.warning(f"[DB] Checkpoint error: {e}")
+
     async def _reconcile_positions(self):
         """
         On startup, compare DB trades with actual Bybit positions.
@@ -433,13 +571,13 @@ class Bot:
                         f"[RECONCILE] STALE trade: {symbol} in DB but no Bybit position. "
                         f"Marking as closed."
                     )
-                    from exchange.models import ExitReason
-                    self.risk_manager.handle_trade_closed(
-                        trade, ExitReason.SL_HIT, Decimal("0"), Decimal("0")
-                    )
-                    slot = self.slot_manager.get_slot(trade.slot_id)
-                    if slot:
-                        self.slot_manager.release_slot(slot)
+                    with self.db.transaction():
+                        self.risk_manager.handle_trade_closed(
+                            trade, ExitReason.SL_HIT, Decimal("0"), Decimal("0")
+                        )
+                        slot = self.slot_manager.get_slot(trade.slot_id)
+                        if slot:
+                            self.slot_manager.release_slot(slot)
 
             matched = bybit_symbols & db_symbols
             logger.info(
@@ -465,7 +603,7 @@ async def main():
 
     # Graceful shutdown handler
     if sys.platform != "win32":
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         def handle_signal(sig):
             logger.info(f"Received signal {sig}. Initiating shutdown...")
             asyncio.create_task(bot.stop())
@@ -484,5 +622,19 @@ async def main():
         sys.exit(1)
 
 
+def run():
+    """Run main() on uvloop when it is available (Linux/macOS), else the stock loop."""
+    if sys.platform != "win32":
+        try:
+            import uvloop
+        except ImportError:
+            pass
+        else:
+            if sys.version_info >= (3, 12):
+                return asyncio.run(main(), loop_factory=uvloop.new_event_loop)
+            uvloop.install()
+    return asyncio.run(main())
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    run()
@@ -3,56 +3,172 @@ Telegram Notifier — Sends trade alerts, status updates, and kill switch warnin
 """
 
 from __future__ import annotations
+import asyncio
 import aiohttp
-from typing import Optional
+import orjson
+from typing import List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Message templates — only the slots change per call
+_TPL_ENTRY = (
+    "{emoji} <b>NEW TRADE — {direction}</b>\n\n"
+    "Symbol: <code>{symbol}</code>\n"
+    "Entry: <code>{entry_price}</code>\n"
+    "Qty: <code>{qty}</code>\n"
+    "SL: <code>{sl_price}</code> (-2.5%)\n\n"
+    "Slot: #{slot_id} (${slot_balance})"
+)
+_TPL_EXIT = (
+    "{emoji} <b>TRADE CLOSED — {direction}</b>\n\n"
+    "Symbol: <code>{symbol}</code>\n"
+    "PnL: <code>${pnl}</code>\n"
+    "Reason: {exit_reason}\n"
+    "Highest TP: {highest_tp}/10\n\n"
+    "Slot #{slot_id} → ${new_balance}"
+)
+_TPL_SL_TRAILED = (
+    "📈 <b>SL TRAILED</b>\n"
+    "Symbol: <code>{symbol}</code>\n"
+    "New SL: <code>{new_sl}</code> (TP{tp_level} hit)"
+)
+_TPL_DAILY_SUMMARY = "📊 <b>DAILY SUMMARY</b>\n\n{summary}"
+_TPL_BOT_STATUS = "🤖 <b>BOT</b>: {status}"
+
+# side -> (entry emoji, direction)
+_SIDE_LABELS = {"Buy": ("🟢", "LONG"), "Sell": ("🔴", "SHORT")}
+
 
 class TelegramNotifier:
-    """Sends messages via Telegram Bot API."""
+    """
+    Sends messages via Telegram Bot API.
+    send() only enqueues; a background worker posts, merging queued messages
+    into one request (up to Telegram's 4096-char limit) and pacing requests.
+    """
+
+    MAX_MESSAGE_LEN = 4096
+    QUEUE_SIZE = 256
+    SEND_INTERVAL_SEC = 1.0   # Telegram allows ~1 msg/s per chat
 
-    def __init__(self, bot_token: str, chat_id: str, enabled: bool = True):
+    def __init__(
+        self,
+        bot_token: str,
+        chat_id: str,
+        enabled: bool = True,
+        session: Optional[aiohttp.ClientSession] = None,
+    ):
         self.bot_token = bot_token
         self.chat_id = chat_id
         self.enabled = enabled and bool(bot_token) and bool(chat_id)
-        self._session: Optional[aiohttp.ClientSession] = None
+        # A shared session is owned by the caller; only close one we created ourselves
+        self._session: Optional[aiohttp.ClientSession] = session
+        self._owns_session = session is None
+        # Built once — only "text" changes per message
+        self._url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        self._base_payload = {
+            "chat_id": chat_id,
+            "disable_web_page_preview": True,
+        }
+        self._queue: asyncio.Queue[Tuple[str, str]] = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._worker: Optional[asyncio.Task] = None
 
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
+            # Standalone use: a small keep-alive pool so bursts reuse the TLS connection
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
+            self._owns_session = True
         return self._session
 
+    async def flush(self, timeout: float = 10.0):
+        """Wait until everything queued so far has been posted (or timeout)."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[TG] Flush timed out with {self._queue.qsize()} messages queued")
+
     async def close(self):
-        if self._session and not self._session.closed:
+        await self.flush()
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
+        if self._owns_session and self._session and not self._session.closed:
             await self._session.close()
 
     async def send(self, message: str, parse_mode: str = "HTML"):
-        """Send a message to the configured chat."""
+        """Queue a message for the configured chat; never waits on the network."""
         if not self.enabled:
             logger.debug(f"[TG] (disabled) Would send: {message[:100]}...")
             return
 
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._drain())
+        if self._queue.full():
+            # Drop the oldest so the latest state always gets through
+            self._queue.get_nowait()
+            self._queue.task_done()
+            logger.warning("[TG] Queue full, dropped oldest message")
+        self._queue.put_nowait((message, parse_mode))
+
+    async def _drain(self):
+        """Background worker: batch queued messages and post them at a steady pace."""
+        carry: Optional[Tuple[str, str]] = None
+        while True:
+            message, parse_mode = carry or await self._queue.get()
+            carry = None
+            parts: List[str] = [message]
+            size = len(message)
+            taken = 1
+            # Merge whatever else is already waiting with the same parse mode
+            while not self._queue.empty():
+                nxt = self._queue.get_nowait()
+                if nxt[1] != parse_mode or size + 2 + len(nxt[0]) > self.MAX_MESSAGE_LEN:
+                    carry = nxt  # starts the next batch
+                    break
+                parts.append(nxt[0])
+                size += 2 + len(nxt[0])
+                taken += 1
+            try:
+                sent = await self._post("\n\n".join(parts), parse_mode)
+                if not sent and len(parts) > 1:
+                    # One bad message (e.g. broken HTML) must not sink the rest of
+                    # the batch — a kill-switch alert may be among them
+                    for part in parts:
+                        await asyncio.sleep(self.SEND_INTERVAL_SEC)
+                        await self._post(part, parse_mode)
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+            await asyncio.sleep(self.SEND_INTERVAL_SEC)
+
+    async def _post(self, message: str, parse_mode: str) -> bool:
+        """POST one sendMessage request. True if Telegram accepted it."""
         try:
             session = await self._get_session()
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            payload = {
-                "chat_id": self.chat_id,
-                "text": message,
-                "parse_mode": parse_mode,
-                "disable_web_page_preview": True,
-            }
-
-            async with session.post(url, json=payload) as resp:
+            payload = {**self._base_payload, "text": message, "parse_mode": parse_mode}
+
+            # Encode with orjson ourselves; aiohttp's json= falls back to stdlib json
+            # on a standalone session
+            async with session.post(
+                self._url, data=orjson.dumps(payload), headers=_JSON_HEADERS
+            ) as resp:
                 if resp.status != 200:
                     body = await resp.text()
                     logger.warning(f"[TG] Send failed ({resp.status}): {body[:200]}")
-                else:
-                    logger.debug(f"[TG] Sent: {message[:80]}...")
+                    return False
+                logger.debug(f"[TG] Sent: {message[:80]}...")
+                return True
 
         except Exception as e:
             logger.warning(f"[TG] Error sending message: {e}")
+            return False
 
     async def send_trade_entry(
         self,
@@ -65,17 +181,11 @@ class TelegramNotifier:
         slot_balance: str,
     ):
         """Send trade entry notification."""
-        emoji = "🟢" if side == "Buy" else "🔴"
-        direction = "LONG" if side == "Buy" else "SHORT"
-        msg = (
-            f"{emoji} <b>NEW TRADE — {direction}</b>\n\n"
-            f"Symbol: <code>{symbol}</code>\n"
-            f"Entry: <code>{entry_price}</code>\n"
-            f"Qty: <code>{qty}</code>\n"
-            f"SL: <code>{sl_price}</code> (-2.5%)\n\n"
-            f"Slot: #{slot_id} (${slot_balance})"
-        )
-        await self.send(msg)
+        emoji, direction = _SIDE_LABELS.get(side, _SIDE_LABELS["Sell"])
+        await self.send(_TPL_ENTRY.format(
+            emoji=emoji, direction=direction, symbol=symbol, entry_price=entry_price,
+            qty=qty, sl_price=sl_price, slot_id=slot_id, slot_balance=slot_balance,
+        ))
 
     async def send_trade_exit(
         self,
@@ -88,33 +198,22 @@ class TelegramNotifier:
         highest_tp: int,
     ):
         """Send trade exit notification."""
-        pnl_val = float(pnl)
-        emoji = "✅" if pnl_val >= 0 else "❌"
-        direction = "LONG" if side == "Buy" else "SHORT"
-        msg = (
-            f"{emoji} <b>TRADE CLOSED — {direction}</b>\n\n"
-            f"Symbol: <code>{symbol}</code>\n"
-            f"PnL: <code>${pnl}</code>\n"
-            f"Reason: {exit_reason}\n"
-            f"Highest TP: {highest_tp}/10\n\n"
-            f"Slot #{slot_id} → ${new_balance}"
-        )
-        await self.send(msg)
+        emoji = "✅" if float(pnl) >= 0 else "❌"
+        direction = _SIDE_LABELS.get(side, _SIDE_LABELS["Sell"])[1]
+        await self.send(_TPL_EXIT.format(
+            emoji=emoji, direction=direction, symbol=symbol, pnl=pnl,
+            exit_reason=exit_reason, highest_tp=highest_tp,
+            slot_id=slot_id, new_balance=new_balance,
+        ))
 
     async def send_sl_trailed(self, symbol: str, new_sl: str, tp_level: int):
         """Send SL trail notification."""
-        msg = (
-            f"📈 <b>SL TRAILED</b>\n"
-            f"Symbol: <code>{symbol}</code>\n"
-            f"New SL: <code>{new_sl}</code> (TP{tp_level} hit)"
-        )
-        await self.send(msg)
+        await self.send(_TPL_SL_TRAILED.format(symbol=symbol, new_sl=new_sl, tp_level=tp_level))
 
     async def send_daily_summary(self, summary: str):
         """Send daily P&L summary."""
-        msg = f"📊 <b>DAILY SUMMARY</b>\n\n{summary}"
-        await self.send(msg)
+        await self.send(_TPL_DAILY_SUMMARY.format(summary=summary))
 
     async def send_bot_status(self, status: str):
         """Send bot lifecycle status."""
-        await self.send(f"🤖 <b>BOT</b>: {status}")
+        await self.send(_TPL_BOT_STATUS.format(status=status))
@@ -1,46 +1,318 @@
 """
 SQLite Storage Layer.
-Handles persistence for slots, trades, HA candles, and bot state.
-All monetary values stored as TEXT to preserve Decimal precision.
+Handles persistence for slots, trades, HA candles, kline cache, and bot state.
+Prices stored as TEXT to preserve Decimal precision; balances, PnL and fees as
+INTEGER units of 1e-8 (exact, compact, and summable in SQL).
 """
 
 from __future__ import annotations
+import asyncio
+import os
 import sqlite3
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from decimal import Decimal
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import Iterator, List, Optional, Dict, Any, Set
 from exchange.models import Slot, SlotState, Trade, TradeStatus, ExitReason, Side, TPLevel
 import logging
 
 logger = logging.getLogger(__name__)
 
+# value -> member, so row decoding skips Enum.__call__
+_SLOT_STATES = {s.value: s for s in SlotState}
+_TRADE_STATUSES = {s.value: s for s in TradeStatus}
+_SIDES = {s.value: s for s in Side}
+_EXIT_REASONS = {r.value: r for r in ExitReason}
+_DECIMAL_ZERO = Decimal("0")
+
+
+
+# Row decoding sees the same strings over and over ("0", "10.0", a trade's
+# entry_time on every reload); Decimal and datetime are immutable, so share them.
+@lru_cache(maxsize=4096)
+def _to_dec(s: str) -> Decimal:
+    return Decimal(s)
+
+
+@lru_cache(maxsize=1024)
+def _parse_iso(s: str) -> datetime:
+    return datetime.fromisoformat(s)
+
+
+# (whole second, its ISO text); updated_at columns don't need sub-second precision
+_now_cache = [0, ""]
+
+
+def _now_iso() -> str:
+    """Current UTC time as naive ISO text (same format as utcnow().isoformat(), whole seconds)."""
+    sec = int(time.time())
+    if sec != _now_cache[0]:
+        _now_cache[0] = sec
+        _now_cache[1] = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+    return _now_cache[1]
+
+
+# Column-name converters (PARSE_COLNAMES): a column selected as
+# `col AS "col [DECIMAL]"` comes out of the cursor already decoded. Declared
+# column types stay TEXT, so existing databases need no migration.
+@lru_cache(maxsize=4096)
+def _convert_decimal(b: bytes) -> Decimal:
+    return Decimal(b.decode())
+
+
+@lru_cache(maxsize=1024)
+def _convert_isotime(b: bytes) -> datetime:
+    return datetime.fromisoformat(b.decode())
+
+
+# Money (balance, total_pnl, pnl, fees) lives in INTEGER <col>_e8 columns, in
+# units of 1e-8 — USDT's settlement precision. The original TEXT columns are
+# left in place (unused) so older databases migrate by ADD COLUMN, not a rebuild.
+_MONEY_EXP = -8
+
+
+def _from_money(value: Decimal) -> int:
+    """Decimal amount -> integer 1e-8 units (banker's rounding past the 8th place)."""
+    return int(value.scaleb(-_MONEY_EXP).to_integral_value())
+
+
+@lru_cache(maxsize=4096)
+def _convert_money(b: bytes) -> Decimal:
+    units = int(b)
+    # Plain Decimal("0") rather than 0E-8, so an untouched balance prints as "0"
+    return Decimal(units).scaleb(_MONEY_EXP) if units else _DECIMAL_ZERO
+
+
+def _convert_money_text(b: bytes) -> str:
+    """Money as plain decimal text ("1.25", "0"), the shape the TEXT columns had."""
+    return format(_convert_money(b).normalize(), "f")
+
+
+sqlite3.register_converter("DECIMAL", _convert_decimal)
+sqlite3.register_converter("ISOTIME", _convert_isotime)
+sqlite3.register_converter("MONEY", _convert_money)
+sqlite3.register_converter("MONEYTEXT", _convert_money_text)
+
+
+def _select(
+    table: str, cols: tuple, decimals: frozenset, times: frozenset, money: frozenset
+) -> str:
+    """SELECT with converter tags on the Decimal, datetime and money columns."""
+    exprs = [
+        f'{c} AS "{c} [DECIMAL]"' if c in decimals
+        else f'{c} AS "{c} [ISOTIME]"' if c in times
+        else f'{c}_e8 AS "{c} [MONEY]"' if c in money
+        else c
+        for c in cols
+    ]
+    return f"SELECT {', '.join(exprs)} FROM {table}"
+
+
+# Explicit trade column list: hot trade reads fetch plain tuples and unpack
+# them positionally in _row_to_trade instead of going through sqlite3.Row
+_TRADE_COLS = (
+    "id", "slot_id", "symbol", "side", "entry_price", "qty", "order_id",
+    "sl_order_id", "current_sl_price", "initial_sl_price", "tp_levels",
+    "highest_tp_reached", "atr_value", "status", "pnl", "fees", "entry_time",
+    "exit_time", "exit_reason", "cooldown_until", "fill_attempts",
+)
+_SELECT_TRADES = _select(
+    "trades", _TRADE_COLS,
+    decimals=frozenset({"entry_price", "qty", "current_sl_price", "initial_sl_price",
+                        "atr_value"}),
+    times=frozenset({"entry_time", "exit_time", "cooldown_until"}),
+    money=frozenset({"pnl", "fees"}),
+)
+_SELECT_SLOTS = _select(
+    "slots",
+    ("id", "balance", "state", "current_symbol", "current_trade_id",
+     "total_trades", "total_pnl", "updated_at"),
+    decimals=frozenset(),
+    times=frozenset({"updated_at"}),
+    money=frozenset({"balance", "total_pnl"}),
+)
+
 
 class Database:
     """SQLite database manager with typed accessors."""
 
+    # Column order matches dashboard's /api/trades keys
+    SQL_RECENT_TRADES = (
+        "SELECT id, slot_id, symbol, side, entry_price, qty, status,"
+        ' pnl_e8 AS "pnl [MONEYTEXT]", exit_reason,'
+        " highest_tp_reached, entry_time, exit_time FROM trades ORDER BY id DESC LIMIT ?"
+    )
+
+    # Statements run on every fill / TP / SL update — each gets a long-lived cursor (see _stmt)
+    SQL_GET_SLOT = f"{_SELECT_SLOTS} WHERE id = ?"
+    SQL_UPDATE_SLOT = (
+        "UPDATE slots SET balance_e8=?, state=?, current_symbol=?,"
+        " current_trade_id=?, total_trades=?, total_pnl_e8=?, updated_at=?"
+        " WHERE id=?"
+    )
+    SQL_GET_TRADE = f"{_SELECT_TRADES} WHERE id = ?"
+    SQL_UPDATE_TRADE = (
+        "UPDATE trades SET entry_price=?, qty=?, order_id=?, sl_order_id=?,"
+        " current_sl_price=?, initial_sl_price=?,"
+        " highest_tp_reached=?, atr_value=?, status=?, pnl_e8=?, fees_e8=?,"
+        " entry_time=?, exit_time=?, exit_reason=?, cooldown_until=?,"
+        " fill_attempts=?"
+        " WHERE id=?"
+    )
+    # Per-tick update: only the columns that move while a trade is open
+    SQL_UPDATE_TRADE_PROGRESS = (
+        "UPDATE trades SET current_sl_price=?, highest_tp_reached=?, status=?,"
+        " fill_attempts=? WHERE id=?"
+    )
+    # Literal statuses (not parameters) so the planner can match the partial idx_trades_open
+    SQL_OPEN_TRADES = f"{_SELECT_TRADES} WHERE status IN ('PENDING', 'FILLING', 'OPEN')"
+    SQL_TRADE_BY_SYMBOL = f"{_SELECT_TRADES} WHERE symbol = ? AND status IN (?, ?, ?) LIMIT 1"
+    SQL_TRADE_BY_ORDER_ID = f"{_SELECT_TRADES} WHERE order_id = ? LIMIT 1"
+    SQL_TP_LEVELS = (
+        "SELECT level, price, hit, hit_time FROM trade_tp_levels WHERE trade_id = ? ORDER BY level"
+    )
+    SQL_UPSERT_TP_LEVEL = (
+        "INSERT OR REPLACE INTO trade_tp_levels (trade_id, level, price, hit, hit_time)"
+        " VALUES (?, ?, ?, ?, ?)"
+    )
+
+    # table -> {money column: SQL default for its _e8 column}
+    _MONEY_COLUMNS = {
+        "slots": {"balance": "", "total_pnl": " NOT NULL DEFAULT 0"},
+        "trades": {"pnl": "", "fees": " NOT NULL DEFAULT 0"},
+    }
+
+    # Statuses that count as an active trade, as query parameters
+    _ACTIVE_STATUSES = (TradeStatus.PENDING.value, TradeStatus.FILLING.value, TradeStatus.OPEN.value)
+
     def __init__(self, db_path: str):
         self.db_path = db_path
         self._conn: Optional[sqlite3.Connection] = None
+        # sql -> cursor reused for the connection's lifetime
+        self._cursors: Dict[str, sqlite3.Cursor] = {}
+        # >0 while inside transaction(); single-row writers then leave the commit to it
+        self._tx_depth = 0
+        # trade_id -> TP rows as last written/read, so update_trade only writes changed levels
+        self._tp_written: Dict[int, Dict[int, tuple]] = {}
+        # Trades whose _tp_written entry changed in the open transaction; forgotten on rollback
+        self._tx_tp_trades: Set[int] = set()
+        # WAL checkpoints run on their own thread + connection (see checkpoint())
+        self._ckpt_pool: Optional[ThreadPoolExecutor] = None
+        self._ckpt_conn: Optional[sqlite3.Connection] = None
 
     def connect(self):
         """Initialize database connection and create tables."""
-        self._conn = sqlite3.connect(self.db_path)
+        # DB_PATH may point outside ./data (created at import); make sure its dir exists
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        # Larger statement LRU than the default 128 so every query stays compiled
+        self._conn = sqlite3.connect(
+            self.db_path, cached_statements=256, detect_types=sqlite3.PARSE_COLNAMES
+        )
         self._conn.row_factory = sqlite3.Row
         self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")   # WAL stays consistent; fsync only at checkpoints
+        self._conn.execute("PRAGMA cache_size=-20000")    # ~20 MB page cache
         self._conn.execute("PRAGMA foreign_keys=ON")
+        # Under WAL + synchronous=NORMAL a commit is a page-cache write; the fsyncs
+        # happen at checkpoints. Take those off the event loop: no auto-checkpoint
+        # on commit, checkpoint() is driven from a background task instead.
+        self._conn.execute("PRAGMA wal_autocheckpoint=0")
         self._create_tables()
         logger.info(f"[DB] Connected to {self.db_path}")
 
     def close(self):
+        self._cursors.clear()
+        if self._ckpt_pool:
+            self._ckpt_pool.shutdown(wait=True)
+            self._ckpt_pool = None
+        if self._ckpt_conn:
+            self._ckpt_conn.close()
+            self._ckpt_conn = None
         if self._conn:
+            # Last connection out folds the WAL back into the DB file
             self._conn.close()
 
+    async def checkpoint(self):
+        """Checkpoint the WAL on the dedicated checkpoint thread (never blocks the loop)."""
+        if self._ckpt_pool is None:
+            self._ckpt_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-ckpt")
+        loop = asyncio.get_running_loop()
+        busy, wal_pages, done = await loop.run_in_executor(self._ckpt_pool, self._checkpoint_sync)
+        if busy:
+            logger.debug(f"[DB] Checkpoint partial: {done}/{wal_pages} WAL pages")
+
+    def _checkpoint_sync(self):
+        # Own connection, only ever touched from the checkpoint thread (and close())
+        if self._ckpt_conn is None:
+            self._ckpt_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # PASSIVE never waits on the writer; whatever it can't copy goes next round
+        return self._ckpt_conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+
     @property
     def conn(self) -> sqlite3.Connection:
         assert self._conn is not None, "Database not connected"
         return self._conn
 
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Group related writes (e.g. a trade update and its slot update) into one
+        commit — one WAL sync instead of one per row, and no half-applied state
+        if the bot dies in between. Rolls back on error; nested use joins the
+        outer transaction.
+
+        Keep the block synchronous: a write from another coroutine on this
+        connection during an await would silently join the transaction.
+        """
+        if self._tx_depth:
+            self._tx_depth += 1
+            try:
+                yield
+            finally:
+                self._tx_depth -= 1
+            return
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._tx_depth = 1
+        try:
+            yield
+            self._tx_depth = 0
+            self.conn.commit()
+        except BaseException:
+            self._tx_depth = 0
+            self.conn.rollback()
+            # The cached TP rows for these trades never reached the DB
+            for trade_id in self._tx_tp_trades:
+                self._tp_written.pop(trade_id, None)
+            raise
+        finally:
+            self._tx_tp_trades.clear()
+
+    def _commit(self):
+        """Commit now, unless an enclosing transaction() will."""
+        if not self._tx_depth:
+            self.conn.commit()
+
+    def _stmt(self, sql: str, tuples: bool = False) -> sqlite3.Cursor:
+        """
+        Long-lived cursor for a hot statement. The compiled statement itself
+        comes from the connection's cache; this skips the per-call cursor
+        allocation. Callers must fully consume results before the next call.
+        tuples=True yields plain tuples instead of sqlite3.Row.
+        """
+        cur = self._cursors.get(sql)
+        if cur is None:
+            cur = self._cursors[sql] = self.conn.cursor()
+            if tuples:
+                cur.row_factory = None
+        return cur
+
     def _create_tables(self):
         self.conn.executescript("""
             CREATE TABLE IF NOT EXISTS slots (
@@ -79,6 +351,17 @@ class Database:
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP
             );
 
+            -- One row per TP level; only hit/hit_time change after setup.
+            -- Trades written before this table existed keep their TPs in trades.tp_levels (JSON).
+            CREATE TABLE IF NOT EXISTS trade_tp_levels (
+                trade_id INTEGER NOT NULL REFERENCES trades(id),
+                level INTEGER NOT NULL,
+                price TEXT NOT NULL,
+                hit INTEGER NOT NULL DEFAULT 0,
+                hit_time TEXT,
+                PRIMARY KEY (trade_id, level)
+            );
+
             CREATE TABLE IF NOT EXISTS ha_candles (
                 symbol TEXT NOT NULL,
                 timestamp INTEGER NOT NULL,
@@ -90,6 +373,19 @@ class Database:
                 PRIMARY KEY (symbol, timestamp)
             );
 
+            CREATE TABLE IF NOT EXISTS kline_cache (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                start_ts INTEGER NOT NULL,
+                open TEXT,
+                high TEXT,
+                low TEXT,
+                close TEXT,
+                volume TEXT,
+                turnover TEXT,
+                PRIMARY KEY (symbol, interval, start_ts)
+            );
+
             CREATE TABLE IF NOT EXISTS bot_state (
                 key TEXT PRIMARY KEY,
                 value TEXT,
@@ -99,84 +395,116 @@ class Database:
             CREATE INDEX IF NOT EXISTS idx_trades_slot ON trades(slot_id);
             CREATE INDEX IF NOT EXISTS idx_trades_status ON trades(status);
             CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades(symbol);
+            CREATE INDEX IF NOT EXISTS idx_trades_symbol_status ON trades(symbol, status);
+            CREATE INDEX IF NOT EXISTS idx_trades_open ON trades(status)
+                WHERE status IN ('PENDING', 'FILLING', 'OPEN');
+            CREATE INDEX IF NOT EXISTS idx_trades_order_id ON trades(order_id);
         """)
-        self.conn.commit()
+        self._migrate_money_columns()
+        # Collect planner statistics once so the indexes above get picked
+        has_stats = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).fetchone()
+        if not has_stats:
+            self.conn.execute("ANALYZE")
+            self.conn.commit()
+        self._commit()
+
+    def _migrate_money_columns(self):
+        """Add the INTEGER <col>_e8 money columns, filled once from the legacy TEXT ones."""
+        for table, cols in self._MONEY_COLUMNS.items():
+            existing = {r[1] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+            missing = [c for c in cols if f"{c}_e8" not in existing]
+            if not missing:
+                continue
+            # ALTER + backfill in one explicit transaction: sqlite3 would otherwise
+            # autocommit the ALTER, and a crash before the backfill would leave
+            # empty columns that the check above then treats as migrated
+            with self.transaction():
+                for c in missing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {c}_e8 INTEGER{cols[c]}")
+                # NOT NULL columns take 0 for an empty legacy value; nullable ones stay NULL
+                fallback = {c: 0 if cols[c] else None for c in missing}
+                rows = self.conn.execute(f"SELECT id, {', '.join(missing)} FROM {table}").fetchall()
+                self.conn.executemany(
+                    f"UPDATE {table} SET {', '.join(f'{c}_e8=?' for c in missing)} WHERE id=?",
+                    [
+                        (*(_from_money(Decimal(r[c])) if r[c] else fallback[c] for c in missing), r["id"])
+                        for r in rows
+                    ],
+                )
+            logger.info(f"[DB] {table}: moved {', '.join(missing)} to INTEGER 1e-8 columns")
 
     # ==================== Slot Operations ====================
 
     def initialize_slots(self, num_slots: int, initial_balance: Decimal):
-        """Create slot records if they don't exist."""
-        for i in range(1, num_slots + 1):
-            existing = self.conn.execute("SELECT id FROM slots WHERE id = ?", (i,)).fetchone()
-            if not existing:
-                self.conn.execute(
-                    "INSERT INTO slots (id, balance, state, updated_at) VALUES (?, ?, ?, ?)",
-                    (i, str(initial_balance), SlotState.AVAILABLE.value, datetime.utcnow().isoformat()),
-                )
-        self.conn.commit()
+        """Create slot records if they don't exist (existing slots are left untouched)."""
+        balance = _from_money(initial_balance)
+        state = SlotState.AVAILABLE.value
+        now = _now_iso()
+        with self.transaction():
+            # One prepared statement, one transaction; the primary key skips existing ids
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO slots (id, balance_e8, state, updated_at) VALUES (?, ?, ?, ?)",
+                [(i, balance, state, now) for i in range(1, num_slots + 1)],
+            )
         logger.info(f"[DB] Initialized {num_slots} slots @ ${initial_balance} each")
 
     def get_slot(self, slot_id: int) -> Optional[Slot]:
-        row = self.conn.execute("SELECT * FROM slots WHERE id = ?", (slot_id,)).fetchone()
+        row = self._stmt(self.SQL_GET_SLOT).execute(self.SQL_GET_SLOT, (slot_id,)).fetchone()
         return self._row_to_slot(row) if row else None
 
     def get_all_slots(self) -> List[Slot]:
-        rows = self.conn.execute("SELECT * FROM slots ORDER BY id").fetchall()
+        rows = self.conn.execute(f"{_SELECT_SLOTS} ORDER BY id").fetchall()
         return [self._row_to_slot(r) for r in rows]
 
     def get_available_slot(self) -> Optional[Slot]:
         """Get first available slot."""
         row = self.conn.execute(
-            "SELECT * FROM slots WHERE state = ? ORDER BY id LIMIT 1",
+            f"{_SELECT_SLOTS} WHERE state = ? ORDER BY id LIMIT 1",
             (SlotState.AVAILABLE.value,),
         ).fetchone()
         return self._row_to_slot(row) if row else None
 
     def update_slot(self, slot: Slot):
-        self.conn.execute(
-            """UPDATE slots SET balance=?, state=?, current_symbol=?,
-               current_trade_id=?, total_trades=?, total_pnl=?, updated_at=?
-               WHERE id=?""",
+        self._stmt(self.SQL_UPDATE_SLOT).execute(
+            self.SQL_UPDATE_SLOT,
             (
-                str(slot.balance), slot.state.value, slot.current_symbol,
-                slot.current_trade_id, slot.total_trades, str(slot.total_pnl),
-                datetime.utcnow().isoformat(), slot.id,
+                _from_money(slot.balance), slot.state.value, slot.current_symbol,
+                slot.current_trade_id, slot.total_trades, _from_money(slot.total_pnl),
+                _now_iso(), slot.id,
             ),
         )
-        self.conn.commit()
+        self._commit()
 
     def get_total_balance(self) -> Decimal:
         """Sum of all slot balances."""
-        row = self.conn.execute("SELECT SUM(CAST(balance AS REAL)) as total FROM slots").fetchone()
-        return Decimal(str(row["total"])) if row and row["total"] else Decimal("0")
+        # Integer SUM — exact, unlike summing the TEXT values as REAL
+        row = self.conn.execute("SELECT SUM(balance_e8) FROM slots").fetchone()
+        return Decimal(row[0]).scaleb(_MONEY_EXP) if row and row[0] else _DECIMAL_ZERO
 
     # ==================== Trade Operations ====================
 
     def create_trade(self, trade: Trade) -> int:
         """Insert a new trade and return its ID."""
-        tp_json = json.dumps([
-            {"level": tp.level, "price": str(tp.price), "hit": tp.hit}
-            for tp in trade.tp_levels
-        ]) if trade.tp_levels else "[]"
-
         cursor = self.conn.execute(
             """INSERT INTO trades (slot_id, symbol, side, entry_price, qty, order_id,
                sl_order_id, current_sl_price, initial_sl_price, tp_levels,
-               highest_tp_reached, atr_value, status, pnl, fees, entry_time,
+               highest_tp_reached, atr_value, status, pnl_e8, fees_e8, entry_time,
                exit_time, exit_reason, cooldown_until, fill_attempts)
                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (
                 trade.slot_id, trade.symbol, trade.side.value,
-                str(trade.entry_price) if trade.entry_price else None,
-                str(trade.qty) if trade.qty else None,
+                trade.dec_text("entry_price"),
+                trade.dec_text("qty"),
                 trade.order_id, trade.sl_order_id,
-                str(trade.current_sl_price) if trade.current_sl_price else None,
-                str(trade.initial_sl_price) if trade.initial_sl_price else None,
-                tp_json, trade.highest_tp_reached,
-                str(trade.atr_value) if trade.atr_value else None,
+                trade.dec_text("current_sl_price"),
+                trade.dec_text("initial_sl_price"),
+                "[]", trade.highest_tp_reached,
+                trade.dec_text("atr_value"),
                 trade.status.value,
-                str(trade.pnl) if trade.pnl else None,
-                str(trade.fees),
+                _from_money(trade.pnl) if trade.pnl else None,
+                _from_money(trade.fees),
                 trade.entry_time.isoformat() if trade.entry_time else None,
                 trade.exit_time.isoformat() if trade.exit_time else None,
                 trade.exit_reason.value if trade.exit_reason else None,
@@ -184,81 +512,205 @@ class Database:
                 trade.fill_attempts,
             ),
         )
-        self.conn.commit()
         trade.id = cursor.lastrowid
+        self._write_tp_levels(trade)
+        self._commit()
         return trade.id
 
-    def update_trade(self, trade: Trade):
-        """Update an existing trade."""
-        tp_json = json.dumps([
-            {"level": tp.level, "price": str(tp.price), "hit": tp.hit,
-             "hit_time": tp.hit_time.isoformat() if tp.hit_time else None}
-            for tp in trade.tp_levels
-        ]) if trade.tp_levels else "[]"
+    @staticmethod
+    def _trade_params(trade: Trade) -> tuple:
+        """SQL_UPDATE_TRADE parameters for a trade."""
+        return (
+            trade.dec_text("entry_price"),
+            trade.dec_text("qty"),
+            trade.order_id, trade.sl_order_id,
+            trade.dec_text("current_sl_price"),
+            trade.dec_text("initial_sl_price"),
+            trade.highest_tp_reached,
+            trade.dec_text("atr_value"),
+            trade.status.value,
+            _from_money(trade.pnl) if trade.pnl else None,
+            _from_money(trade.fees),
+            trade.entry_time.isoformat() if trade.entry_time else None,
+            trade.exit_time.isoformat() if trade.exit_time else None,
+            trade.exit_reason.value if trade.exit_reason else None,
+            trade.cooldown_until.isoformat() if trade.cooldown_until else None,
+            trade.fill_attempts,
+            trade.id,
+        )
 
-        self.conn.execute(
-            """UPDATE trades SET entry_price=?, qty=?, order_id=?, sl_order_id=?,
-               current_sl_price=?, initial_sl_price=?, tp_levels=?,
-               highest_tp_reached=?, atr_value=?, status=?, pnl=?, fees=?,
-               entry_time=?, exit_time=?, exit_reason=?, cooldown_until=?,
-               fill_attempts=?
-               WHERE id=?""",
+    def update_trade(self, trade: Trade):
+        """Update an existing trade. TP rows are only written for levels that changed."""
+        self._stmt(self.SQL_UPDATE_TRADE).execute(self.SQL_UPDATE_TRADE, self._trade_params(trade))
+        self._write_tp_levels(trade)
+        self._commit()
+        if trade.status in (TradeStatus.CLOSED, TradeStatus.CANCELLED):
+            self._tp_written.pop(trade.id, None)
+
+    def bulk_update_trades(self, trades: List[Trade]):
+        """update_trade for many trades at once: one executemany, one commit."""
+        if not trades:
+            return
+        with self.transaction():
+            self.conn.executemany(self.SQL_UPDATE_TRADE, [self._trade_params(t) for t in trades])
+            for trade in trades:
+                self._write_tp_levels(trade)
+        for trade in trades:
+            if trade.status in (TradeStatus.CLOSED, TradeStatus.CANCELLED):
+                self._tp_written.pop(trade.id, None)
+
+    def update_trade_progress(self, trade: Trade):
+        """
+        Write only what changes while a trade is open (SL, TP progress, status).
+        Entry, sizing and exit fields go through update_trade.
+        """
+        self._stmt(self.SQL_UPDATE_TRADE_PROGRESS).execute(
+            self.SQL_UPDATE_TRADE_PROGRESS,
             (
-                str(trade.entry_price) if trade.entry_price else None,
-                str(trade.qty) if trade.qty else None,
-                trade.order_id, trade.sl_order_id,
-                str(trade.current_sl_price) if trade.current_sl_price else None,
-                str(trade.initial_sl_price) if trade.initial_sl_price else None,
-                tp_json, trade.highest_tp_reached,
-                str(trade.atr_value) if trade.atr_value else None,
+                trade.dec_text("current_sl_price"),
+                trade.highest_tp_reached,
                 trade.status.value,
-                str(trade.pnl) if trade.pnl else None,
-                str(trade.fees),
-                trade.entry_time.isoformat() if trade.entry_time else None,
-                trade.exit_time.isoformat() if trade.exit_time else None,
-                trade.exit_reason.value if trade.exit_reason else None,
-                trade.cooldown_until.isoformat() if trade.cooldown_until else None,
                 trade.fill_attempts,
                 trade.id,
             ),
         )
-        self.conn.commit()
+        self._write_tp_levels(trade)
+        self._commit()
+
+    def _write_tp_levels(self, trade: Trade):
+        """Upsert the TP rows that differ from what this trade last had in the DB."""
+        written = self._tp_written.setdefault(trade.id, {})
+        changed = []
+        for tp in trade.tp_levels:
+            row = (
+                trade.id, tp.level, str(tp.price), int(tp.hit),
+                tp.hit_time.isoformat() if tp.hit_time else None,
+            )
+            if written.get(tp.level) != row:
+                changed.append(row)
+        if changed:
+            self.conn.executemany(self.SQL_UPSERT_TP_LEVEL, changed)
+            # Cache only after the write; inside a transaction it is undone on rollback
+            for row in changed:
+                written[row[1]] = row
+            if self._tx_depth:
+                self._tx_tp_trades.add(trade.id)
+
+    def _load_tp_levels(self, trade_id: int, legacy_json: Optional[str]) -> List[TPLevel]:
+        """TP levels for a trade, from trade_tp_levels or the legacy JSON column."""
+        tp_rows = self._stmt(self.SQL_TP_LEVELS, tuples=True).execute(
+            self.SQL_TP_LEVELS, (trade_id,)
+        ).fetchall()
+        if tp_rows:
+            self._tp_written[trade_id] = {r[0]: (trade_id, *r) for r in tp_rows}
+            return [
+                TPLevel(
+                    level=level,
+                    price=_to_dec(price),
+                    hit=bool(hit),
+                    hit_time=_parse_iso(hit_time) if hit_time else None,
+                )
+                for level, price, hit, hit_time in tp_rows
+            ]
+
+        # Legacy rows: nothing in the child table yet; the next update_trade moves them over
+        tp_data = json.loads(legacy_json) if legacy_json else []
+        return [
+            TPLevel(
+                level=tp["level"],
+                price=_to_dec(tp["price"]),
+                hit=tp.get("hit", False),
+                hit_time=_parse_iso(tp["hit_time"]) if tp.get("hit_time") else None,
+            )
+            for tp in tp_data
+        ]
+
+    def add_trade_fees(self, fees_by_order: Dict[str, Decimal]):
+        """
+        Add execution fees to the trades owning these entry order IDs.
+        One transaction for the whole batch; the sum is integer 1e-8 units, so exact.
+        """
+        placeholders = ",".join("?" * len(fees_by_order))
+        # Read and write under the same transaction (joins an enclosing one)
+        with self.transaction():
+            rows = self.conn.execute(
+                f"SELECT id, order_id, fees_e8 FROM trades WHERE order_id IN ({placeholders})",
+                tuple(fees_by_order),
+            ).fetchall()
+            if not rows:
+                return
+
+            updates = [
+                ((r["fees_e8"] or 0) + _from_money(fees_by_order[r["order_id"]]), r["id"])
+                for r in rows
+            ]
+            self.conn.executemany("UPDATE trades SET fees_e8=? WHERE id=?", updates)
+
+    def get_recent_trade_rows(self, limit: int = 50) -> List[tuple]:
+        """Latest trades as plain tuples in SQL_RECENT_TRADES column order (no Row objects)."""
+        cur = self.conn.cursor()
+        cur.row_factory = None
+        return cur.execute(self.SQL_RECENT_TRADES, (limit,)).fetchall()
 
     def get_trade(self, trade_id: int) -> Optional[Trade]:
-        row = self.conn.execute("SELECT * FROM trades WHERE id = ?", (trade_id,)).fetchone()
+        row = self._stmt(self.SQL_GET_TRADE, tuples=True).execute(self.SQL_GET_TRADE, (trade_id,)).fetchone()
         return self._row_to_trade(row) if row else None
 
     def get_open_trades(self) -> List[Trade]:
-        rows = self.conn.execute(
-            "SELECT * FROM trades WHERE status IN (?, ?, ?)",
-            (TradeStatus.PENDING.value, TradeStatus.FILLING.value, TradeStatus.OPEN.value),
+        rows = self._stmt(self.SQL_OPEN_TRADES, tuples=True).execute(
+            self.SQL_OPEN_TRADES
         ).fetchall()
         return [self._row_to_trade(r) for r in rows]
 
     def get_trade_by_symbol(self, symbol: str) -> Optional[Trade]:
         """Get active trade for a symbol."""
-        row = self.conn.execute(
-            "SELECT * FROM trades WHERE symbol = ? AND status IN (?, ?, ?) LIMIT 1",
-            (symbol, TradeStatus.PENDING.value, TradeStatus.FILLING.value, TradeStatus.OPEN.value),
+        row = self._stmt(self.SQL_TRADE_BY_SYMBOL, tuples=True).execute(
+            self.SQL_TRADE_BY_SYMBOL, (symbol, *self._ACTIVE_STATUSES)
         ).fetchone()
         return self._row_to_trade(row) if row else None
 
     def get_trade_by_order_id(self, order_id: str) -> Optional[Trade]:
         """Find trade by its entry order ID."""
-        row = self.conn.execute(
-            "SELECT * FROM trades WHERE order_id = ? LIMIT 1",
-            (order_id,),
+        row = self._stmt(self.SQL_TRADE_BY_ORDER_ID, tuples=True).execute(
+            self.SQL_TRADE_BY_ORDER_ID, (order_id,)
         ).fetchone()
         return self._row_to_trade(row) if row else None
 
+    # ==================== Kline Cache ====================
+
+    def get_cached_klines(self, symbol: str, interval: str, limit: int) -> List[list]:
+        """Newest-first closed klines in Bybit REST row format ([start, o, h, l, c, v, turnover])."""
+        cur = self.conn.cursor()
+        cur.row_factory = None  # plain tuples, same shape as REST rows
+        rows = cur.execute(
+            "SELECT start_ts, open, high, low, close, volume, turnover FROM kline_cache"
+            " WHERE symbol = ? AND interval = ? ORDER BY start_ts DESC LIMIT ?",
+            (symbol, interval, limit),
+        ).fetchall()
+        return [list(r) for r in rows]
+
+    def store_klines(self, symbol: str, interval: str, rows: List[list], keep_from_ts: int):
+        """Upsert closed kline rows and drop cached rows older than keep_from_ts."""
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO kline_cache"
+                " (symbol, interval, start_ts, open, high, low, close, volume, turnover)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, interval, int(r[0]), *r[1:7]) for r in rows],
+            )
+            self.conn.execute(
+                "DELETE FROM kline_cache WHERE symbol = ? AND interval = ? AND start_ts < ?",
+                (symbol, interval, keep_from_ts),
+            )
+
     # ==================== Bot State ====================
 
     def set_state(self, key: str, value: str):
         self.conn.execute(
             "INSERT OR REPLACE INTO bot_state (key, value, updated_at) VALUES (?, ?, ?)",
-            (key, value, datetime.utcnow().isoformat()),
+            (key, value, _now_iso()),
         )
-        self.conn.commit()
+        self._commit()
 
     def get_state(self, key: str) -> Optional[str]:
         row = self.conn.execute("SELECT value FROM bot_state WHERE key = ?", (key,)).fetchone()
@@ -269,47 +721,42 @@ class Database:
     def _row_to_slot(self, row) -> Slot:
         return Slot(
             id=row["id"],
-            balance=Decimal(row["balance"]),
-            state=SlotState(row["state"]),
+            balance=row["balance"],
+            state=_SLOT_STATES[row["state"]],
             current_symbol=row["current_symbol"],
             current_trade_id=row["current_trade_id"],
             total_trades=row["total_trades"],
-            total_pnl=Decimal(row["total_pnl"]),
-            updated_at=datetime.fromisoformat(row["updated_at"]) if row["updated_at"] else datetime.utcnow(),
+            total_pnl=row["total_pnl"],
+            updated_at=row["updated_at"] or datetime.utcnow(),
         )
 
-    def _row_to_trade(self, row) -> Trade:
-        tp_data = json.loads(row["tp_levels"]) if row["tp_levels"] else []
-        tp_levels = [
-            TPLevel(
-                level=tp["level"],
-                price=Decimal(tp["price"]),
-                hit=tp.get("hit", False),
-                hit_time=datetime.fromisoformat(tp["hit_time"]) if tp.get("hit_time") else None,
-            )
-            for tp in tp_data
-        ]
+    def _row_to_trade(self, row: tuple) -> Trade:
+        """Trade from a tuple in _TRADE_COLS order; Decimal/datetime columns arrive decoded."""
+        (tid, slot_id, symbol, side, entry_price, qty, order_id, sl_order_id,
+         current_sl_price, initial_sl_price, tp_json, highest_tp_reached, atr_value,
+         status, pnl, fees, entry_time, exit_time, exit_reason, cooldown_until,
+         fill_attempts) = row
 
         return Trade(
-            id=row["id"],
-            slot_id=row["slot_id"],
-            symbol=row["symbol"],
-            side=Side(row["side"]),
-            entry_price=Decimal(row["entry_price"]) if row["entry_price"] else None,
-            qty=Decimal(row["qty"]) if row["qty"] else None,
-            order_id=row["order_id"],
-            sl_order_id=row["sl_order_id"],
-            current_sl_price=Decimal(row["current_sl_price"]) if row["current_sl_price"] else None,
-            initial_sl_price=Decimal(row["initial_sl_price"]) if row["initial_sl_price"] else None,
-            tp_levels=tp_levels,
-            highest_tp_reached=row["highest_tp_reached"],
-            atr_value=Decimal(row["atr_value"]) if row["atr_value"] else None,
-            status=TradeStatus(row["status"]),
-            pnl=Decimal(row["pnl"]) if row["pnl"] else None,
-            fees=Decimal(row["fees"]) if row["fees"] else Decimal("0"),
-            entry_time=datetime.fromisoformat(row["entry_time"]) if row["entry_time"] else None,
-            exit_time=datetime.fromisoformat(row["exit_time"]) if row["exit_time"] else None,
-            exit_reason=ExitReason(row["exit_reason"]) if row["exit_reason"] else None,
-            cooldown_until=datetime.fromisoformat(row["cooldown_until"]) if row["cooldown_until"] else None,
-            fill_attempts=row["fill_attempts"],
+            id=tid,
+            slot_id=slot_id,
+            symbol=symbol,
+            side=_SIDES[side],
+            entry_price=entry_price,
+            qty=qty,
+            order_id=order_id,
+            sl_order_id=sl_order_id,
+            current_sl_price=current_sl_price,
+            initial_sl_price=initial_sl_price,
+            tp_levels=self._load_tp_levels(tid, tp_json),
+            highest_tp_reached=highest_tp_reached,
+            atr_value=atr_value,
+            status=_TRADE_STATUSES[status],
+            pnl=pnl,
+            fees=fees if fees is not None else _DECIMAL_ZERO,
+            entry_time=entry_time,
+            exit_time=exit_time,
+            exit_reason=_EXIT_REASONS[exit_reason] if exit_reason else None,
+            cooldown_until=cooldown_until,
+            fill_attempts=fill_attempts,
         )
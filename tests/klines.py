@@ -0,0 +1,24 @@
+"""Exchange-style kline rows shared by the indicator tests."""
+
+import random
+from decimal import Decimal
+
+STEP = 4 * 3600 * 1000
+# (base price, tick) pairs spanning sub-cent memecoins to BTC
+MARKETS = [("0.00001234", "0.00000001"), ("0.5123", "0.0001"), ("27.35", "0.01"), ("64000.5", "0.1")]
+
+
+def kline_rows(base: str, tick: str, count: int, seed: int) -> list:
+    """Oldest-first REST-shaped kline rows from a random walk on the tick grid."""
+    rng = random.Random(seed)
+    tick_d = Decimal(tick)
+    price = int(Decimal(base) / tick_d)
+    rows = []
+    for i in range(count):
+        o = price
+        c = max(1, o + rng.randint(-40, 40))
+        h = max(o, c) + rng.randint(0, 15)
+        lo = max(1, min(o, c) - rng.randint(0, 15))
+        price = c
+        rows.append([str(i * STEP)] + [str(v * tick_d) for v in (o, h, lo, c)] + ["1", "1"])
+    return rows
@@ -0,0 +1,46 @@
+"""Float rolling ATR agrees with the original Decimal SMA on exchange-style prices."""
+
+import unittest
+from decimal import Decimal
+
+from core.atr import ATRCalculator
+from exchange.models import Candle
+from tests.klines import MARKETS, kline_rows
+
+
+def _ref_atr(rows: list, period: int) -> Decimal:
+    """Baseline SMA ATR over the last `period` true ranges."""
+    trs = []
+    for prev, curr in zip(rows, rows[1:]):
+        h, lo, pc = Decimal(curr[2]), Decimal(curr[3]), Decimal(prev[4])
+        trs.append(max(h - lo, abs(h - pc), abs(lo - pc)))
+    return sum(trs[-period:]) / period
+
+
+class ATREquivalenceTest(unittest.TestCase):
+    PERIOD = 14
+
+    def test_rolling_atr_matches_decimal_sma(self):
+        for n, (base, tick) in enumerate(MARKETS):
+            with self.subTest(base=base):
+                rows = kline_rows(base, tick, 200, seed=100 + n)
+                calc = ATRCalculator(period=self.PERIOD)
+                calc.initialize("X", [Candle.from_row(r) for r in rows[:self.PERIOD + 1]])
+                for i in range(self.PERIOD + 1, len(rows)):
+                    calc.update("X", Candle.from_row(rows[i]))
+                    expected = _ref_atr(rows[:i + 1], self.PERIOD)
+                    got = calc.get_atr("X")
+                    self.assertLess(abs(got - expected), Decimal(tick) * Decimal("1e-6"), f"row {i}")
+
+    def test_row_init_matches_candle_init(self):
+        base, tick = MARKETS[1]
+        rows = kline_rows(base, tick, 40, seed=3)
+        by_candles, by_rows = ATRCalculator(self.PERIOD), ATRCalculator(self.PERIOD)
+        by_candles.initialize("X", [Candle.from_row(r) for r in rows])
+        by_rows.initialize_from_rows("X", rows[::-1])
+        self.assertEqual(by_rows.get_atr("X"), by_candles.get_atr("X"))
+        self.assertLess(abs(by_rows.get_atr("X") - _ref_atr(rows, self.PERIOD)), Decimal("1e-10"))
+
+
+if __name__ == "__main__":
+    unittest.main()
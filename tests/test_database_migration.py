@@ -0,0 +1,132 @@
+"""Upgrading a baseline database: TEXT money columns move to INTEGER 1e-8 columns."""
+
+import decimal
+import os
+import sqlite3
+import tempfile
+import unittest
+from decimal import Decimal
+
+from storage.database import Database
+
+# Money-bearing tables as the original release created them
+_BASELINE_SCHEMA = """
+    CREATE TABLE slots (
+        id INTEGER PRIMARY KEY,
+        balance TEXT NOT NULL DEFAULT '10.0',
+        state TEXT NOT NULL DEFAULT 'AVAILABLE',
+        current_symbol TEXT,
+        current_trade_id INTEGER,
+        total_trades INTEGER NOT NULL DEFAULT 0,
+        total_pnl TEXT NOT NULL DEFAULT '0',
+        updated_at TEXT
+    );
+    CREATE TABLE trades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        slot_id INTEGER NOT NULL,
+        symbol TEXT NOT NULL,
+        side TEXT NOT NULL,
+        entry_price TEXT,
+        qty TEXT,
+        order_id TEXT,
+        sl_order_id TEXT,
+        current_sl_price TEXT,
+        initial_sl_price TEXT,
+        tp_levels TEXT,
+        highest_tp_reached INTEGER DEFAULT 0,
+        atr_value TEXT,
+        status TEXT NOT NULL DEFAULT 'PENDING',
+        pnl TEXT,
+        fees TEXT DEFAULT '0',
+        entry_time TEXT,
+        exit_time TEXT,
+        exit_reason TEXT,
+        cooldown_until TEXT,
+        fill_attempts INTEGER DEFAULT 0,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE bot_state (key TEXT PRIMARY KEY, value TEXT, updated_at TEXT);
+"""
+
+
+class MoneyMigrationTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "bot.db")
+        conn = sqlite3.connect(self.path)
+        conn.executescript(_BASELINE_SCHEMA)
+        conn.executemany(
+            "INSERT INTO slots (id, balance, state, total_trades, total_pnl) VALUES (?, ?, ?, ?, ?)",
+            [(1, "12.34567891", "AVAILABLE", 3, "2.34567891"), (2, "7.5", "FROZEN", 1, "-2.5")],
+        )
+        conn.executemany(
+            "INSERT INTO trades (slot_id, symbol, side, status, pnl, fees) VALUES (?, ?, ?, ?, ?, ?)",
+            [(1, "BTCUSDT", "Buy", "CLOSED", "1.25", "0.0123"), (2, "ETHUSDT", "Sell", "OPEN", None, None)],
+        )
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _columns(self, table: str) -> set:
+        conn = sqlite3.connect(self.path)
+        try:
+            return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        finally:
+            conn.close()
+
+    def test_values_carry_over_exactly(self):
+        db = Database(self.path)
+        db.connect()
+        try:
+            slots = {s.id: s for s in db.get_all_slots()}
+            self.assertEqual(slots[1].balance, Decimal("12.34567891"))
+            self.assertEqual(slots[1].total_pnl, Decimal("2.34567891"))
+            self.assertEqual(slots[2].total_pnl, Decimal("-2.5"))
+            self.assertEqual(db.get_total_balance(), Decimal("19.84567891"))
+
+            closed = db.get_trade(1)
+            self.assertEqual(closed.pnl, Decimal("1.25"))
+            self.assertEqual(closed.fees, Decimal("0.0123"))
+            open_trade = db.get_trade(2)
+            self.assertIsNone(open_trade.pnl)
+            self.assertEqual(open_trade.fees, 0)
+        finally:
+            db.close()
+
+    def test_migration_is_idempotent(self):
+        for _ in range(2):
+            db = Database(self.path)
+            db.connect()
+            balance = db.get_total_balance()
+            db.close()
+        self.assertEqual(balance, Decimal("19.84567891"))
+
+    def test_failed_backfill_leaves_schema_untouched(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("UPDATE slots SET balance = 'garbage' WHERE id = 2")
+        conn.commit()
+        conn.close()
+
+        db = Database(self.path)
+        with self.assertRaises(decimal.InvalidOperation):
+            db.connect()
+        db.close()
+        # The ALTERs rolled back with the backfill, so the next start retries in full
+        self.assertNotIn("balance_e8", self._columns("slots"))
+
+        conn = sqlite3.connect(self.path)
+        conn.execute("UPDATE slots SET balance = '7.5' WHERE id = 2")
+        conn.commit()
+        conn.close()
+        db = Database(self.path)
+        db.connect()
+        try:
+            self.assertEqual(db.get_total_balance(), Decimal("19.84567891"))
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
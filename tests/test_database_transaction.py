@@ -0,0 +1,69 @@
+"""Database.transaction(): grouped writes commit together or not at all."""
+
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+
+from exchange.models import Side, Trade, TradeStatus
+from storage.database import Database
+
+
+class TransactionTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "bot.db")
+        self.db = Database(self.path)
+        self.db.connect()
+        self.db.initialize_slots(2, Decimal("10"))
+        trade = Trade(slot_id=1, symbol="BTCUSDT", side=Side.LONG, order_id="o1",
+                      status=TradeStatus.OPEN)
+        self.trade_id = self.db.create_trade(trade)
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def _reopened(self) -> Database:
+        """A second connection sees only what was committed."""
+        other = Database(self.path)
+        other.connect()
+        self.addCleanup(other.close)
+        return other
+
+    def test_rollback_discards_every_write_in_the_block(self):
+        slot = self.db.get_slot(1)
+        slot.balance = Decimal("99")
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.update_slot(slot)
+                self.db.add_trade_fees({"o1": Decimal("0.5")})
+                self.db.store_klines("BTCUSDT", "15", [[1, "1", "1", "1", "1", "1", "1"]], 0)
+                self.db.set_state("k", "v")
+                raise RuntimeError("boom")
+
+        for db in (self.db, self._reopened()):
+            self.assertEqual(db.get_slot(1).balance, Decimal("10"))
+            self.assertEqual(db.get_trade(self.trade_id).fees, 0)
+            self.assertEqual(db.get_cached_klines("BTCUSDT", "15", 10), [])
+            self.assertIsNone(db.get_state("k"))
+
+    def test_nested_block_joins_the_outer_one(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                with self.db.transaction():
+                    self.db.add_trade_fees({"o1": Decimal("0.5")})
+                # the inner exit must not have committed
+                self.assertEqual(self._reopened().get_trade(self.trade_id).fees, 0)
+                raise RuntimeError("boom")
+        self.assertEqual(self.db.get_trade(self.trade_id).fees, 0)
+
+    def test_commit_makes_the_block_visible(self):
+        with self.db.transaction():
+            self.db.add_trade_fees({"o1": Decimal("0.25")})
+            self.db.add_trade_fees({"o1": Decimal("0.25")})
+        self.assertEqual(self._reopened().get_trade(self.trade_id).fees, Decimal("0.5"))
+
+
+if __name__ == "__main__":
+    unittest.main()
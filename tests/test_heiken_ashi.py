@@ -0,0 +1,69 @@
+"""Float HA flips agree with the original Decimal arithmetic on exchange-style prices."""
+
+import unittest
+from decimal import Decimal
+
+from core.heiken_ashi import HeikenAshiEngine
+from exchange.models import Candle, Side
+from tests.klines import MARKETS, kline_rows
+
+
+def _ref_ha(rows: list) -> list:
+    """Baseline Decimal HA: [(timestamp, ha_open, ha_close)] oldest-first."""
+    out = []
+    prev = None
+    for r in rows:
+        o, h, lo, c = (Decimal(v) for v in r[1:5])
+        ha_close = (o + h + lo + c) / 4
+        ha_open = (o + c) / 2 if prev is None else (prev[1] + prev[2]) / 2
+        prev = (int(r[0]), ha_open, ha_close)
+        out.append(prev)
+    return out
+
+
+def _ref_flip(prev: tuple, curr: tuple):
+    if prev[2] < prev[1] and curr[2] > curr[1]:
+        return Side.LONG
+    if prev[2] > prev[1] and curr[2] < curr[1]:
+        return Side.SHORT
+    return None
+
+
+class HeikenAshiEquivalenceTest(unittest.TestCase):
+    HISTORY = 50
+
+    def test_flips_match_decimal_reference(self):
+        for n, (base, tick) in enumerate(MARKETS):
+            with self.subTest(base=base):
+                rows = kline_rows(base, tick, self.HISTORY + 300, seed=n)
+                ref = _ref_ha(rows)
+                engine = HeikenAshiEngine()
+                engine.build_from_history("X", [Candle.from_row(r) for r in rows[:self.HISTORY]])
+                flips = 0
+                for i in range(self.HISTORY, len(rows)):
+                    candle = Candle.from_row(rows[i])
+                    expected = _ref_flip(ref[i - 1], ref[i])
+                    live = engine.detect_live_flip("X", candle)
+                    self.assertEqual(live.side if live else None, expected, f"candle {i}")
+                    _, confirmed = engine.update("X", candle)
+                    self.assertEqual(confirmed.side if confirmed else None, expected, f"candle {i}")
+                    flips += expected is not None
+                self.assertGreater(flips, 0)  # the walk must actually exercise flips
+
+    def test_row_build_matches_candle_build(self):
+        base, tick = MARKETS[0]
+        rows = kline_rows(base, tick, self.HISTORY, seed=7)
+        by_candles, by_rows = HeikenAshiEngine(), HeikenAshiEngine()
+        by_candles.build_from_history("X", [Candle.from_row(r) for r in rows])
+        by_rows.build_from_rows("X", rows[::-1])  # REST order: newest first
+        self.assertEqual(by_rows.get_latest("X"), by_candles.get_latest("X"))
+
+        # Float state tracks the Decimal reference to well inside one tick
+        ref = _ref_ha(rows)[-1]
+        latest = by_rows.get_latest("X")
+        self.assertAlmostEqual(latest.ha_open, float(ref[1]), delta=float(tick) * 1e-6)
+        self.assertAlmostEqual(latest.ha_close, float(ref[2]), delta=float(tick) * 1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
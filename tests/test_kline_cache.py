@@ -0,0 +1,108 @@
+"""Boot-time kline cache: a cached window is only extended by a contiguous fresh tail."""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from storage.database import Database
+
+STEP = 15 * 60_000
+NOW = 1_700_000_000_000 - 1_700_000_000_000 % STEP
+
+
+def _rows(newest_ts: int, count: int) -> list:
+    """Newest-first REST-shaped rows ending at newest_ts."""
+    return [
+        [str(newest_ts - i * STEP), "1", "2", "0.5", "1.5", "10", "15"]
+        for i in range(count)
+    ]
+
+
+class _Client:
+    def __init__(self, tail: list, full: list):
+        self.tail, self.full = tail, full
+        self.calls = []
+
+    async def get_klines_batched(self, requests, max_concurrency=5):
+        self.calls.append(list(requests))
+        return [self.full if r[3] is None else self.tail for r in requests]
+
+
+def setUpModule():
+    # Importing main opens data/bot.log relative to the cwd; keep it out of the tree
+    global main, _tmp, _cwd
+    _cwd = os.getcwd()
+    _tmp = tempfile.TemporaryDirectory()
+    os.chdir(_tmp.name)
+    import main
+
+
+def tearDownModule():
+    os.chdir(_cwd)
+    _tmp.cleanup()
+
+
+class MergeCachedKlinesTest(unittest.TestCase):
+    LIMIT = 10
+
+    def setUp(self):
+        self.db = Database(os.path.join(_tmp.name, f"{self.id()}.db"))
+        self.db.connect()
+        # Cache holds the window up to three candles ago
+        self.cached_newest = NOW - 3 * STEP
+        self.db.store_klines("A", "15", _rows(self.cached_newest, self.LIMIT), keep_from_ts=0)
+
+    def tearDown(self):
+        self.db.close()
+
+    def _load(self, tail: list, full: list):
+        bot = main.Bot.__new__(main.Bot)
+        bot.config = SimpleNamespace(
+            storage=SimpleNamespace(kline_cache=True),
+            coins=SimpleNamespace(max_concurrent_history_loads=2),
+        )
+        bot.db = self.db
+        bot.client = _Client(tail, full)
+        # Same series twice stands in for the (4H, 15M) pair built per symbol
+        bot._history_series = (("15", self.LIMIT), ("15", self.LIMIT))
+        applied = {}
+        bot._apply_symbol_history = lambda symbol, *series: applied.setdefault(symbol, series)
+        real_time_ns = main.time.time_ns
+        main.time.time_ns = lambda: NOW * 1_000_000
+        try:
+            asyncio.run(bot._load_history(["A"]))
+        finally:
+            main.time.time_ns = real_time_ns
+        return bot.client.calls, applied["A"][0]
+
+    def test_contiguous_tail_extends_cache(self):
+        tail = _rows(NOW, 3)  # starts right after the newest cached candle
+        calls, rows = self._load(tail, full=[])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0][0][3], self.cached_newest + STEP)
+        self.assertEqual([int(r[0]) for r in rows], [NOW - i * STEP for i in range(self.LIMIT)])
+
+    def test_empty_tail_refetches_full_window(self):
+        full = _rows(NOW, self.LIMIT)
+        calls, rows = self._load([], full)
+        self.assertEqual(len(calls), 2)
+        self.assertIsNone(calls[1][0][3])
+        self.assertEqual(rows, full)
+
+    def test_gapped_tail_refetches_full_window(self):
+        gapped = _rows(NOW, 2)  # oldest row is two steps past the cache, one missing
+        full = _rows(NOW, self.LIMIT)
+        calls, rows = self._load(gapped, full)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(rows, full)
+
+    def test_failed_refetch_builds_no_state(self):
+        calls, rows = self._load([], [])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(rows, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
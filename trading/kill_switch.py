@@ -5,8 +5,10 @@ If total balance drops below threshold, closes everything and pauses.
 
 from __future__ import annotations
 import asyncio
+import time
 from decimal import Decimal
-from typing import TYPE_CHECKING
+from typing import Any, Dict, Optional, TYPE_CHECKING
+from exchange.models import ExitReason
 import logging
 
 if TYPE_CHECKING:
@@ -46,6 +48,10 @@ class KillSwitch:
         self.notifier = notifier
         self._triggered = False
         self._running = False
+        # symbol -> unrealised PnL of an open position, fed by the private position stream
+        self._unrealized: Dict[str, Decimal] = {}
+        self._last_reconcile: Optional[float] = None
+        self._shutdown_task: Optional[asyncio.Task] = None
 
     @property
     def is_triggered(self) -> bool:
@@ -70,77 +76,124 @@ class KillSwitch:
     async def stop(self):
         self._running = False
 
+    async def on_position_update(self, topic: str, data: Dict[str, Any]):
+        """Private `position` stream: keep unrealised PnL current and re-check on every push."""
+        for pos in data.get("data", []):
+            self._record_position(pos)
+        total = self._breached()
+        if total is not None:
+            # Shutdown makes REST calls; don't hold up the WS dispatch worker with them
+            self._shutdown_task = asyncio.create_task(self._execute_shutdown(total))
+
+    def _record_position(self, pos: Dict[str, Any]):
+        symbol = pos.get("symbol", "")
+        if Decimal(pos.get("size", "0")) > 0:
+            self._unrealized[symbol] = Decimal(pos.get("unrealisedPnl", "0") or "0")
+        else:
+            self._unrealized.pop(symbol, None)
+
+    async def _reconcile_positions(self):
+        """Rebuild the position cache from REST (startup, and periodically as a backstop)."""
+        positions = await self.client.get_positions()
+        self._unrealized.clear()
+        for pos in positions:
+            self._record_position(pos)
+        self._last_reconcile = time.monotonic()
+
+    def _breached(self) -> Optional[Decimal]:
+        """Total balance if it is below the threshold (and not already triggered), else None."""
+        if self._triggered:
+            return None
+        total = self.slot_manager.get_total_balance_with_positions(
+            sum(self._unrealized.values(), Decimal("0"))
+        )
+        if total >= self.config.kill_switch_threshold:
+            return None
+        logger.critical(
+            f"[KILLSWITCH] ⚠️ TRIGGERED! Total: ${total:.2f} "
+            f"< threshold ${self.config.kill_switch_threshold}"
+        )
+        self._triggered = True
+        return total
+
     async def _check(self):
         """Check total balance against threshold."""
         if self._triggered:
             return
 
-        # Get unrealized P&L from exchange
-        unrealized_pnl = Decimal("0")
-        try:
-            positions = await self.client.get_positions()
-            for pos in positions:
-                size = Decimal(pos.get("size", "0"))
-                if size > 0:
-                    unrealized_pnl += Decimal(pos.get("unrealisedPnl", "0"))
-        except Exception as e:
-            logger.warning(f"[KILLSWITCH] Failed to get positions: {e}")
-
-        total = self.slot_manager.get_total_balance_with_positions(unrealized_pnl)
+        # Unrealized P&L comes from the position stream; REST only to reconcile
+        if (self._last_reconcile is None
+                or time.monotonic() - self._last_reconcile >= self.config.kill_switch_reconcile_interval):
+            try:
+                await self._reconcile_positions()
+            except Exception as e:
+                logger.warning(f"[KILLSWITCH] Failed to get positions: {e}")
 
-        if total < self.config.kill_switch_threshold:
-            logger.critical(
-                f"[KILLSWITCH] ⚠️ TRIGGERED! Total: ${total:.2f} "
-                f"< threshold ${self.config.kill_switch_threshold}"
-            )
+        total = self._breached()
+        if total is not None:
             await self._execute_shutdown(total)
 
-    async def _execute_shutdown(self, total_balance: Decimal):
-        """Emergency shutdown — close everything."""
-        self._triggered = True
-        self.db.set_state("kill_switch_triggered", "true")
-
-        # 1. Cancel all open orders
+    async def _cancel_all_orders(self):
+        """One cancel-all, then verify and mop up stragglers in parallel."""
         try:
-            orders = await self.client.get_open_orders()
-            for order in orders:
-                try:
-                    await self.client.cancel_order(
-                        order["symbol"], order["orderId"]
-                    )
-                except Exception as e:
-                    logger.error(f"[KILLSWITCH] Cancel order error: {e}")
-            logger.info(f"[KILLSWITCH] Cancelled {len(orders)} open orders")
+            result = await self.client.cancel_all()
+            cancelled = result.get("result", {}).get("list", [])
+            logger.info(f"[KILLSWITCH] Cancelled {len(cancelled)} open orders")
+
+            leftovers = await self.client.get_open_orders()
+            if leftovers:
+                await asyncio.gather(*(self._safe_cancel(o) for o in leftovers))
+                logger.warning(f"[KILLSWITCH] Cancelled {len(leftovers)} orders left after cancel-all")
         except Exception as e:
             logger.error(f"[KILLSWITCH] Error cancelling orders: {e}")
 
-        # 2. Close all positions at market
+    async def _safe_cancel(self, order: dict):
+        try:
+            await self.client.cancel_order(order["symbol"], order["orderId"])
+        except Exception as e:
+            logger.error(f"[KILLSWITCH] Cancel order error: {e}")
+
+    async def _close_all_positions(self):
+        """Market-close every open position in parallel."""
         try:
             positions = await self.client.get_positions()
-            for pos in positions:
-                size = Decimal(pos.get("size", "0"))
-                if size > 0:
-                    try:
-                        await self.client.close_position_market(
-                            symbol=pos["symbol"],
-                            side=pos["side"],
-                            qty=str(size),
-                        )
-                        logger.info(f"[KILLSWITCH] Closed {pos['symbol']} position")
-                    except Exception as e:
-                        logger.error(f"[KILLSWITCH] Close position error: {e}")
+            await asyncio.gather(*(
+                self._safe_close(pos) for pos in positions
+                if Decimal(pos.get("size", "0")) > 0
+            ))
         except Exception as e:
             logger.error(f"[KILLSWITCH] Error closing positions: {e}")
 
-        # 3. Mark all active trades as closed
-        for trade in self.risk_manager.get_all_active_trades():
-            from exchange.models import ExitReason
-            self.risk_manager.handle_trade_closed(
-                trade,
-                exit_reason=ExitReason.KILL_SWITCH,
-                pnl=Decimal("0"),  # Will be reconciled
-                fees=Decimal("0"),
+    async def _safe_close(self, pos: dict):
+        try:
+            await self.client.close_position_market(
+                symbol=pos["symbol"],
+                side=pos["side"],
+                qty=pos["size"],
             )
+            logger.info(f"[KILLSWITCH] Closed {pos['symbol']} position")
+        except Exception as e:
+            logger.error(f"[KILLSWITCH] Close position error: {e}")
+
+    async def _execute_shutdown(self, total_balance: Decimal):
+        """Emergency shutdown — close everything."""
+        self._triggered = True
+        self.db.set_state("kill_switch_triggered", "true")
+
+        # 1. Cancel all orders first: an entry filling between the position
+        # query and its cancel would otherwise leave a position nobody closes
+        await self._cancel_all_orders()
+
+        # 2. Close every position (queried after the cancels have landed)
+        await self._close_all_positions()
+
+        # 3. Mark all active trades as closed (one batched write)
+        self.risk_manager.handle_trades_closed(
+            self.risk_manager.get_all_active_trades(),
+            exit_reason=ExitReason.KILL_SWITCH,
+            pnl=Decimal("0"),  # Will be reconciled
+            fees=Decimal("0"),
+        )
 
         # 4. Send notification
         msg = (
@@ -8,25 +8,63 @@ Tier 3 (30-45s): Regular Limit at best bid/ask → may pay taker (0.055%)
 
 from __future__ import annotations
 import asyncio
+from collections import OrderedDict
 from decimal import Decimal, ROUND_DOWN, ROUND_UP
 from datetime import datetime
-from typing import Optional, Tuple, TYPE_CHECKING
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
 from exchange.models import Trade, TradeStatus, Side, CoinInfo
 import logging
 
 if TYPE_CHECKING:
     from exchange.bybit_rest import BybitRestClient
+    from exchange.market_data import MarketDataCache
     from config import ExecutionConfig
 
 logger = logging.getLogger(__name__)
 
+_TERMINAL_STATUSES = frozenset(
+    ("Filled", "Cancelled", "PartiallyFilledCanceled", "Rejected", "Deactivated")
+)
+# Entry limit price rounding by order side — always the more favorable direction
+_ENTRY_ROUNDING = {"Buy": ROUND_DOWN, "Sell": ROUND_UP}
+
 
 class OrderExecutor:
     """Handles order placement with intelligent fill management."""
 
-    def __init__(self, client: "BybitRestClient", config: "ExecutionConfig"):
+    FILL_POLL_SEC = 1.0        # REST safety net while waiting on the private order stream
+    RECENT_ORDERS_MAX = 256    # Terminal statuses kept for orders nobody is waiting on (yet)
+    REPRICE_WAIT_SEC = 1.0     # Longest pause before re-pricing after a PostOnly reject
+
+    def __init__(
+        self,
+        client: "BybitRestClient",
+        config: "ExecutionConfig",
+        market_data: Optional["MarketDataCache"] = None,
+    ):
         self.client = client
         self.config = config
+        self.market_data = market_data
+        self._book_max_age_sec = config.book_max_age_ms / 1000
+        # order_id -> event set when the order stream reports a terminal status
+        self._fill_waiters: Dict[str, asyncio.Event] = {}
+        # order_id -> terminal status; the WS push can beat the place_order response
+        self._recent_final: "OrderedDict[str, str]" = OrderedDict()
+
+    async def on_order_update(self, topic: str, data: Dict[str, Any]):
+        """Private `order` stream: record terminal statuses and wake fill waiters."""
+        recent = self._recent_final
+        for order in data.get("data", []):
+            status = order.get("orderStatus", "")
+            if status not in _TERMINAL_STATUSES:
+                continue
+            order_id = order.get("orderId", "")
+            recent[order_id] = status
+            if len(recent) > self.RECENT_ORDERS_MAX:
+                recent.popitem(last=False)
+            waiter = self._fill_waiters.get(order_id)
+            if waiter is not None:
+                waiter.set()
 
     async def execute_entry(
         self,
@@ -42,6 +80,7 @@ class OrderExecutor:
         symbol = trade.symbol
         side = trade.side.value  # "Buy" or "Sell"
 
+        use_stream = True  # False after a reject the stream hasn't caught up with
         for attempt in range(1, self.config.max_fill_retries + 1):
             trade.fill_attempts = attempt
 
@@ -58,7 +97,8 @@ class OrderExecutor:
             )
 
             # Get current best bid/ask
-            price = await self._get_entry_price(symbol, side)
+            price = await self._get_entry_price(symbol, side, use_stream)
+            use_stream = True
             if price is None:
                 logger.error(f"[EXEC] {symbol}: Failed to get orderbook")
                 continue
@@ -70,7 +110,7 @@ class OrderExecutor:
                 return False
 
             # Round price to tick size
-            price = self._round_price(price, coin.tick_size, side)
+            price = self._round_price(price, coin, side)
 
             logger.info(
                 f"[EXEC] {symbol}: Placing {side} limit @ {price}, "
@@ -81,8 +121,8 @@ class OrderExecutor:
             result = await self.client.place_order(
                 symbol=symbol,
                 side=side,
-                qty=str(qty),
-                price=str(price),
+                qty=coin.fmt_qty(qty),
+                price=coin.fmt_price(price),
                 order_type="Limit",
                 time_in_force=time_in_force,
             )
@@ -92,7 +132,14 @@ class OrderExecutor:
             # PostOnly rejection (would be taker)
             if ret_code == 170213 or ret_code == 170217:
                 logger.warning(f"[EXEC] {symbol}: PostOnly rejected (would cross book). Retrying...")
-                await asyncio.sleep(1)
+                # The book moved through our price; re-price on the next top-of-book
+                # push, or from a REST snapshot if none arrives (cache would be stale)
+                if self.market_data is not None:
+                    use_stream = await self.market_data.wait_for_update(
+                        symbol, self.REPRICE_WAIT_SEC
+                    )
+                else:
+                    await asyncio.sleep(self.REPRICE_WAIT_SEC)
                 continue
 
             # Other error
@@ -146,8 +193,16 @@ class OrderExecutor:
         )
         return result.get("retCode") == 0
 
-    async def _get_entry_price(self, symbol: str, side: str) -> Optional[Decimal]:
-        """Get the appropriate price for entry."""
+    async def _get_entry_price(
+        self, symbol: str, side: str, use_stream: bool = True
+    ) -> Optional[Decimal]:
+        """Get the appropriate price for entry. use_stream=False forces a REST snapshot."""
+        # Streamed top of book first; REST only when it's missing or stale
+        if use_stream and self.market_data is not None:
+            book = self.market_data.get(symbol, self._book_max_age_sec)
+            if book is not None:
+                return book.best_bid if side == "Buy" else book.best_ask
+
         ob = await self.client.get_orderbook(symbol, limit=1)
         bids = ob.get("b", [])
         asks = ob.get("a", [])
@@ -164,34 +219,32 @@ class OrderExecutor:
 
     async def _wait_for_fill(self, symbol: str, order_id: str) -> bool:
         """
-        Poll for order fill status.
+        Wait for the order to reach a terminal status.
         Returns True if fully filled within timeout.
-        """
-        deadline = asyncio.get_event_loop().time() + self.config.fill_timeout_sec
-        check_interval = 1.0  # Check every second
-
-        while asyncio.get_event_loop().time() < deadline:
-            orders = await self.client.get_open_orders(symbol)
-
-            # If order is no longer in open orders, it was filled (or cancelled)
-            order_found = False
-            for order in orders:
-                if order.get("orderId") == order_id:
-                    order_found = True
-                    status = order.get("orderStatus", "")
-                    if status == "Filled":
-                        return True
-                    elif status in ("Cancelled", "Rejected", "Deactivated"):
-                        return False
-                    break
-
-            # Order not in open orders — likely filled
-            if not order_found:
-                return True
 
-            await asyncio.sleep(check_interval)
-
-        return False
+        The private order stream wakes us the moment the order fills; a
+        per-order REST query every FILL_POLL_SEC covers a lagging or dropped WS.
+        """
+        waiter = self._fill_waiters[order_id] = asyncio.Event()
+        try:
+            # One deadline for the whole wait; no clock reads in the loop
+            async with asyncio.timeout(self.config.fill_timeout_sec):
+                while True:
+                    status = self._recent_final.get(order_id)
+                    if status is None:
+                        order = await self.client.query_order(symbol, order_id)
+                        # Unknown to Bybit — treated as filled, as before
+                        status = order.get("orderStatus", "") if order else "Filled"
+                    if status in _TERMINAL_STATUSES:
+                        return status == "Filled"
+                    try:
+                        await asyncio.wait_for(waiter.wait(), self.FILL_POLL_SEC)
+                    except TimeoutError:
+                        pass
+        except TimeoutError:
+            return False
+        finally:
+            self._fill_waiters.pop(order_id, None)
 
     def _calculate_qty(
         self,
@@ -206,13 +259,8 @@ class OrderExecutor:
         if price <= 0:
             return None
 
-        raw_qty = position_size_usdt / price
-
-        # Round down to qty_step
-        if coin.qty_step > 0:
-            qty = (raw_qty / coin.qty_step).to_integral_value(rounding=ROUND_DOWN) * coin.qty_step
-        else:
-            qty = raw_qty
+        # Round down to qty_step (exact integer floor, no intermediate Decimal division)
+        qty = coin.qty_for_notional(position_size_usdt, price)
 
         # Check minimum
         if qty < coin.min_qty:
@@ -223,16 +271,10 @@ class OrderExecutor:
 
         return qty
 
-    def _round_price(self, price: Decimal, tick_size: Decimal, side: str) -> Decimal:
+    def _round_price(self, price: Decimal, coin: CoinInfo, side: str) -> Decimal:
         """
         Round price to tick size.
         Buy: round down (more favorable)
         Sell: round up (more favorable)
         """
-        if tick_size <= 0:
-            return price
-
-        if side == "Buy":
-            return (price / tick_size).to_integral_value(rounding=ROUND_DOWN) * tick_size
-        else:
-            return (price / tick_size).to_integral_value(rounding=ROUND_UP) * tick_size
+        return coin.round_price(price, _ENTRY_ROUNDING[side])
@@ -12,9 +12,10 @@ INVARIANT: SL can only move in the profitable direction, NEVER regress.
 
 from __future__ import annotations
 import asyncio
+from bisect import bisect_right
 from decimal import Decimal, ROUND_DOWN, ROUND_UP
 from datetime import datetime
-from typing import Optional, Dict, List, TYPE_CHECKING
+from typing import Optional, Dict, List, Tuple, TYPE_CHECKING
 from exchange.models import Trade, TradeStatus, ExitReason, Side, TPLevel, CoinInfo
 from storage.database import Database
 import logging
@@ -23,9 +24,14 @@ if TYPE_CHECKING:
     from exchange.bybit_rest import BybitRestClient
     from config import StrategyConfig
     from core.atr import ATRCalculator
+    from core.coin_selector import CoinSelector
 
 logger = logging.getLogger(__name__)
 
+# Conservative rounding per position side: SL toward the position, TP toward entry
+_SL_ROUNDING = {Side.LONG: ROUND_UP, Side.SHORT: ROUND_DOWN}
+_TP_ROUNDING = {Side.LONG: ROUND_DOWN, Side.SHORT: ROUND_UP}
+
 
 class RiskManager:
     """
@@ -33,27 +39,41 @@ class RiskManager:
     Monitors price in real-time and adjusts SL as TP levels are hit.
     """
 
+    PROGRESS_FLUSH_SEC = 0.25  # TP/SL progress writes are coalesced over this window
+
     def __init__(
         self,
         client: "BybitRestClient",
         config: "StrategyConfig",
         atr_calc: "ATRCalculator",
         db: Database,
+        coins: Optional["CoinSelector"] = None,
     ):
         self.client = client
         self.config = config
         self.atr_calc = atr_calc
         self.db = db
+        # Tick-precision SL strings, the same rendering setup_trade_risk sends
+        self.coins = coins
 
         # trade_id -> Trade (in-memory cache for fast price checks)
         self._active_trades: Dict[int, Trade] = {}
+        # symbol -> its active trades, so a tick only touches its own symbol's trades
+        self._by_symbol: Dict[str, List[Trade]] = {}
+        # trade_id -> trade with TP/SL progress not yet written (see flush_progress)
+        self._dirty: Dict[int, Trade] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # trade_id -> (trade, target SL) not yet sent; drained by run_sl_updates
+        self._sl_pending: Dict[int, Tuple[Trade, Decimal]] = {}
+        self._sl_wake = asyncio.Event()
+        self._running = False
 
     def load_active_trades(self):
         """Load all open trades from DB into memory on startup."""
         trades = self.db.get_open_trades()
         for trade in trades:
             if trade.id and trade.status == TradeStatus.OPEN:
-                self._active_trades[trade.id] = trade
+                self._track(trade)
         logger.info(f"[RISK] Loaded {len(self._active_trades)} active trades")
 
     async def setup_trade_risk(
@@ -80,7 +100,7 @@ class RiskManager:
             sl_price = entry * (Decimal("1") + sl_pct)
 
         # Round SL to tick size
-        sl_price = self._round_sl_price(sl_price, coin.tick_size, trade.side)
+        sl_price = self._round_sl_price(sl_price, coin, trade.side)
 
         # Calculate TP levels from ATR on 15M
         atr = self.atr_calc.get_atr(trade.symbol)
@@ -88,26 +108,21 @@ class RiskManager:
             logger.warning(f"[RISK] {trade.symbol}: No ATR available, using entry * 1% as fallback")
             atr = entry * Decimal("0.01")
 
-        tp_levels = []
-        for n in range(1, self.config.tp_levels + 1):
-            if trade.side == Side.LONG:
-                tp_price = entry + (Decimal(str(n)) * atr)
-            else:
-                tp_price = entry - (Decimal(str(n)) * atr)
-
-            # Round TP to tick size
-            tp_price = self._round_tp_price(tp_price, coin.tick_size, trade.side)
-
-            tp_levels.append(TPLevel(
-                level=n,
-                price=tp_price,
-                hit=False,
-            ))
+        # TP_n = entry ± n × ATR, direction folded into the step once; the
+        # whole ladder is snapped to ticks in one pass
+        prices = coin.price_ladder(
+            entry, atr * trade.side.sign, self.config.tp_levels, _TP_ROUNDING[trade.side]
+        )
+        tp_levels = [
+            TPLevel(level=n, price=tp_price, hit=False)
+            for n, tp_price in enumerate(prices, 1)
+        ]
 
         # Set SL on the exchange using set-trading-stop
+        sl_str = coin.fmt_price(sl_price)
         result = await self.client.set_trading_stop(
             symbol=trade.symbol,
-            stop_loss=str(sl_price),
+            stop_loss=sl_str,
         )
 
         if result.get("retCode") != 0:
@@ -119,13 +134,14 @@ class RiskManager:
         # Update trade
         trade.initial_sl_price = sl_price
         trade.current_sl_price = sl_price
+        trade.last_sl_sent = sl_str
         trade.tp_levels = tp_levels
         trade.atr_value = atr
         trade.highest_tp_reached = 0
         self.db.update_trade(trade)
 
         # Add to active monitoring
-        self._active_trades[trade.id] = trade
+        self._track(trade)
 
         logger.info(
             f"[RISK] {trade.symbol}: SL set @ {sl_price} (-{sl_pct*100}%). "
@@ -133,44 +149,52 @@ class RiskManager:
         )
         return True
 
-    async def check_price(self, symbol: str, mark_price: Decimal):
+    def check_price(self, symbol: str, mark_price: float):
         """
         Called on every ticker update.
         Checks if any TP level was hit for active trades on this symbol.
         If so, trails the SL accordingly.
+        The tick price is a float; Decimal only comes back in when the SL moves.
+        Synchronous: the trades are bucketed per symbol at setup and SL moves
+        are only queued here, so a tick costs no coroutines at all.
         """
-        for trade_id, trade in list(self._active_trades.items()):
-            if trade.symbol != symbol:
-                continue
+        trades = self._by_symbol.get(symbol)
+        if not trades:
+            return
+        # Nothing below yields, so the bucket can't change under the loop
+        for trade in trades:
             if trade.status != TradeStatus.OPEN:
                 continue
             if not trade.tp_levels:
                 continue
 
-            await self._check_tp_levels(trade, mark_price)
+            self._check_tp_levels(trade, mark_price)
 
-    async def _check_tp_levels(self, trade: Trade, price: Decimal):
+    def _check_tp_levels(self, trade: Trade, price: float):
         """Check and update TP levels for a trade."""
-        new_highest = trade.highest_tp_reached
+        # TPs step away from entry level by level, so the levels reached are a
+        # prefix of tp_keys: one bisect from the lowest unhit one finds them all,
+        # and a quiet tick ends right there.
+        start = trade.next_tp_idx
+        end = bisect_right(trade.tp_keys, price if trade.side == Side.LONG else -price, start)
+        if end == start:
+            return
+        trade.next_tp_idx = end
 
-        for tp in trade.tp_levels:
+        new_highest = trade.highest_tp_reached
+        now = datetime.utcnow()
+        levels = trade.tp_levels
+        for i in range(start, end):
+            tp = levels[i]
             if tp.hit:
-                continue
-
-            hit = False
-            if trade.side == Side.LONG and price >= tp.price:
-                hit = True
-            elif trade.side == Side.SHORT and price <= tp.price:
-                hit = True
-
-            if hit:
-                tp.hit = True
-                tp.hit_time = datetime.utcnow()
-                new_highest = max(new_highest, tp.level)
-                logger.info(
-                    f"[RISK] {trade.symbol}: TP{tp.level} HIT @ {price} "
-                    f"(target was {tp.price})"
-                )
+                continue  # loaded as hit from the DB
+            tp.hit = True
+            tp.hit_time = now
+            new_highest = max(new_highest, tp.level)
+            logger.info(
+                f"[RISK] {trade.symbol}: TP{tp.level} HIT @ {price} "
+                f"(target was {tp.price})"
+            )
 
         # Trail SL if we reached a new TP level
         if new_highest > trade.highest_tp_reached:
@@ -186,16 +210,20 @@ class RiskManager:
                 new_sl = self._get_tp_price(trade, target_sl_level)
 
                 if new_sl is not None:
-                    await self._update_sl(trade, new_sl)
+                    self._update_sl(trade, new_sl)
 
-            self.db.update_trade(trade)
+            # TP progress now; a confirmed SL move marks the trade again
+            self._mark_progress(trade)
 
-    async def _update_sl(self, trade: Trade, new_sl_price: Decimal):
+    def _update_sl(self, trade: Trade, new_sl_price: Decimal):
         """
-        Update SL on the exchange.
+        Queue an SL move for the exchange. The REST call happens in
+        run_sl_updates, so the ticker path never waits on it.
         INVARIANT: SL can only move in the profitable direction.
         """
-        current_sl = trade.current_sl_price
+        # Compare against a move still in flight, not just the confirmed SL
+        pending = self._sl_pending.get(trade.id)
+        current_sl = pending[1] if pending else trade.current_sl_price
 
         # Safety check: never regress SL
         if current_sl is not None:
@@ -212,15 +240,50 @@ class RiskManager:
                 )
                 return
 
-        # Update on exchange
-        result = await self.client.set_trading_stop(
-            symbol=trade.symbol,
-            stop_loss=str(new_sl_price),
-        )
+        # Latest target per trade wins; older queued moves are superseded
+        self._sl_pending[trade.id] = (trade, new_sl_price)
+        self._sl_wake.set()
+
+    async def run_sl_updates(self):
+        """Send queued SL moves to the exchange. Runs until stop()."""
+        self._running = True
+        while self._running:
+            await self._sl_wake.wait()
+            self._sl_wake.clear()
+            if not self._sl_pending:
+                continue
+            batch = list(self._sl_pending.values())
+            self._sl_pending.clear()
+            await asyncio.gather(*(self._send_sl(trade, price) for trade, price in batch))
+
+    def stop(self):
+        self._running = False
+        self._sl_wake.set()
+
+    async def _send_sl(self, trade: Trade, new_sl_price: Decimal):
+        if trade.status != TradeStatus.OPEN:
+            return  # closed while the move was queued
+
+        # Same rendering as setup_trade_risk (last_sl_sent compares strings);
+        # fixed-point text if the coin has since left the tracked list
+        coin = self.coins.get_coin(trade.symbol) if self.coins is not None else None
+        sl_str = coin.fmt_price(new_sl_price) if coin is not None else format(new_sl_price, "f")
+        if sl_str == trade.last_sl_sent:
+            return  # exchange already has this SL
+
+        try:
+            result = await self.client.set_trading_stop(
+                symbol=trade.symbol,
+                stop_loss=sl_str,
+            )
+        except Exception as e:
+            logger.error(f"[RISK] {trade.symbol}: Failed to update SL: {e}")
+            return
 
         if result.get("retCode") == 0:
             trade.current_sl_price = new_sl_price
-            self.db.update_trade(trade)
+            trade.last_sl_sent = sl_str
+            self._mark_progress(trade)
             logger.info(
                 f"[RISK] {trade.symbol}: SL TRAILED to {new_sl_price} "
                 f"(TP{trade.highest_tp_reached} reached)"
@@ -232,27 +295,77 @@ class RiskManager:
 
     def handle_trade_closed(self, trade: Trade, exit_reason: ExitReason, pnl: Decimal, fees: Decimal):
         """Handle a trade being closed (SL hit, etc.)."""
+        self._mark_closed(trade, exit_reason, pnl, fees, datetime.utcnow())
+        self._dirty.pop(trade.id, None)  # the full write below covers it
+        self.db.update_trade(trade)
+        self._forget_closed(trade)
+
+    def handle_trades_closed(
+        self, trades: List[Trade], exit_reason: ExitReason, pnl: Decimal, fees: Decimal
+    ):
+        """Close many trades at once (kill switch) — one batched DB write."""
+        now = datetime.utcnow()
+        for trade in trades:
+            self._mark_closed(trade, exit_reason, pnl, fees, now)
+            self._dirty.pop(trade.id, None)
+        self.db.bulk_update_trades(trades)
+        for trade in trades:
+            self._forget_closed(trade)
+
+    def _mark_progress(self, trade: Trade):
+        """Queue a trade's TP/SL progress for the next coalesced write, off the tick path."""
+        self._dirty[trade.id] = trade
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.PROGRESS_FLUSH_SEC, self.flush_progress
+            )
+
+    def flush_progress(self):
+        """Write queued TP/SL progress in one transaction. Also called on shutdown."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return
+        trades = list(self._dirty.values())
+        self._dirty.clear()
+        try:
+            with self.db.transaction():
+                for trade in trades:
+                    self.db.update_trade_progress(trade)
+        except Exception as e:
+            logger.error(f"[RISK] Progress flush failed, retrying: {e}")
+            for trade in trades:
+                self._dirty.setdefault(trade.id, trade)
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.PROGRESS_FLUSH_SEC, self.flush_progress
+            )
+
+    @staticmethod
+    def _mark_closed(
+        trade: Trade, exit_reason: ExitReason, pnl: Decimal, fees: Decimal, now: datetime
+    ):
         trade.status = TradeStatus.CLOSED
-        trade.exit_time = datetime.utcnow()
+        trade.exit_time = now
         trade.exit_reason = exit_reason
         trade.pnl = pnl
         trade.fees = fees
-        self.db.update_trade(trade)
 
+    def _forget_closed(self, trade: Trade):
         # Remove from active monitoring
-        self._active_trades.pop(trade.id, None)
+        self._untrack(trade.id)
 
         logger.info(
-            f"[RISK] {trade.symbol}: Trade closed. Reason={exit_reason.value}, "
-            f"PnL=${pnl:+.4f}, Fees=${fees:.4f}"
+            f"[RISK] {trade.symbol}: Trade closed. Reason={trade.exit_reason.value}, "
+            f"PnL=${trade.pnl:+.4f}, Fees=${trade.fees:.4f}"
         )
 
     def get_active_trade(self, trade_id: int) -> Optional[Trade]:
         return self._active_trades.get(trade_id)
 
     def get_active_trade_by_symbol(self, symbol: str) -> Optional[Trade]:
-        for trade in self._active_trades.values():
-            if trade.symbol == symbol and trade.status == TradeStatus.OPEN:
+        for trade in self._by_symbol.get(symbol, ()):
+            if trade.status == TradeStatus.OPEN:
                 return trade
         return None
 
@@ -260,33 +373,44 @@ class RiskManager:
         return list(self._active_trades.values())
 
     def remove_trade(self, trade_id: int):
-        self._active_trades.pop(trade_id, None)
+        self._untrack(trade_id)
+
+    def _track(self, trade: Trade):
+        if trade.id in self._active_trades:
+            self._untrack(trade.id)
+        self._index_tp_levels(trade)
+        self._active_trades[trade.id] = trade
+        self._by_symbol.setdefault(trade.symbol, []).append(trade)
+
+    @staticmethod
+    def _index_tp_levels(trade: Trade):
+        """Build the in-memory TP lookups for a new or DB-loaded trade."""
+        levels = trade.tp_levels
+        sign = 1.0 if trade.side == Side.LONG else -1.0
+        trade.tp_keys = [sign * tp.price_f for tp in levels]
+        trade.tp_by_level = {tp.level: tp.price for tp in levels}
+        # Resume after the levels already hit before a restart
+        idx = 0
+        while idx < len(levels) and levels[idx].hit:
+            idx += 1
+        trade.next_tp_idx = idx
+
+    def _untrack(self, trade_id: int):
+        trade = self._active_trades.pop(trade_id, None)
+        if trade is None:
+            return
+        bucket = self._by_symbol.get(trade.symbol)
+        if bucket is not None:
+            bucket[:] = [t for t in bucket if t is not trade]
+            if not bucket:
+                del self._by_symbol[trade.symbol]
 
     def _get_tp_price(self, trade: Trade, level: int) -> Optional[Decimal]:
         """Get TP price by level number."""
-        for tp in trade.tp_levels:
-            if tp.level == level:
-                return tp.price
-        return None
+        return trade.tp_by_level.get(level)
 
-    def _round_sl_price(self, price: Decimal, tick_size: Decimal, side: Side) -> Decimal:
+    def _round_sl_price(self, price: Decimal, coin: CoinInfo, side: Side) -> Decimal:
         """Round SL price conservatively (toward position, not away)."""
-        if tick_size <= 0:
-            return price
         # For longs: SL below entry → round UP (less aggressive SL)
         # For shorts: SL above entry → round DOWN (less aggressive SL)
-        if side == Side.LONG:
-            return (price / tick_size).to_integral_value(rounding=ROUND_UP) * tick_size
-        else:
-            return (price / tick_size).to_integral_value(rounding=ROUND_DOWN) * tick_size
-
-    def _round_tp_price(self, price: Decimal, tick_size: Decimal, side: Side) -> Decimal:
-        """Round TP price conservatively."""
-        if tick_size <= 0:
-            return price
-        # For longs: TP above entry → round DOWN (easier to hit)
-        # For shorts: TP below entry → round UP (easier to hit)
-        if side == Side.LONG:
-            return (price / tick_size).to_integral_value(rounding=ROUND_DOWN) * tick_size
-        else:
-            return (price / tick_size).to_integral_value(rounding=ROUND_UP) * tick_size
+        return coin.round_price(price, _SL_ROUNDING[side])
@@ -4,9 +4,10 @@ Handles slot lifecycle, assignment, compounding, and freezing.
 """
 
 from __future__ import annotations
+import heapq
 from decimal import Decimal
 from datetime import datetime, timedelta
-from typing import Optional, List, TYPE_CHECKING
+from typing import Dict, Optional, List, Set, TYPE_CHECKING
 from exchange.models import Slot, SlotState, Trade, TradeStatus, Signal, ExitReason
 from storage.database import Database
 import logging
@@ -16,6 +17,14 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+_STATE_EMOJI = {
+    SlotState.AVAILABLE: "🟢",
+    SlotState.ASSIGNED: "🟡",
+    SlotState.IN_TRADE: "🔵",
+    SlotState.COOLDOWN: "⏳",
+    SlotState.FROZEN: "🔴",
+}
+
 
 class SlotManager:
     """
@@ -26,7 +35,18 @@ class SlotManager:
     def __init__(self, config: "SlotConfig", db: Database):
         self.config = config
         self.db = db
+        # The Slot objects handed out are these entries; mutators change them in place
         self._slots: dict[int, Slot] = {}
+        # Running sum of slot balances — the kill switch polls it, so keep it in memory
+        self._total_balance = Decimal("0")
+        # Converted once; position sizing multiplies by it on every signal
+        self._leverage = Decimal(str(config.leverage))
+        # Kept in step with every state change (_transition), so queries don't scan
+        self._state_counts: Dict[SlotState, int] = dict.fromkeys(SlotState, 0)
+        self._available: Set[int] = set()
+        # Min-heap of slot ids; entries whose slot left AVAILABLE are dropped lazily
+        self._available_heap: List[int] = []
+        self._heap_ids: Set[int] = set()
 
     def initialize(self):
         """Load or create slots on startup."""
@@ -45,6 +65,36 @@ class SlotManager:
         """Reload all slots from DB."""
         for slot in self.db.get_all_slots():
             self._slots[slot.id] = slot
+        self._total_balance = sum((s.balance for s in self._slots.values()), Decimal("0"))
+
+        self._state_counts = dict.fromkeys(SlotState, 0)
+        for slot in self._slots.values():
+            self._state_counts[slot.state] += 1
+        self._available = {s.id for s in self._slots.values() if s.state == SlotState.AVAILABLE}
+        self._available_heap = sorted(self._available)
+        self._heap_ids = set(self._available)
+
+    def _transition(self, slot: Slot, state: SlotState, *, detach: bool = False):
+        """
+        The one way a slot changes state: keeps the counters and free-list in
+        step, optionally clears its symbol/trade (detach), and persists it.
+        """
+        old = slot.state
+        if old != state:
+            slot.state = state
+            self._state_counts[old] -= 1
+            self._state_counts[state] += 1
+            if old == SlotState.AVAILABLE:
+                self._available.discard(slot.id)
+            elif state == SlotState.AVAILABLE:
+                self._available.add(slot.id)
+                if slot.id not in self._heap_ids:
+                    heapq.heappush(self._available_heap, slot.id)
+                    self._heap_ids.add(slot.id)
+        if detach:
+            slot.current_symbol = None
+            slot.current_trade_id = None
+        self.db.update_slot(slot)
 
     def get_slot(self, slot_id: int) -> Optional[Slot]:
         return self._slots.get(slot_id)
@@ -53,17 +103,17 @@ class SlotManager:
         return list(self._slots.values())
 
     def get_available_slot(self) -> Optional[Slot]:
-        """Find first available slot for a new trade."""
-        for slot in sorted(self._slots.values(), key=lambda s: s.id):
-            if slot.state == SlotState.AVAILABLE:
-                return slot
-        return None
+        """Find first available slot (lowest id) for a new trade."""
+        heap = self._available_heap
+        while heap and heap[0] not in self._available:
+            self._heap_ids.discard(heapq.heappop(heap))
+        return self._slots[heap[0]] if heap else None
 
     def count_available(self) -> int:
-        return sum(1 for s in self._slots.values() if s.state == SlotState.AVAILABLE)
+        return self._state_counts[SlotState.AVAILABLE]
 
     def count_in_trade(self) -> int:
-        return sum(1 for s in self._slots.values() if s.state == SlotState.IN_TRADE)
+        return self._state_counts[SlotState.IN_TRADE]
 
     def assign_slot(self, slot: Slot, trade: Trade) -> bool:
         """
@@ -74,20 +124,16 @@ class SlotManager:
             logger.warning(f"[SLOT {slot.id}] Cannot assign — state is {slot.state.value}")
             return False
 
-        slot.state = SlotState.ASSIGNED
         slot.current_symbol = trade.symbol
         slot.current_trade_id = trade.id
-        self.db.update_slot(slot)
-        self._slots[slot.id] = slot
+        self._transition(slot, SlotState.ASSIGNED)
 
         logger.info(f"[SLOT {slot.id}] Assigned to {trade.symbol} (Trade #{trade.id})")
         return True
 
     def mark_in_trade(self, slot: Slot):
         """Mark slot as actively in a trade (order filled)."""
-        slot.state = SlotState.IN_TRADE
-        self.db.update_slot(slot)
-        self._slots[slot.id] = slot
+        self._transition(slot, SlotState.IN_TRADE)
 
     def complete_trade(self, slot: Slot, trade: Trade, cooldown_minutes: int = 30):
         """
@@ -102,36 +148,30 @@ class SlotManager:
         new_balance = old_balance + net_pnl
 
         slot.balance = new_balance
+        self._total_balance += net_pnl
         slot.total_trades += 1
         slot.total_pnl += net_pnl
-        slot.current_symbol = None
-        slot.current_trade_id = None
 
         # Check if slot should be frozen
         if new_balance < self.config.min_balance:
-            slot.state = SlotState.FROZEN
+            self._transition(slot, SlotState.FROZEN, detach=True)
             logger.warning(
                 f"[SLOT {slot.id}] FROZEN — Balance ${new_balance:.2f} "
                 f"< min ${self.config.min_balance:.2f}"
             )
         else:
             # Start cooldown
-            slot.state = SlotState.COOLDOWN
+            self._transition(slot, SlotState.COOLDOWN, detach=True)
             logger.info(
                 f"[SLOT {slot.id}] Trade complete. "
                 f"PnL: ${net_pnl:+.2f} (${old_balance:.2f} → ${new_balance:.2f}). "
                 f"Cooldown: {cooldown_minutes}min"
             )
 
-        self.db.update_slot(slot)
-        self._slots[slot.id] = slot
-
     def release_from_cooldown(self, slot: Slot):
         """Release a slot from cooldown to available."""
         if slot.state == SlotState.COOLDOWN:
-            slot.state = SlotState.AVAILABLE
-            self.db.update_slot(slot)
-            self._slots[slot.id] = slot
+            self._transition(slot, SlotState.AVAILABLE)
             logger.info(f"[SLOT {slot.id}] Released from cooldown. Balance: ${slot.balance:.2f}")
 
     def release_slot(self, slot: Slot):
@@ -139,16 +179,12 @@ class SlotManager:
         Immediately release a slot (e.g., fill failed).
         No balance change, no cooldown.
         """
-        slot.state = SlotState.AVAILABLE
-        slot.current_symbol = None
-        slot.current_trade_id = None
-        self.db.update_slot(slot)
-        self._slots[slot.id] = slot
+        self._transition(slot, SlotState.AVAILABLE, detach=True)
         logger.info(f"[SLOT {slot.id}] Released (no trade executed)")
 
     def get_total_balance(self) -> Decimal:
         """Sum of all slot balances (not including unrealized P&L)."""
-        return sum(s.balance for s in self._slots.values())
+        return self._total_balance
 
     def get_total_balance_with_positions(self, unrealized_pnl: Decimal = Decimal("0")) -> Decimal:
         """Total balance including unrealized P&L from open positions."""
@@ -159,24 +195,16 @@ class SlotManager:
         Calculate position size for a slot.
         Position size = slot_balance × leverage
         """
-        return slot.balance * Decimal(str(self.config.leverage))
+        return slot.balance * self._leverage
 
     def get_status_summary(self) -> str:
         """Get a formatted status summary of all slots."""
-        lines = ["═══ SLOT STATUS ═══"]
-        total = Decimal("0")
-        for s in sorted(self._slots.values(), key=lambda x: x.id):
-            emoji = {
-                SlotState.AVAILABLE: "🟢",
-                SlotState.ASSIGNED: "🟡",
-                SlotState.IN_TRADE: "🔵",
-                SlotState.COOLDOWN: "⏳",
-                SlotState.FROZEN: "🔴",
-            }.get(s.state, "⚪")
-            sym = f" ({s.current_symbol})" if s.current_symbol else ""
-            lines.append(
-                f"{emoji} Slot {s.id}: ${s.balance:.2f} [{s.state.value}]{sym}"
-            )
-            total += s.balance
-        lines.append(f"═══ TOTAL: ${total:.2f} ═══")
-        return "\n".join(lines)
+        slots = "\n".join(
+            f"{_STATE_EMOJI.get(s.state, '⚪')} Slot {s.id}: ${s.balance:.2f} [{s.state.value}]"
+            f"{f' ({s.current_symbol})' if s.current_symbol else ''}"
+            for s in sorted(self._slots.values(), key=lambda x: x.id)
+        )
+        return (
+            f"═══ SLOT STATUS ═══\n{slots}\n"
+            f"═══ TOTAL: ${self.get_total_balance():.2f} ═══"
+        )